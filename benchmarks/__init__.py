@@ -0,0 +1,2 @@
+"""Бенчмарки игрового движка и сервера. Запуск: ``python -m benchmarks.<имя>``,
+сравнение двух запусков: ``python -m benchmarks.compare``"""
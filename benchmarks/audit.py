@@ -0,0 +1,96 @@
+"""Архив партий: размер записи, цена append для обработчика и скорость записи и чтения.
+
+Партии генерируются как на сервере (match3.replay), затем подаются в
+AuditWriter с темпом --games-per-sec, как если бы их заканчивали комнаты
+при заданном потоке ходов. Замеряются время append в вызывающем потоке
+(p50/p99 - столько ждет обработчик), время, за которое фоновый поток
+дописал все на диск, байты на партию и скорость чтения архива через
+отображение сегментов в память.
+
+Чтение архива обратно и пропуск обрезанной последней записи проверяет
+tests/test_audit.py.
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from match3.audit import AuditWriter, read_archive, segment_paths
+from match3.replay import GameLog
+
+from .common import report
+from .replay import play
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def sample_logs(count, moves, seed):
+    """Несколько настоящих партий, размноженные с разными зернами"""
+    rng = random.Random(seed)
+    played = [play(rng.getrandbits(63), moves, rng.randint(1, 4), True)[0] for _ in range(min(count, 200))]
+    return [GameLog(rng.getrandbits(63), log.mode, log.players, log.moves, len(log), log.no_reshuffle)
+            for log in (played[n % len(played)] for n in range(count))]
+
+
+def run(games=50000, moves=50, games_per_sec=None, segment_mb=8, seed=1):
+    logs = sample_logs(games, moves, seed)
+    directory = tempfile.mkdtemp(prefix='match3-audit-')
+    try:
+        writer = AuditWriter(directory, segment_mb << 20)
+        latencies = []
+        start = time.perf_counter()
+        for n, log in enumerate(logs):
+            if games_per_sec:
+                # Партии заканчиваются равномерно с заданным темпом
+                delay = start + n / games_per_sec - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            began = time.perf_counter()
+            writer.append(f'room-{n}', log)
+            latencies.append(time.perf_counter() - began)
+        appended = time.perf_counter() - start
+        writer.close()
+        written = time.perf_counter() - start
+        stats = writer.stats()
+
+        start = time.perf_counter()
+        read = sum(1 for _ in read_archive(directory))
+        reading = time.perf_counter() - start
+        return {
+            'games': games,
+            'moves_per_game': moves,
+            'bytes_per_game': round(stats['bytes'] / games, 1),
+            'bytes_per_move': round(stats['bytes'] / games / moves, 2),
+            'segments': len(segment_paths(directory)),
+            'append_p50_us': round(percentile(latencies, 0.5) * 1e6, 1),
+            'append_p99_us': round(percentile(latencies, 0.99) * 1e6, 1),
+            'offered_games_per_sec': round(games / appended),
+            'written_games_per_sec': round(games / written),
+            'written_mb_per_sec': round(stats['bytes'] / written / (1 << 20), 2),
+            'dropped': stats['dropped'],
+            'read_games_per_sec': round(read / reading),
+        }
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=50000)
+    parser.add_argument('--moves', type=int, default=50, help='ходов в партии')
+    parser.add_argument('--games-per-sec', type=float, default=None,
+                        help='темп окончания партий (по умолчанию без пауз)')
+    parser.add_argument('--segment-mb', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('audit', run(args.games, args.moves, args.games_per_sec, args.segment_mb, args.seed))
+
+
+if __name__ == '__main__':
+    main()
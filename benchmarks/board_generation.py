@@ -0,0 +1,49 @@
+"""Скорость генерации поля: конструктивный генератор против перегенерации"""
+import argparse
+import random
+
+from match3.engine import create_game_board
+
+from . import legacy
+from .common import measure, report
+
+SIZES = [(8, 8), (16, 16), (32, 32)]
+# Больших полей без совпадений перегенерация почти не находит
+MAX_ATTEMPTS = 2000
+
+
+def run(min_time=1.0, seed=1):
+    results = []
+    for width, height in SIZES:
+        rng = random.Random(seed)
+        constructive = measure(lambda: create_game_board(rng, width, height), min_time)
+
+        rng = random.Random(seed)
+        attempts = []
+
+        def rejection():
+            board, tries = legacy.create_game_board(rng, width, height, MAX_ATTEMPTS)
+            attempts.append(tries if board else None)
+
+        rejection_rate = measure(rejection, min_time)
+        finished = [a for a in attempts if a is not None]
+        results.append({
+            'size': f'{width}x{height}',
+            'constructive_boards_per_sec': round(constructive, 1),
+            'rejection_boards_per_sec': round(rejection_rate * len(finished) / len(attempts), 1),
+            'rejection_avg_attempts': round(sum(finished) / len(finished), 1) if finished else None,
+            'rejection_gave_up': len(attempts) - len(finished),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('board_generation', run(args.min_time, args.seed))
+
+
+if __name__ == '__main__':
+    main()
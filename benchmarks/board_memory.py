@@ -0,0 +1,101 @@
+"""Память на игру и ходы в секунду: поле Board против списков строк с названиями цветов"""
+import argparse
+import random
+import tracemalloc
+
+from match3.engine import create_game_board, remove_matches_and_refill, check_matches, swap_tiles
+
+from . import legacy
+from .common import measure, report
+from .matching import random_swap
+
+
+def new_game(board):
+    """Словарь игры в том виде, в каком его хранит сервер для бесконечного режима"""
+    return {
+        'players': {'sid': {'name': 'Игрок', 'score': 0, 'position': 1}},
+        'board': board,
+        'current_player': 'sid',
+        'game_active': True,
+        'game_mode': 'endless',
+        'move_count': 0,
+    }
+
+
+def bytes_per_game(make_board, games=2000):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    held = [new_game(make_board()) for _ in range(games)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del held
+    return total / games
+
+
+def board_bytes(make_board, games=2000):
+    """Память только под поле, без общего для обоих вариантов словаря игры"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    held = [make_board() for _ in range(games)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del held
+    return total / games
+
+
+def legacy_move(board, swap, rng):
+    legacy.swap_tiles(board, *swap)
+    matches = legacy.check_matches(board)
+    if not matches:
+        legacy.swap_tiles(board, *swap)
+    while matches:
+        legacy.remove_matches_and_refill(board, matches, rng)
+        matches = legacy.check_matches(board)
+
+
+def board_move(board, swap, rng):
+    swap_tiles(board, *swap)
+    matches = check_matches(board)
+    if not matches:
+        swap_tiles(board, *swap)
+    while matches:
+        remove_matches_and_refill(board, matches, rng)
+        matches = check_matches(board)
+
+
+def run(min_time=1.0, seed=1):
+    rng = random.Random(seed)
+    make_lists = lambda: create_game_board(rng).to_names()
+    make_board = lambda: create_game_board(rng)
+
+    results = {
+        'list_board_bytes': round(board_bytes(make_lists)),
+        'array_board_bytes': round(board_bytes(make_board)),
+        'list_game_bytes': round(bytes_per_game(make_lists)),
+        'array_game_bytes': round(bytes_per_game(make_board)),
+    }
+
+    # Одинаковый алгоритм (полная проверка после каждого шага), разное представление
+    lists = create_game_board(random.Random(seed)).to_names()
+    rng = random.Random(seed)
+    results['list_moves_per_sec'] = round(
+        measure(lambda: legacy_move(lists, random_swap(rng, 8, 8), rng), min_time), 1)
+    board = create_game_board(random.Random(seed))
+    rng = random.Random(seed)
+    results['array_moves_per_sec'] = round(
+        measure(lambda: board_move(board, random_swap(rng, 8, 8), rng), min_time), 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('board_memory', run(args.min_time, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Оценка ходов для ботов: время оценки всех ходов поля и польза от нее.
+
+Для --boards играбельных полей 8x8 замеряется MoveEvaluator.evaluate по
+всем доступным ходам (p50/p99/max на поле) и число ходов на поле. Затем
+боты с разным skill играют одиночные партии по --moves ходов с настоящим
+пополнением поля: сравниваются очки за ход у случайного выбора и у
+выбора по оценке.
+
+Оценку каждого хода против простой модели на копии поля и выбор только
+доступных ходов проверяет tests/test_bots.py.
+"""
+import argparse
+import random
+import time
+
+from match3.bots import MoveEvaluator
+from match3.engine import resolve_move
+from match3.moves import MoveIndex, move_cells, playable_board, reshuffle
+
+from .common import report
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def play(skill, moves, seed):
+    """Очки за ход бота с заданным skill в одиночной партии"""
+    rng = random.Random(seed)
+    evaluator = MoveEvaluator()
+    index = MoveIndex(playable_board(rng))
+    board = index.board
+    cleared = 0
+    for _ in range(moves):
+        if not index:
+            reshuffle(board, rng)
+            index.rebuild()
+        row1, col1, row2, col2 = move_cells(evaluator.choose(board, index.moves, rng, skill), board.width)
+        steps = resolve_move(board, row1, col1, row2, col2, rng)
+        changed = [(row1, col1), (row2, col2)]
+        for step in steps:
+            changed.extend(step.changed)
+            cleared += len(step.matches)
+        index.update(changed)
+    return cleared * 10 / moves
+
+
+def run(boards=2000, moves=2000, seed=1):
+    rng = random.Random(seed)
+    evaluator = MoveEvaluator()
+    timings = []
+    counts = []
+    for _ in range(boards):
+        board = playable_board(rng)
+        codes = MoveIndex(board).moves
+        started = time.perf_counter()
+        evaluator.evaluate(board, codes)
+        timings.append(time.perf_counter() - started)
+        counts.append(len(codes))
+    total = sum(timings)
+    return {
+        'boards': boards,
+        'moves_per_board': round(sum(counts) / boards, 1),
+        'max_moves_per_board': max(counts),
+        'evaluate_p50_us': round(percentile(timings, 0.5) * 1e6, 1),
+        'evaluate_p99_us': round(percentile(timings, 0.99) * 1e6, 1),
+        'evaluate_max_us': round(max(timings) * 1e6, 1),
+        'move_evaluations_per_sec': round(sum(counts) / total),
+        'points_per_move': {
+            f'skill_{skill}': round(play(skill, moves, seed), 1) for skill in (0.0, 0.5, 0.85, 1.0)
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boards', type=int, default=2000)
+    parser.add_argument('--moves', type=int, default=2000, help='ходов в партиях ботов')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('bots', run(args.boards, args.moves, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Нагрузочный тест нескольких воркеров: ходов в секунду и задержка хода от числа воркеров.
+
+Для каждого числа воркеров запускается столько же процессов server.py
+(WORKERS и WORKER_ID, общие ROOM_QUEUE и SOCKETIO_MESSAGE_QUEUE на
+--queue), и на них подается нагрузка benchmarks.load. Клиенты подключаются
+к воркерам по кругу, поэтому игроки одной комнаты мультиплеера сидят на
+разных воркерах: события комнаты идут владельцу через очередь, а
+board_update приходит через очередь Flask-SocketIO. Одиночные комнаты
+тоже закреплены за воркером по хешу и часто живут не там, где сокет.
+forwarded_events - сколько событий edge-воркеры переслали владельцам (из
+/health). Рост ходов в секунду должен быть почти линейным, пока воркеров
+не больше ядер.
+
+По умолчанию очередью служит брокер match3.hub, который запускается
+отдельным процессом на свободном порту (внешние сервисы не нужны). С
+--queue redis://... очередью будет Redis (нужен пакет redis). Для
+клиентов нужен python-socketio. Маршрутизацию комнат проверяет
+tests/test_cluster.py, брокер - tests/test_hub.py.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from . import load
+from .common import report
+
+
+
+def worker_ids(count):
+    return [f'worker-{n}' for n in range(count)]
+
+
+def spawn_workers(count, queue):
+    """Запускает count воркеров server.py на общей очереди; возвращает [(процесс, адрес)]"""
+    workers = worker_ids(count)
+    spawned = []
+    try:
+        for worker in workers:
+            spawned.append(load.spawn_server(WORKERS=','.join(workers), WORKER_ID=worker,
+                                             ROOM_QUEUE=queue, SOCKETIO_MESSAGE_QUEUE=queue))
+    except Exception:
+        stop_workers(spawned)
+        raise
+    return spawned
+
+
+def spawn_hub(timeout=10.0):
+    """Запускает брокер match3.hub на свободном порту; возвращает (процесс, адрес tcp://)"""
+    port = load.free_port()
+    process = subprocess.Popen([sys.executable, '-m', 'match3.hub', '--port', str(port)], cwd=load.ROOT,
+                               stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, f'tcp://127.0.0.1:{port}'
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f'match3.hub завершился с кодом {process.returncode}')
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('match3.hub не открыл порт')
+
+
+def stop_workers(spawned):
+    for process, _ in spawned:
+        process.terminate()
+    for process, _ in spawned:
+        process.wait()
+
+
+def forwarded_events(urls):
+    total = 0
+    for url in urls:
+        with urllib.request.urlopen(url + '/health', timeout=5) as response:
+            total += json.load(response)['forwarded_events']
+    return total
+
+
+def run(max_workers=4, clients=200, mode='multiplayer', room_size=2, duration=10.0, warmup=2.0,
+        think=0.0, queue=None, seed=1):
+    room_size = room_size if mode == 'multiplayer' else 1
+    results = {'cpus': os.cpu_count(), 'mode': mode, 'clients': clients, 'room_size': room_size,
+               'queue': queue or 'match3.hub', 'workers': {}}
+    baseline = None
+    counts = sorted({1, 2, max_workers} | {n for n in (4, 8) if n < max_workers})
+    for count in counts:
+        # Свежий брокер на каждый прогон: сообщения прошлого прогона не доходят до новых воркеров
+        hub = spawn_hub() if queue is None else None
+        try:
+            spawned = spawn_workers(count, queue or hub[1])
+            urls = [url for _, url in spawned]
+            try:
+                stats = load.run(urls, clients, mode, room_size, duration, warmup, think, seed=seed)
+                forwarded = forwarded_events(urls)
+            finally:
+                stop_workers(spawned)
+        finally:
+            if hub is not None:
+                stop_workers([hub])
+        baseline = baseline or stats['moves_per_sec']
+        results['workers'][count] = {
+            'moves_per_sec': stats['moves_per_sec'],
+            'scaling_efficiency': round(stats['moves_per_sec'] / (baseline * count), 2) if baseline else None,
+            'move_p50_ms': stats['move_p50_ms'],
+            'move_p99_ms': stats['move_p99_ms'],
+            'move_max_ms': stats['move_max_ms'],
+            'forwarded_events': forwarded,
+            'rejected': stats['rejected'],
+            'errors': stats['errors'],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--mode', choices=('endless', 'level', 'multiplayer'), default='multiplayer')
+    parser.add_argument('--room-size', type=int, default=2, help='игроков в комнате мультиплеера')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--think', type=float, default=0.0, help='средняя пауза перед ходом, секунд')
+    parser.add_argument('--queue', default=None,
+                        help='общая очередь воркеров, например redis://127.0.0.1:6379/0 (по умолчанию свой match3.hub)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('cluster_load', run(args.max_workers, args.clients, args.mode, args.room_size, args.duration,
+                               args.warmup, args.think, args.queue, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""Общие помощники для бенчмарков"""
+import json
+import platform
+import subprocess
+import time
+
+
+def measure(fn, min_time=1.0):
+    """Вызывает fn, пока не пройдет min_time секунд; возвращает операций в секунду"""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def revision():
+    """Коммит рабочего дерева (с -dirty при незакоммиченных изменениях) или None вне git"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(name, results):
+    """Печатает результаты бенчмарка в JSON; коммит и версия Python - для сравнения (benchmarks.compare)"""
+    print(json.dumps({
+        'benchmark': name,
+        'commit': revision(),
+        'python': platform.python_version(),
+        'results': results,
+    }, ensure_ascii=False, indent=2))
@@ -0,0 +1,115 @@
+"""Сравнение результатов бенчмарков двух коммитов.
+
+Каждый файл - вывод одного или нескольких бенчмарков подряд, например::
+
+    python -m benchmarks.engine > before.json
+    git checkout other-branch
+    python -m benchmarks.engine > after.json
+    python -m benchmarks.compare before.json after.json
+
+Числовые значения сопоставляются по пути (бенчмарк/строка/поле); строки
+списков узнаются по первому строковому полю (size, mode и т.п.).
+Направление берется из имени: ``*_per_sec`` - больше лучше, задержки и
+размеры (``*_ms``, ``*_us``, ``*_ns``, ``*_sec``, ``*_bytes``) - меньше
+лучше. С ``--fail-over PCT`` код выхода 1, если что-то ухудшилось больше
+чем на PCT процентов.
+"""
+import argparse
+import json
+import sys
+
+LOWER_IS_BETTER = ('_ms', '_us', '_ns', '_sec', '_bytes')
+
+
+def load(path):
+    """Все JSON-документы файла по порядку"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    decoder = json.JSONDecoder()
+    documents = []
+    position = 0
+    while True:
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position == len(text):
+            return documents
+        document, position = decoder.raw_decode(text, position)
+        documents.append(document)
+
+
+def flatten(value, path, into):
+    if isinstance(value, bool):
+        return into
+    if isinstance(value, (int, float)):
+        into[path] = value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            flatten(item, f'{path}/{key}', into)
+    elif isinstance(value, list):
+        for n, item in enumerate(value):
+            label = n
+            if isinstance(item, dict):
+                label = next((field for field in item.values() if isinstance(field, str)), n)
+            flatten(item, f'{path}/{label}', into)
+    return into
+
+
+def metrics(documents):
+    values = {}
+    for document in documents:
+        flatten(document.get('results'), document.get('benchmark', '?'), values)
+    return values
+
+
+def direction(path):
+    """1 - больше лучше, -1 - меньше лучше, 0 - просто значение"""
+    name = path.rsplit('/', 1)[-1]
+    if 'per_sec' in name:
+        return 1
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(before, after):
+    """Строки (путь, было, стало, изменение в процентах, ухудшение в процентах)"""
+    rows = []
+    for path, old in before.items():
+        if path not in after:
+            continue
+        new = after[path]
+        change = (new - old) / old * 100 if old else 0.0
+        rows.append((path, old, new, change, max(0.0, -change * direction(path))))
+    return rows
+
+
+def number(value):
+    return f'{value:,.0f}' if abs(value) >= 1000 else f'{value:.4g}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--fail-over', type=float, metavar='PCT', default=None,
+                        help='код выхода 1 при ухудшении больше чем на PCT процентов')
+    args = parser.parse_args()
+
+    before, after = load(args.before), load(args.after)
+    commits = lambda documents: ', '.join(sorted({str(d.get('commit')) for d in documents}))
+    print(f'before: {commits(before)}  after: {commits(after)}')
+    rows = compare(metrics(before), metrics(after))
+    width = max((len(row[0]) for row in rows), default=0)
+    worse = []
+    for path, old, new, change, regression in rows:
+        mark = ''
+        if args.fail_over is not None and regression > args.fail_over:
+            mark = '  <- хуже'
+            worse.append(path)
+        print(f'{path:<{width}}  {number(old):>14}  {number(new):>14}  {change:+8.1f}%{mark}')
+    if worse:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Набор микробенчмарков движка: базовая линия для сравнения между коммитами.
+
+На каждом размере поля замеряются:
+
+* generate_board - играбельное поле для новой партии (и сколько полей
+  генерируется до него), create_game_board - поле без совпадений;
+* full_scan / local_scan - поиск совпадений на всем поле и только в
+  строках и столбцах обмена;
+* moves_full_scan - ход как в исходном сервере: check_matches по всему
+  полю и remove_matches_and_refill до конца каскада (индекс ходов для
+  выбора следующего хода пересчитывается целиком);
+* moves_resolve - ход как сейчас: resolve_move, обновление индекса ходов
+  и перемешивание, когда ходов не осталось (и шагов каскада на ход);
+* red_count - подсчет красных фишек для цели режима уровней;
+* index_has / index_update - проверка хода по индексу и его обновление.
+
+Все значения - операций в секунду (кроме средних), генератор с зерном
+--seed, поэтому запуски на разных коммитах сравнимы через
+``python -m benchmarks.compare``.
+"""
+import argparse
+import random
+
+from match3.engine import (
+    check_matches, check_matches_around, count_tile_type, create_game_board,
+    remove_matches_and_refill, resolve_move, swap_lines,
+)
+from match3.moves import MoveIndex, generate_board, move_cells, reshuffle
+
+from .common import measure, report
+
+SIZES = [(8, 8), (16, 16)]
+
+
+class Game:
+    """Партия на одном поле: каждый вызов move делает случайный доступный ход"""
+
+    def __init__(self, rng, width, height):
+        self.rng = rng
+        self.index = MoveIndex(generate_board(rng, width, height)[0])
+        self.board = self.index.board
+        self.moves = 0
+        self.steps = 0
+
+    def pick(self):
+        if not self.index:
+            reshuffle(self.board, self.rng)
+            self.index.rebuild()
+        return move_cells(self.rng.choice(sorted(self.index.moves)), self.board.width)
+
+    def move(self):
+        row1, col1, row2, col2 = self.pick()
+        steps = resolve_move(self.board, row1, col1, row2, col2, self.rng)
+        changed = [(row1, col1), (row2, col2)]
+        for step in steps:
+            changed.extend(step.changed)
+        self.index.update(changed)
+        self.moves += 1
+        self.steps += len(steps)
+
+    def move_full_scan(self):
+        """Тот же ход через полный проход поля после каждого шага каскада"""
+        row1, col1, row2, col2 = self.pick()
+        self.board.swap(row1, col1, row2, col2)
+        matches = check_matches(self.board)
+        while matches:
+            remove_matches_and_refill(self.board, matches, self.rng)
+            matches = check_matches(self.board)
+        self.index.rebuild()
+
+
+def run_size(width, height, min_time, seed):
+    rng = random.Random(seed)
+    results = {'size': f'{width}x{height}'}
+
+    boards = [0, 0]
+
+    def generate():
+        boards[0] += 1
+        boards[1] += generate_board(rng, width, height)[1]
+
+    results['generate_board_per_sec'] = round(measure(generate, min_time), 1)
+    results['generate_board_attempts'] = round(boards[1] / boards[0], 3)
+    results['create_game_board_per_sec'] = round(measure(lambda: create_game_board(rng, width, height), min_time), 1)
+
+    board = create_game_board(rng, width, height)
+    swap = swap_lines(height // 2, width // 2, height // 2, width // 2 + 1)
+    results['full_scan_per_sec'] = round(measure(lambda: check_matches(board), min_time))
+    results['local_scan_per_sec'] = round(measure(lambda: check_matches_around(board, *swap), min_time))
+    results['red_count_per_sec'] = round(measure(lambda: count_tile_type(board, 'red'), min_time))
+
+    game = Game(random.Random(seed), width, height)
+    results['moves_full_scan_per_sec'] = round(measure(game.move_full_scan, min_time), 1)
+    game = Game(random.Random(seed), width, height)
+    results['moves_resolve_per_sec'] = round(measure(game.move, min_time), 1)
+    results['cascade_steps_per_move'] = round(game.steps / game.moves, 3)
+
+    index = game.index
+    codes = sorted(index.moves) or [0]
+    cells = [move_cells(code, width) for code in codes]
+    results['index_has_per_sec'] = round(measure(lambda: index.has(*rng.choice(cells)), min_time))
+    changed = [(row, col) for row in range(height // 2, height // 2 + 2) for col in range(width)]
+    results['index_update_per_sec'] = round(measure(lambda: index.update(changed), min_time))
+    return results
+
+
+def run(sizes=SIZES, min_time=1.0, seed=1):
+    return [run_size(width, height, min_time, seed) for width, height in sizes]
+
+
+def size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=size, action='append', metavar='WxH',
+                        help='размер поля, можно несколько раз (по умолчанию 8x8 и 16x16)')
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('engine', run(args.size or SIZES, args.min_time, args.seed))
+
+
+if __name__ == '__main__':
+    main()
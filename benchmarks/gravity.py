@@ -0,0 +1,84 @@
+"""Падение и заполнение фишек: сжатие столбца против очереди пустых клеток.
+
+Оба алгоритма работают на одном представлении - Board (bytearray кодов),
+поэтому сравнение показывает разницу только в алгоритме падения:
+
+* queue - исходный алгоритм: в столбце снизу вверх ведется очередь пустых
+  клеток (pop(0) на каждую сдвигаемую фишку), затем второй проход по всему
+  полю заполняет пустые клетки по одной;
+* compaction - Board.collapse: столбец сжимается одним translate и
+  записывается обратно вместе с новыми фишками.
+
+Для справки замеряется и исходная реализация на списках строк
+(legacy_lists) - в ней меняются сразу и представление, и алгоритм.
+"""
+import argparse
+import random
+
+from match3.board import EMPTY, TILE_CODES
+from match3.engine import create_game_board, remove_matches_and_refill
+
+from . import legacy
+from .common import measure, report
+
+SIZES = [(8, 8), (8, 64), (8, 256)]
+
+
+def queue_refill(board, matches, rng):
+    """Исходный алгоритм падения и заполнения на Board"""
+    cells = board.cells
+    width, height = board.width, board.height
+    board.clear(matches)
+    for col in range(width):
+        empty_cells = []
+        for row in range(height - 1, -1, -1):
+            index = row * width + col
+            if cells[index] == EMPTY:
+                empty_cells.append(row)
+            elif empty_cells:
+                lowest_empty = empty_cells.pop(0)
+                cells[lowest_empty * width + col] = cells[index]
+                cells[index] = EMPTY
+                empty_cells.append(row)
+    for index in range(len(cells)):
+        if cells[index] == EMPTY:
+            cells[index] = rng.choice(TILE_CODES)
+    return board
+
+
+def run(min_time=1.0, seed=1, cleared=0.5):
+    """cleared - доля клеток, убираемых перед каждым падением"""
+    results = []
+    for width, height in SIZES:
+        rng = random.Random(seed)
+        board = create_game_board(rng, width, height)
+        positions = [(row, col) for row in range(height) for col in range(width)]
+        matches = rng.sample(positions, int(len(positions) * cleared))
+
+        lists = board.to_names()
+        queue_board = board.copy()
+        list_rate = measure(lambda: legacy.remove_matches_and_refill(lists, matches, rng), min_time)
+        queue_rate = measure(lambda: queue_refill(queue_board, matches, rng), min_time)
+        compaction_rate = measure(lambda: remove_matches_and_refill(board, matches, rng), min_time)
+        results.append({
+            'size': f'{width}x{height}',
+            'cleared_cells': len(matches),
+            'legacy_lists_refills_per_sec': round(list_rate, 1),
+            'queue_refills_per_sec': round(queue_rate, 1),
+            'compaction_refills_per_sec': round(compaction_rate, 1),
+            'compaction_speedup': round(compaction_rate / queue_rate, 2),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cleared', type=float, default=0.5, help='доля очищаемых клеток')
+    args = parser.parse_args()
+    report('gravity', run(args.min_time, args.seed, args.cleared))
+
+
+if __name__ == '__main__':
+    main()
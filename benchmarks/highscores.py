@@ -0,0 +1,67 @@
+"""Поток новых рекордов: запись каждого рекорда сразу против пачек по таймеру.
+
+Игроки бесконечного режима по очереди бьют свои рекорды. Без пачек каждый
+рекорд - отдельная транзакция SQLite, с пачками рекорд попадает в кеш, а
+на диск уходит раз в flush_interval секунд. Время сброса входит в замер.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from match3.highscores import HighscoreStore, SQLiteBackend
+
+from .common import report
+
+
+def sustained_writes(path, batch, duration, players, flush_interval, seed):
+    rng = random.Random(seed)
+    store = HighscoreStore(SQLiteBackend(path), batch=batch)
+    names = [f'player-{n}' for n in range(players)]
+    scores = dict.fromkeys(names, 0)
+    records = 0
+    start = last_flush = time.perf_counter()
+    now = start
+    while now - start < duration:
+        for _ in range(100):
+            name = rng.choice(names)
+            scores[name] += rng.randint(1, 5) * 10
+            store.record(name, 'endless', scores[name])
+            records += 1
+        now = time.perf_counter()
+        if batch and now - last_flush >= flush_interval:
+            store.flush()
+            last_flush = now
+    store.close()
+    elapsed = time.perf_counter() - start
+
+    reopened = HighscoreStore(SQLiteBackend(path))
+    assert all(reopened.best(name, 'endless') == score for name, score in scores.items())
+    reopened.backend.close()
+    return round(records / elapsed)
+
+
+def run(duration=2.0, players=10000, flush_interval=1.0, seed=1):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for batch in (False, True):
+            path = os.path.join(directory, f'batch-{batch}.db')
+            key = 'batched' if batch else 'write_through'
+            results[f'{key}_records_per_sec'] = sustained_writes(
+                path, batch, duration, players, flush_interval, seed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--duration', type=float, default=2.0)
+    parser.add_argument('--players', type=int, default=10000)
+    parser.add_argument('--flush-interval', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('highscores', run(args.duration, args.players, args.flush_interval, args.seed))
+
+
+if __name__ == '__main__':
+    main()
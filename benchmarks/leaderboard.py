@@ -0,0 +1,61 @@
+"""Таблица лидеров на миллионе игроков: построение, новые рекорды, место и страницы.
+
+Места и страницы против полной сортировки проверяет tests/test_leaderboard.py.
+"""
+import argparse
+import random
+import time
+
+from match3.leaderboard import Leaderboard
+
+from .common import measure, report
+
+MODE = 'endless'
+
+
+def random_highscores(players, rng):
+    return [((f'player-{n}', MODE), rng.randrange(0, 100000, 10)) for n in range(players)]
+
+
+def run(players=1000000, min_time=1.0, seed=1):
+    rng = random.Random(seed)
+    items = random_highscores(players, rng)
+    start = time.perf_counter()
+    board = Leaderboard.from_highscores(items)
+    build = time.perf_counter() - start
+    names = [name for (name, _), _ in items]
+
+    def new_record():
+        name = rng.choice(names)
+        board.update(name, MODE, board.score(name, MODE) + rng.randrange(10, 1000, 10))
+
+    def rank():
+        board.rank(rng.choice(names), MODE)
+
+    def page():
+        board.top(MODE, 100, rng.randrange(players - 100))
+
+    def full_sort():
+        sorted(board._scores[MODE].items(), key=lambda item: -item[1])
+
+    return {
+        'players': players,
+        'build_sec': round(build, 2),
+        'updates_per_sec': round(measure(new_record, min_time)),
+        'rank_per_sec': round(measure(rank, min_time)),
+        'top100_page_per_sec': round(measure(page, min_time)),
+        'full_sort_per_sec': round(measure(full_sort, min_time), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=1000000)
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('leaderboard', run(args.players, args.min_time, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Исходная реализация поля на списках строк, эталон для сравнения в бенчмарках"""
+import random
+
+from match3.board import TILE_TYPES
+
+
+def create_game_board(rng, width, height, max_attempts=None):
+    """Заполняет поле целиком и повторяет, пока есть совпадения.
+
+    Возвращает (поле, число попыток) или (None, число попыток), если
+    за max_attempts попыток поле без совпадений не нашлось.
+    """
+    attempts = 0
+    while max_attempts is None or attempts < max_attempts:
+        attempts += 1
+        board = [[rng.choice(TILE_TYPES) for _ in range(width)] for _ in range(height)]
+        if not check_matches(board):
+            return board, attempts
+    return None, attempts
+
+
+def check_matches(board):
+    matches = set()
+    height = len(board)
+    width = len(board[0])
+
+    for row in range(height):
+        for col in range(width - 2):
+            if (board[row][col] == board[row][col + 1] == board[row][col + 2] and
+                board[row][col] is not None):
+                matches.add((row, col))
+                matches.add((row, col + 1))
+                matches.add((row, col + 2))
+
+    for row in range(height - 2):
+        for col in range(width):
+            if (board[row][col] == board[row + 1][col] == board[row + 2][col] and
+                board[row][col] is not None):
+                matches.add((row, col))
+                matches.add((row + 1, col))
+                matches.add((row + 2, col))
+
+    return list(matches)
+
+
+def remove_matches_and_refill(board, matches, rng=random):
+    height = len(board)
+    width = len(board[0])
+
+    for row, col in matches:
+        board[row][col] = None
+
+    for col in range(width):
+        empty_cells = []
+        for row in range(height - 1, -1, -1):
+            if board[row][col] is None:
+                empty_cells.append(row)
+            elif empty_cells:
+                lowest_empty = empty_cells.pop(0)
+                board[lowest_empty][col] = board[row][col]
+                board[row][col] = None
+                empty_cells.append(row)
+
+    for col in range(width):
+        for row in range(height):
+            if board[row][col] is None:
+                board[row][col] = rng.choice(TILE_TYPES)
+
+    return board
+
+
+def swap_tiles(board, row1, col1, row2, col2):
+    board[row1][col1], board[row2][col2] = board[row2][col2], board[row1][col1]
+    return board
+
+
+def count_tile_type(board, tile_type):
+    count = 0
+    for row in board:
+        for tile in row:
+            if tile == tile_type:
+                count += 1
+    return count
@@ -0,0 +1,269 @@
+"""Нагрузочный тест сервера через Socket.IO: --clients клиентов играют на живом сервере.
+
+Клиенты - python-socketio (``pip install "python-socketio[client]==5.8.0"``),
+каждый со своим соединением, и играют как браузер с форматом 'full':
+ход выбирается по полученному полю среди доступных, следующий ход - после
+ответа на предыдущий (и паузы --think). Режимы:
+
+* endless, level - каждый клиент в своей комнате (join_single_player);
+  законченный уровень начинается заново;
+* multiplayer - клиенты по --room-size в комнате (join_room), ходит
+  текущий игрок; законченная партия перезапускается.
+
+Задержка хода - от make_move до board_update (или game_over, или отказа
+move_result) у сходившего клиента, в нее входит и ожидание в очереди
+комнаты. Замер идет --duration секунд после подключения всех клиентов и
+--warmup секунд разгона. Сервер берется по --url (несколько адресов через
+запятую - клиенты подключаются к ним по кругу) или с ``--spawn``
+запускается server.py на свободном порту (рекорды в памяти, без архива).
+"""
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+
+from match3.board import Board
+from match3.moves import MoveIndex, move_cells
+
+from .common import report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_EVENTS = ('joined', 'game_start', 'single_player_started', 'board_snapshot',
+                'board_reshuffled', 'turn_skipped', 'player_left')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Stats:
+    """Общие счетчики всех клиентов; задержки пишутся только во время замера"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.recording = False
+        self.latencies = []
+        self.rejected = 0
+        self.games = 0
+        self.errors = 0
+
+    def move(self, latency):
+        if self.recording:
+            self.latencies.append(latency)
+
+    def count(self, name):
+        if self.recording:
+            with self.lock:
+                setattr(self, name, getattr(self, name) + 1)
+
+
+class Player:
+    """Один клиент: держит последнее поле и ходит, когда наступает его очередь"""
+
+    def __init__(self, url, transport, stats, mode, room, room_size, leader, rng, think):
+        import socketio
+
+        self.url = url
+        self.transport = transport
+        self.stats = stats
+        self.mode = mode
+        self.room = room
+        self.room_size = room_size
+        self.leader = leader
+        self.rng = rng
+        self.think = think
+        self.board = None
+        self.current = None
+        self.sent = None
+        self.running = True
+        self.sio = socketio.Client(reconnection=False)
+        for event in STATE_EVENTS:
+            self.sio.on(event, self.on_state)
+        self.sio.on('board_update', self.on_update)
+        self.sio.on('move_result', self.on_rejected)
+        self.sio.on('game_over', self.on_game_over)
+        self.sio.on('error', lambda data: stats.count('errors'))
+
+    def connect(self):
+        self.sio.connect(self.url, transports=[self.transport])
+        self.sid = self.sio.get_sid()
+        if self.mode == 'multiplayer':
+            self.sio.emit('join_room', {'room': self.room, 'playerName': f'load-{self.sid[:6]}',
+                                        'protocol': 'full', 'matchSize': self.room_size})
+        else:
+            self.room = f'singleplayer-{self.sid}'
+            self.sio.emit('join_single_player', {'playerName': f'load-{self.sid[:6]}',
+                                                 'gameMode': self.mode, 'protocol': 'full'})
+
+    def close(self):
+        self.running = False
+        self.sio.disconnect()
+
+    def answered(self):
+        if self.sent is not None:
+            self.stats.move(time.perf_counter() - self.sent)
+            self.sent = None
+
+    def on_state(self, data):
+        if 'board' in data:
+            self.board = Board.from_names(data['board'])
+        if 'currentPlayer' in data:
+            self.current = data['currentPlayer']
+        self.play()
+
+    def on_update(self, data):
+        if self.current == self.sid:
+            self.answered()
+        self.on_state(data)
+
+    def on_rejected(self, data):
+        if not data.get('valid', True):
+            self.sent = None
+            self.stats.count('rejected')
+            self.sio.emit('resync', {})
+
+    def on_game_over(self, data):
+        self.answered()
+        if self.leader:
+            self.stats.count('games')
+        self.current = None
+        if self.mode == 'level':
+            self.sio.emit('restart_single_player')
+        elif self.mode == 'multiplayer' and self.leader:
+            self.sio.emit('restart_game', {'room': self.room})
+
+    def play(self):
+        if not self.running or self.sent is not None or self.board is None or self.current != self.sid:
+            return
+        index = MoveIndex(self.board)
+        if not index:
+            return  # Сервер перемешает поле и пришлет board_reshuffled
+        row1, col1, row2, col2 = move_cells(self.rng.choice(sorted(index.moves)), self.board.width)
+        if self.think:
+            time.sleep(self.rng.uniform(0, 2 * self.think))
+        self.sent = time.perf_counter()
+        self.sio.emit('make_move', {'room': self.room, 'from': {'row': row1, 'col': col1},
+                                    'to': {'row': row2, 'col': col2}})
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(timeout=30.0, **settings):
+    """Запускает server.py на свободном порту; settings - дополнительные переменные окружения.
+
+    Возвращает (процесс, адрес).
+    """
+    port = free_port()
+    env = {**os.environ, 'PORT': str(port), 'HIGHSCORE_DB': ':memory:', 'AUDIT_DIR': '',
+           'LOG_LEVEL': 'WARNING', 'MAX_ROOMS': '0', **settings}
+    process = subprocess.Popen([sys.executable, 'server.py'], cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + '/health', timeout=1).read()
+            return process, url
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f'server.py завершился с кодом {process.returncode}')
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('server.py не ответил на /health')
+
+
+def run(urls, clients=100, mode='endless', room_size=2, duration=10.0, warmup=2.0,
+        think=0.0, transport='websocket', seed=1):
+    """Нагрузка на серверы urls: n-й клиент подключается к urls[n % len(urls)].
+
+    Соседние игроки одной комнаты мультиплеера попадают на разные серверы.
+    """
+    rng = random.Random(seed)
+    stats = Stats()
+    run_id = uuid.uuid4().hex[:8]
+    players = []
+    for n in range(clients):
+        players.append(Player(urls[n % len(urls)], transport, stats, mode, f'load-{run_id}-{n // room_size}',
+                              room_size, n % room_size == 0, random.Random(rng.getrandbits(32)), think))
+
+    connect_times = []
+    try:
+        for player in players:
+            began = time.perf_counter()
+            player.connect()
+            connect_times.append(time.perf_counter() - began)
+        time.sleep(warmup)
+        stats.recording = True
+        time.sleep(duration)
+        stats.recording = False
+    finally:
+        for player in players:
+            try:
+                player.close()
+            except Exception:
+                pass
+
+    latencies = stats.latencies
+    return {
+        'mode': mode,
+        'servers': len(urls),
+        'clients': clients,
+        'rooms': len({player.room for player in players}),
+        'think_sec': think,
+        'duration_sec': duration,
+        'moves': len(latencies),
+        'moves_per_sec': round(len(latencies) / duration, 1),
+        'move_p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'move_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'move_p999_ms': round(percentile(latencies, 0.999) * 1000, 2),
+        'move_max_ms': round(max(latencies, default=0) * 1000, 2),
+        'connect_p99_ms': round(percentile(connect_times, 0.99) * 1000, 2),
+        'rejected': stats.rejected,
+        'games_finished': stats.games,
+        'errors': stats.errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:10000', help='адреса серверов через запятую')
+    parser.add_argument('--spawn', action='store_true', help='запустить server.py на свободном порту')
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--mode', choices=('endless', 'level', 'multiplayer'), default='endless')
+    parser.add_argument('--room-size', type=int, default=2, help='игроков в комнате мультиплеера')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--think', type=float, default=0.0, help='средняя пауза перед ходом, секунд')
+    parser.add_argument('--transport', choices=('websocket', 'polling'), default='websocket')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    process = None
+    urls = args.url.split(',')
+    if args.spawn:
+        process, url = spawn_server()
+        urls = [url]
+    try:
+        room_size = args.room_size if args.mode == 'multiplayer' else 1
+        report('load', run(urls, args.clients, args.mode, room_size, args.duration, args.warmup,
+                           args.think, args.transport, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
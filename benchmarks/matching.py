@@ -0,0 +1,66 @@
+"""Поиск совпадений после хода: полный проход против проверки затронутых линий.
+
+Совпадение результатов с исходным полным проходом ``legacy.check_matches``
+проверяет tests/test_matching.py.
+"""
+import argparse
+import random
+
+from match3.engine import (
+    check_matches, check_matches_around, create_game_board,
+    changed_lines, remove_matches_and_refill, swap_lines, swap_tiles,
+)
+
+from .common import measure, report
+
+SIZES = [(8, 8), (16, 16)]
+
+
+def random_swap(rng, width, height):
+    """Случайный обмен соседних клеток"""
+    if rng.random() < 0.5:
+        row, col = rng.randrange(height), rng.randrange(width - 1)
+        return row, col, row, col + 1
+    row, col = rng.randrange(height - 1), rng.randrange(width)
+    return row, col, row + 1, col
+
+
+def play_move(board, swap, local):
+    """Делает ход с каскадами; возвращает число проверок поля"""
+    swap_tiles(board, *swap)
+    matches = check_matches_around(board, *swap_lines(*swap)) if local else check_matches(board)
+    if not matches:
+        swap_tiles(board, *swap)
+        return 1
+    scans = 1
+    while matches:
+        changed = remove_matches_and_refill(board, matches)
+        matches = check_matches_around(board, *changed_lines(changed)) if local else check_matches(board)
+        scans += 1
+    return scans
+
+
+def run(min_time=1.0, seed=1):
+    results = []
+    for width, height in SIZES:
+        row = {'size': f'{width}x{height}'}
+        for name, local in (('full_scan', False), ('local_scan', True)):
+            rng = random.Random(seed)
+            random.seed(seed)
+            board = create_game_board(rng, width, height)
+            row[f'{name}_moves_per_sec'] = round(
+                measure(lambda: play_move(board, random_swap(rng, width, height), local), min_time), 1)
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('matching', run(args.min_time, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Подбор соперников: время ожидания и заполненность комнат.
+
+Игроки приходят пуассоновским потоком rate в секунду, у каждого случайная
+корзина уровня (рекорд // ширина корзины). Часть игроков передумывает и
+отменяет поиск. Время идет по искусственным часам с шагом poll секунд,
+как фоновая задача сервера. Замеряются ожидание до комнаты (среднее и
+p95), средний размер комнаты относительно max_players и скорость операций
+очереди, когда в ней тысячи игроков (много узких корзин, например --buckets 2000).
+
+Размеры комнат, отмены и сроки ожидания проверяет tests/test_matchmaking.py.
+"""
+import argparse
+import random
+import time
+
+from match3.matchmaking import Matchmaker, MatchPolicy
+
+from .common import report
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def simulate(policy, rate, buckets, seconds, poll, cancel_rate, seed):
+    rng = random.Random(seed)
+    clock = Clock()
+    matchmaker = Matchmaker(policy, clock)
+    groups = []
+    cancelled = set()
+    queued_at = {}
+    waits = []
+    peak = 0
+    ops = 0
+    player = 0
+    elapsed = 0.0
+
+    for _ in range(int(seconds / poll)):
+        clock.now += poll
+        arrivals = []
+        # Пуассоновский поток: интервалы между приходами распределены экспоненциально
+        moment = rng.expovariate(rate)
+        while moment < poll:
+            arrivals.append(player)
+            player += 1
+            moment += rng.expovariate(rate)
+        leaving = rng.sample(list(queued_at), int(len(queued_at) * cancel_rate))
+        buckets_of = [min(buckets - 1, int(rng.betavariate(2, 2) * buckets)) for _ in arrivals]
+
+        start = time.perf_counter()
+        formed = []
+        for p, bucket in zip(arrivals, buckets_of):
+            formed.extend(matchmaker.enqueue(p, bucket))
+        # Игрок мог попасть в комнату раньше, чем успел отменить поиск
+        leaving = [p for p in leaving if matchmaker.cancel(p)]
+        formed.extend(matchmaker.poll())
+        elapsed += time.perf_counter() - start
+        ops += len(arrivals) + len(leaving) + 1
+
+        for p in arrivals:
+            queued_at[p] = clock.now
+        for p in leaving:
+            cancelled.add(p)
+            queued_at.pop(p)
+        for group in formed:
+            for ticket in group:
+                waits.append(clock.now - queued_at.pop(ticket.player))
+        groups.extend((clock.now, group) for group in formed)
+        peak = max(peak, len(matchmaker))
+    return matchmaker, groups, waits, cancelled, peak, ops, elapsed
+
+
+def run(rate=200.0, buckets=10, seconds=600.0, poll=0.5, cancel_rate=0.01, min_players=2, max_players=4,
+        max_wait=10.0, widen_after=20.0, seed=1):
+    policy = MatchPolicy(min_players, max_players, max_wait, widen_after)
+    matchmaker, groups, waits, _, peak, ops, elapsed = simulate(
+        policy, rate, buckets, seconds, poll, cancel_rate, seed)
+    sizes = [len(group) for _, group in groups]
+    return {
+        'arrivals_per_sec': rate,
+        'buckets': buckets,
+        'max_players': max_players,
+        'max_wait_sec': max_wait,
+        'rooms_formed': len(groups),
+        'wait_avg_sec': round(sum(waits) / len(waits), 2) if waits else 0,
+        'wait_p95_sec': round(percentile(waits, 0.95), 2),
+        'fill_rate': round(sum(sizes) / len(sizes) / max_players, 3) if sizes else 0,
+        'peak_queued': peak,
+        'still_queued': len(matchmaker),
+        'ops_per_sec': round(ops / elapsed) if elapsed else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rate', type=float, default=200.0, help='игроков в секунду')
+    parser.add_argument('--buckets', type=int, default=10)
+    parser.add_argument('--seconds', type=float, default=600.0)
+    parser.add_argument('--poll', type=float, default=0.5)
+    parser.add_argument('--cancel-rate', type=float, default=0.01, help='доля очереди, отменяющая поиск за шаг')
+    parser.add_argument('--max-players', type=int, default=4)
+    parser.add_argument('--max-wait', type=float, default=10.0)
+    parser.add_argument('--widen-after', type=float, default=20.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('matchmaking', run(args.rate, args.buckets, args.seconds, args.poll, args.cancel_rate,
+                              max_players=args.max_players, max_wait=args.max_wait,
+                              widen_after=args.widen_after, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Метрики и журнал: цена записи на горячем пути обработчика.
+
+Замеряются observe гистограммы фазы хода, inc счетчика, четыре отметки
+времени хода (perf_counter и observe на фазу), выборочный json_size
+board_update и запись события в буферизованный журнал (вместе с работой
+потока, который пишет журнал). Также время отрисовки /metrics.
+
+Корзины гистограмм и формат вывода Prometheus проверяет tests/test_metrics.py.
+"""
+import argparse
+import io
+import time
+
+from match3.logs import EventLog, setup_logging
+from match3.metrics import Registry, json_size
+
+from .common import report
+
+
+def per_call_ns(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return round((time.perf_counter() - start) / calls * 1e9)
+
+
+def run(calls=200000):
+    registry = Registry()
+    phases = registry.histograms('move_phase_seconds', 'фазы хода', 'phase', ('validate', 'match', 'cascade', 'emit'))
+    counter = registry.counter('moves_total', 'ходы')
+    histogram = phases['cascade']
+    clock = time.perf_counter
+
+    def move_stamps():
+        started = clock()
+        validated = clock()
+        phases['validate'].observe(validated - started)
+        matched = clock()
+        phases['match'].observe(matched - validated)
+        cascaded = clock()
+        phases['cascade'].observe(cascaded - matched)
+        phases['emit'].observe(clock() - cascaded)
+
+    update = {
+        'seq': 12, 'currentPlayer': 'sid', 'scores': {'sid': 120},
+        'swap': [[3, 4], [3, 5]], 'steps': [[[3, 4, 3, 5, 3, 6], [1, 2, 3]]], 'turnTimeLeft': 25.0,
+    }
+
+    stream = io.StringIO()
+    handler, listener = setup_logging(stream, max_pending=calls * 2, name='match3-benchmark')
+    log = EventLog('match3-benchmark')
+    results = {
+        'histogram_observe_ns': per_call_ns(lambda: histogram.observe(0.0002), calls),
+        'counter_inc_ns': per_call_ns(counter.inc, calls),
+        'move_phase_stamps_ns': per_call_ns(move_stamps, calls),
+        'payload_json_size_ns': per_call_ns(lambda: json_size(update), calls // 10),
+        'log_event_ns': per_call_ns(lambda: log.info('socket_connected', sid='abc'), calls // 10),
+    }
+    listener.stop()
+    results['log_dropped'] = handler.dropped
+
+    start = time.perf_counter()
+    text = registry.render()
+    results['render_us'] = round((time.perf_counter() - start) * 1e6, 1)
+    results['render_bytes'] = len(text)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args()
+    report('metrics', run(args.calls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Индекс ходов: инкрементальное обновление после хода против полного пересчета"""
+import argparse
+import random
+
+from match3.engine import resolve_move
+from match3.moves import MoveIndex, move_cells, playable_board, reshuffle
+
+from .common import measure, report
+
+SIZES = [(8, 8), (16, 16)]
+
+
+def run(min_time=1.0, seed=1):
+    results = []
+    for width, height in SIZES:
+        row = {'size': f'{width}x{height}'}
+        for name, incremental in (('rebuild', False), ('incremental', True)):
+            rng = random.Random(seed)
+            index = MoveIndex(playable_board(rng, width, height))
+
+            def move():
+                if not index:
+                    reshuffle(index.board, rng)
+                    index.rebuild()
+                    return
+                row1, col1, row2, col2 = move_cells(rng.choice(sorted(index.moves)), width)
+                changed = [(row1, col1), (row2, col2)]
+                for step in resolve_move(index.board, row1, col1, row2, col2, rng):
+                    changed.extend(step.changed)
+                if incremental:
+                    index.update(changed)
+                else:
+                    index.rebuild()
+
+            row[f'{name}_moves_per_sec'] = round(measure(move, min_time), 1)
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('move_index', run(args.min_time, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Задержка хода под нагрузкой: вычисления на цикле eventlet против пула.
+
+Каждая из rooms комнат - зеленый поток, который раз в interval секунд
+(со случайным сдвигом) получает ход и обрабатывает его как сервер:
+разрешает каскады через ComputePool, обновляет индекс ходов и кодирует
+шаги. Задержка хода - от момента, когда ход должен был прийти, до конца
+обработки, то есть с учетом ожидания цикла событий. Отдельный поток
+раз в 10 мс замеряет, насколько поздно его будит цикл (как heartbeat).
+
+Требует eventlet (см. requirements.txt).
+"""
+import argparse
+import random
+import time
+
+import eventlet
+from eventlet import tpool
+
+from match3.compute import MODES, ComputePool
+from match3.delta import encode_steps
+from match3.moves import MoveIndex, move_cells, playable_board
+
+from .common import report
+
+HEARTBEAT = 0.01
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def wait_off_hub(future):
+    return tpool.execute(future.result)
+
+
+def room_loop(compute, index, rng, interval, deadline, latencies):
+    board = index.board
+    due = time.perf_counter() + rng.random() * interval
+    while due < deadline:
+        eventlet.sleep(max(0.0, due - time.perf_counter()))
+        if not index:
+            index = MoveIndex(compute.playable_board())
+            board = index.board
+        row1, col1, row2, col2 = move_cells(rng.choice(sorted(index.moves)), board.width)
+        steps = compute.resolve_move(board, row1, col1, row2, col2)
+        index.update([(row1, col1), (row2, col2)] + [cell for step in steps for cell in step.changed])
+        encode_steps(steps)
+        latencies.append(time.perf_counter() - due)
+        due += interval
+
+
+def heartbeat(deadline, lags):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        eventlet.sleep(HEARTBEAT)
+        lags.append(time.perf_counter() - start - HEARTBEAT)
+
+
+def measure_mode(mode, size, rooms, interval, duration, seed):
+    compute = ComputePool(mode, size, None if mode == 'inline' else wait_off_hub)
+    rng = random.Random(seed)
+    indexes = [MoveIndex(playable_board(rng)) for _ in range(rooms)]
+    # Прогрев пула: процессы и потоки создаются до начала замера
+    compute.playable_board()
+
+    latencies, lags = [], []
+    deadline = time.perf_counter() + duration
+    pool = eventlet.GreenPool(rooms + 1)
+    pool.spawn(heartbeat, deadline, lags)
+    for n, index in enumerate(indexes):
+        pool.spawn(room_loop, compute, index, random.Random(f'{seed}:{n}'), interval, deadline, latencies)
+    pool.waitall()
+    compute.shutdown()
+
+    return {
+        'moves_per_sec': round(len(latencies) / duration),
+        'move_p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'move_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'heartbeat_lag_p99_ms': round(percentile(lags, 0.99) * 1000, 2),
+    }
+
+
+def run(rooms=1000, interval=1.0, duration=10.0, size=None, modes=MODES, seed=1):
+    tpool.set_num_threads(max(20, size or 0))
+    return {
+        'rooms': rooms,
+        'interval_sec': interval,
+        'pool_size': size,
+        'modes': {mode: measure_mode(mode, size, rooms, interval, duration, seed) for mode in modes},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rooms', type=int, default=1000)
+    parser.add_argument('--interval', type=float, default=1.0, help='секунд между ходами в комнате')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--pool-size', type=int, default=None)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('offload', run(args.rooms, args.interval, args.duration, args.pool_size,
+                          args.modes.split(','), args.seed))
+
+
+if __name__ == '__main__':
+    main()
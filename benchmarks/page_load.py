@@ -0,0 +1,86 @@
+"""Загрузка страницы /: встроенный HTML без сжатия против собранного и сжатого клиента.
+
+Байты считаются по телам ответов: первый визит - index.html и файлы с
+хешем в адресе, повторный - только 304 на index.html (CSS и JS берутся из
+кеша браузера). Запросы в секунду измеряются через тестовый клиент Flask
+на приложении server.py; прежняя страница регистрируется в нем же, а /health
+- цену короткого ответа через то же приложение.
+"""
+import argparse
+import os
+
+from match3.assets import CLIENT_DIR, HAVE_BROTLI, build_assets
+
+from .common import measure, report
+
+
+def inline_page(directory=CLIENT_DIR):
+    """Страница в прежнем виде: CSS и JS встроены в HTML"""
+    def read(name):
+        with open(f'{directory}/{name}', encoding='utf-8') as f:
+            return f.read()
+    page = read('index.html')
+    page = page.replace('<link rel="stylesheet" href="{{ app_css }}">', f'<style>\n{read("app.css")}</style>')
+    return page.replace('<script src="{{ app_js }}"></script>', f'<script>\n{read("app.js")}</script>')
+
+
+def page_bytes(encoding):
+    index, assets = build_assets()
+
+    def size(asset):
+        return len(asset.variants[asset.negotiate(lambda name: name == encoding)])
+
+    return size(index) + sum(size(asset) for asset in assets.values())
+
+
+def requests_per_second(min_time):
+    # server.py читает настройки при импорте: бенчмарку не нужны ни база рекордов, ни архив партий
+    os.environ.setdefault('HIGHSCORE_DB', ':memory:')
+    os.environ.setdefault('AUDIT_DIR', '')
+
+    from server import app, client_index
+
+    # Прежняя страница отдается тем же приложением: обе стороны проходят одни и те же
+    # обертки (Flask-SocketIO, обработчики запроса), различается только сам ответ
+    page = inline_page()
+    app.add_url_rule('/legacy-inline', 'legacy_inline', lambda: page)
+
+    client = app.test_client()
+    gzip_headers = {'Accept-Encoding': 'gzip, br'}
+    revalidate = {'Accept-Encoding': 'gzip, br',
+                  'If-None-Match': f'"{client_index.etag(client_index.negotiate(lambda name: True))}"'}
+    return {
+        'before': round(measure(lambda: client.get('/legacy-inline'), min_time)),
+        'after': round(measure(lambda: client.get('/', headers=gzip_headers), min_time)),
+        'after_304': round(measure(lambda: client.get('/', headers=revalidate), min_time)),
+        'health': round(measure(lambda: client.get('/health'), min_time)),
+    }
+
+
+def run(min_time=1.0, skip_rps=False):
+    first_visit = {'identity': page_bytes(None), 'gzip': page_bytes('gzip')}
+    if HAVE_BROTLI:
+        first_visit['br'] = page_bytes('br')
+    results = {
+        'bytes_per_load': {
+            'before': len(inline_page().encode('utf-8')),
+            'after_first_visit': first_visit,
+            # 304 без тела, CSS и JS не запрашиваются
+            'after_repeat_visit': 0,
+        },
+    }
+    if not skip_rps:
+        results['requests_per_sec'] = requests_per_second(min_time)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--skip-rps', action='store_true', help='только размеры, без запуска Flask')
+    args = parser.parse_args()
+    report('page_load', run(args.min_time, args.skip_rps))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Размер board_update: полное поле с игроками против шагов каскада"""
+import argparse
+import json
+import random
+
+from match3.delta import encode_steps
+from match3.engine import resolve_move
+from match3.moves import MoveIndex, move_cells, playable_board, reshuffle
+
+from .common import report
+
+
+def room_players(count):
+    return {f'sid-{n:016d}': {'name': f'Игрок {n}', 'score': 0, 'position': n + 1} for n in range(count)}
+
+
+def run(moves=5000, players=4, seed=1):
+    rng = random.Random(seed)
+    index = MoveIndex(playable_board(rng))
+    board = index.board
+    roster = room_players(players)
+    sids = list(roster)
+    full_bytes = delta_bytes = 0
+    for seq in range(1, moves + 1):
+        if not index:
+            reshuffle(board, rng)
+            index.rebuild()
+        row1, col1, row2, col2 = move_cells(rng.choice(sorted(index.moves)), board.width)
+        steps = resolve_move(board, row1, col1, row2, col2, rng)
+        index.update([(row1, col1), (row2, col2)] + [cell for step in steps for cell in step.changed])
+        mover = sids[seq % players]
+        roster[mover]['score'] += sum(len(step.matches) for step in steps) * 10
+
+        full = {'board': board.to_names(), 'seq': seq, 'currentPlayer': mover,
+                'players': roster, 'matches': steps[0].matches}
+        delta = {'seq': seq, 'currentPlayer': mover, 'scores': {mover: roster[mover]['score']},
+                 'swap': [[row1, col1], [row2, col2]], 'steps': encode_steps(steps)}
+        full_bytes += len(json.dumps(full, ensure_ascii=False).encode())
+        delta_bytes += len(json.dumps(delta, ensure_ascii=False).encode())
+
+    return {
+        'moves': moves,
+        'players': players,
+        'full_bytes_per_move': round(full_bytes / moves, 1),
+        'delta_bytes_per_move': round(delta_bytes / moves, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--moves', type=int, default=5000)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('payloads', run(args.moves, args.players, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Цена профилирования: ходы в секунду с работающим SamplingProfiler и без него.
+
+Ходы делаются как в benchmarks.engine (resolve_move и индекс ходов) через
+HandlerTimer.call - так их вызывает актор комнаты. Замеряется:
+
+* baseline - HandlerTimer выключен, профилировщик не работает;
+* sampled_<rate> - замер каждого 1/rate-го вызова;
+* profiler_<interval> - профилировщик снимает стеки раз в interval секунд.
+
+Метки событий в выборках и свернутые стеки проверяет tests/test_profiling.py.
+"""
+import argparse
+import random
+import threading
+import time
+
+from match3.metrics import Registry
+from match3.profiling import HandlerTimer, SamplingProfiler
+
+from .common import measure, report
+from .engine import Game
+
+
+def timer(rate=0.0, profiler=None):
+    histograms = Registry().histograms('handler_seconds', 'обработчики', 'event', ('make_move',))
+    return HandlerTimer(histograms, rate, profiler=profiler)
+
+
+def moves_per_sec(handler_timer, min_time, seed):
+    game = Game(random.Random(seed), 8, 8)
+    return round(measure(lambda: handler_timer.call('make_move', game.move, ()), min_time), 1)
+
+
+def run(min_time=1.0, rates=(0.01, 1.0), intervals=(0.01, 0.005, 0.001), seed=1):
+    baseline = moves_per_sec(timer(), min_time, seed)
+    results = {'baseline_moves_per_sec': baseline}
+    for rate in rates:
+        speed = moves_per_sec(timer(rate), min_time, seed)
+        results[f'sampled_{rate}'] = {'moves_per_sec': speed, 'overhead_pct': round((1 - speed / baseline) * 100, 2)}
+    for interval in intervals:
+        profiler = SamplingProfiler(interval)
+        profiler.start(threads={threading.get_ident()})
+        speed = moves_per_sec(timer(0.0, profiler), min_time, seed)
+        profile = profiler.stop()
+        results[f'profiler_{interval}'] = {
+            'moves_per_sec': speed,
+            'overhead_pct': round((1 - speed / baseline) * 100, 2),
+            'samples': profile.samples,
+            'stacks': len(profile.stacks),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('profiling', run(args.min_time, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Повтор законченных партий по журналам: сколько партий в секунду проверяет пакетная задача.
+
+Партии играются так же, как на сервере: поле и новые фишки из генератора
+партии, ход выбирается случайно среди доступных, после хода без
+доступных ходов поле перемешивается. Игроки ходят по очереди. Затем все
+журналы повторяются через match3.replay, в одном процессе и в пуле
+процессов по --workers.
+
+Поле и очки повтора сверяет с сыгранной партией tests/test_replay.py.
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from match3.engine import resolve_move
+from match3.moves import MoveIndex, move_cells, playable_board, reshuffle
+from match3.replay import POINTS_PER_TILE, GameLog, replay_many
+
+from .common import report
+
+
+def play(seed, moves, players, finish):
+    """Играет партию; возвращает журнал, итоговое поле и очки"""
+    log = GameLog(seed, 'multiplayer' if players > 1 else 'endless')
+    rng = log.rng()
+    picker = random.Random(seed ^ 0x5EED)
+    index = MoveIndex(playable_board(rng))
+    board = index.board
+    scores = [0] * players
+    for number in range(moves):
+        slot = log.slot(number % players, f'player-{number % players}')
+        code = picker.choice(sorted(index.moves))
+        row1, col1, row2, col2 = move_cells(code, board.width)
+        steps = resolve_move(board, row1, col1, row2, col2, rng)
+        log.record(slot, code)
+        changed = [(row1, col1), (row2, col2)]
+        for step in steps:
+            changed.extend(step.changed)
+            scores[slot] += len(step.matches) * POINTS_PER_TILE
+        index.update(changed)
+        if finish and number == moves - 1:
+            # Партия кончилась этим ходом - поле больше не перемешивается
+            log.no_reshuffle = not index
+        elif not index:
+            reshuffle(board, rng)
+            index.rebuild()
+    return log, board, scores
+
+
+def _replay_chunk(chunk):
+    logs = [GameLog(seed, mode, players, moves, count, no_reshuffle)
+            for seed, mode, players, moves, count, no_reshuffle in chunk]
+    return sum(sum(result.scores) for result in replay_many(logs))
+
+
+def replay_parallel(logs, workers, chunk_size=200):
+    """Повтор в пуле процессов: журналы уходят пачками как кортежи полей"""
+    rows = [(log.seed, log.mode, log.players, bytes(log.moves), log.count, log.no_reshuffle) for log in logs]
+    chunks = [rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size)]
+    with ProcessPoolExecutor(workers) as pool:
+        return sum(pool.map(_replay_chunk, chunks))
+
+
+def run(games=2000, moves=50, players=2, workers=None, seed=1):
+    played = [play(seed * 1_000_003 + n, moves, players, finish=True) for n in range(games)]
+    logs = [log for log, _, _ in played]
+
+    start = time.perf_counter()
+    replay_many(logs)
+    serial = time.perf_counter() - start
+
+    results = {
+        'games': games,
+        'moves_per_game': moves,
+        'log_bytes_per_game': round(sum(len(log.moves) for log in logs) / games + 8, 1),
+        'serial_games_per_sec': round(games / serial),
+        'serial_moves_per_sec': round(games * moves / serial),
+    }
+    if workers:
+        start = time.perf_counter()
+        replay_parallel(logs, workers)
+        results[f'pool_{workers}_games_per_sec'] = round(games / (time.perf_counter() - start))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--moves', type=int, default=50, help='ходов в партии')
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=None, help='размер пула процессов (по умолчанию без пула)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('replay', run(args.games, args.moves, args.players, args.workers, args.seed))
+
+
+if __name__ == '__main__':
+    main()
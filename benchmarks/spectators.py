@@ -0,0 +1,136 @@
+"""Зрители горячей комнаты: сколько отправок и байт стоит рассылка при разных уровнях.
+
+В комнате идет партия с темпом --moves-per-sec, ее смотрят --spectators
+зрителей. Сравниваются:
+
+* per_socket - отдельная отправка полного поля каждому зрителю (как если
+  бы зрители сидели в комнате игроков по одному);
+* live - живой уровень: одна отправка шагов каскада в комнату зрителей;
+* throttled_<N>hz - прореженный уровень: снимок поля не чаще N раз в секунду.
+
+encodes - сколько раз сервер сериализует сообщение, deliveries - сколько
+сообщений уходит в сокеты. Размеры сообщений берутся из настоящих ходов.
+Время идет по искусственным часам; отдельно замеряется цена
+Spectators.changed на ход.
+
+Частоту снимков и последнее состояние после последнего хода проверяет
+tests/test_spectators.py.
+"""
+import argparse
+import json
+import random
+import time
+
+from match3.delta import encode_steps
+from match3.engine import resolve_move
+from match3.moves import MoveIndex, move_cells, playable_board, reshuffle
+from match3.spectators import RATES, Spectators
+from match3.timers import TimerWheel
+
+from .common import report
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def payload_sizes(moves, seed):
+    """Средние размеры board_update с шагами каскада и снимка полного поля в JSON"""
+    rng = random.Random(seed)
+    index = MoveIndex(playable_board(rng))
+    board = index.board
+    delta = snapshot = 0
+    for _ in range(moves):
+        if not index:
+            reshuffle(board, rng)
+            index.rebuild()
+        row1, col1, row2, col2 = move_cells(rng.choice(sorted(index.moves)), board.width)
+        steps = resolve_move(board, row1, col1, row2, col2, rng)
+        changed = [(row1, col1), (row2, col2)] + [cell for step in steps for cell in step.changed]
+        index.update(changed)
+        delta += len(json.dumps({'seq': 1, 'swap': [[row1, col1], [row2, col2]], 'steps': encode_steps(steps)}))
+        snapshot += len(json.dumps({'seq': 1, 'board': board.to_names()}, ensure_ascii=False))
+    return delta / moves, snapshot / moves
+
+
+def simulate(rate, moves_per_sec, seconds, seed, tick=0.05):
+    """Снимки одного прореженного уровня: список (время, номер хода)"""
+    rng = random.Random(seed)
+    clock = Clock()
+    wheel = TimerWheel(tick=tick, clock=clock)
+    state = {'seq': 0}
+    sent = []
+    spectators = Spectators(wheel, lambda room, tier: sent.append((clock.now, state['seq'])))
+    spectators.watch('viewer', 'room', 'delta', rate)
+    end = clock.now + seconds
+    while clock.now < end:
+        clock.now += rng.expovariate(moves_per_sec)
+        wheel.advance()
+        state['seq'] += 1
+        spectators.changed('room')
+    # Ходов больше нет: дожидаемся последнего снимка
+    clock.now += 1.0 / rate + tick
+    wheel.advance()
+    return sent
+
+
+def run(spectators=2000, moves_per_sec=2.0, seconds=60.0, rates=RATES, seed=1):
+    delta_size, snapshot_size = payload_sizes(200, seed)
+    moves = moves_per_sec * seconds
+    results = {
+        'spectators': spectators,
+        'moves_per_sec': moves_per_sec,
+        'delta_bytes': round(delta_size),
+        'snapshot_bytes': round(snapshot_size),
+        'per_socket': {
+            'encodes_per_sec': round(spectators * moves / seconds),
+            'deliveries_per_sec': round(spectators * moves / seconds),
+            'mb_per_sec': round(spectators * moves * snapshot_size / seconds / (1 << 20), 2),
+        },
+        'live': {
+            'encodes_per_sec': round(moves / seconds, 2),
+            'deliveries_per_sec': round(spectators * moves / seconds),
+            'mb_per_sec': round(spectators * moves * delta_size / seconds / (1 << 20), 2),
+        },
+    }
+    for rate in rates:
+        sent = simulate(rate, moves_per_sec, seconds, seed)
+        results[f'throttled_{rate}hz'] = {
+            'encodes_per_sec': round(len(sent) / seconds, 2),
+            'deliveries_per_sec': round(spectators * len(sent) / seconds),
+            'mb_per_sec': round(spectators * len(sent) * snapshot_size / seconds / (1 << 20), 2),
+        }
+
+    # Цена учета хода для комнаты с прореженным уровнем
+    clock = Clock()
+    wheel = TimerWheel(clock=clock)
+    tracker = Spectators(wheel, lambda room, tier: None)
+    for n in range(spectators):
+        tracker.watch(n, 'room', 'delta', rates[n % len(rates)])
+    calls = 100000
+    start = time.perf_counter()
+    for n in range(calls):
+        clock.now += 0.01
+        tracker.changed('room')
+        if n % 10 == 0:
+            wheel.advance()
+    results['changed_ns_per_move'] = round((time.perf_counter() - start) / calls * 1e9)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--spectators', type=int, default=2000)
+    parser.add_argument('--moves-per-sec', type=float, default=2.0)
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('spectators', run(args.spectators, args.moves_per_sec, args.seconds, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Колесо таймеров с десятками тысяч ожидающих дедлайнов ходов.
+
+Моделируются rooms комнат с таймером хода turn_time секунд: каждая
+комната ставит таймер, за тик часть комнат делает ход (таймер
+отменяется и ставится заново), остальные таймеры истекают и тоже
+перезапускаются. Время идет по искусственным часам, замеряются только
+операции планировщика. Для сравнения та же нагрузка прогоняется на
+куче heapq с ленивой отменой.
+
+Срабатывание не раньше дедлайна и не позже следующего тика проверяет
+tests/test_timers.py.
+"""
+import argparse
+import heapq
+import random
+import time
+
+from match3.timers import TimerWheel
+
+from .common import report
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class HeapScheduler:
+    """Куча (дедлайн, номер, таймер) с ленивой отменой - базовый вариант для сравнения"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._heap = []
+        self._counter = 0
+
+    def schedule(self, delay, callback, *args):
+        timer = [self.clock() + delay, callback, args, True]
+        self._counter += 1
+        heapq.heappush(self._heap, (timer[0], self._counter, timer))
+        return timer
+
+    def cancel(self, timer):
+        timer[3] = False
+
+    def advance(self, now=None):
+        now = self.clock() if now is None else now
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, timer = heapq.heappop(heap)
+            if timer[3]:
+                timer[3] = False
+                timer[1](*timer[2])
+
+
+def simulate(make_scheduler, rooms, turn_time, tick, seconds, move_rate, seed):
+    rng = random.Random(seed)
+    clock = Clock()
+    scheduler = make_scheduler(clock)
+    handles = [None] * rooms
+    expired = [0]
+
+    def expire(room):
+        expired[0] += 1
+        handles[room] = scheduler.schedule(turn_time, expire, room)
+
+    ops = 0
+    start = time.perf_counter()
+    for room in range(rooms):
+        handles[room] = scheduler.schedule(rng.uniform(0, turn_time), expire, room)
+        ops += 1
+    moves_per_tick = int(rooms * move_rate * tick)
+    for _ in range(int(seconds / tick)):
+        clock.now += tick
+        for room in rng.sample(range(rooms), moves_per_tick):
+            scheduler.cancel(handles[room])
+            handles[room] = scheduler.schedule(turn_time, expire, room)
+        ops += 2 * moves_per_tick
+        scheduler.advance()
+    elapsed = time.perf_counter() - start
+    return {
+        'ops_per_sec': round((ops + expired[0]) / elapsed),
+        'sec_per_simulated_sec': round(elapsed / seconds, 5),
+        'expired': expired[0],
+    }
+
+
+def run(rooms=50000, turn_time=30.0, tick=0.1, seconds=120.0, move_rate=0.1, seed=1):
+    params = (rooms, turn_time, tick, seconds, move_rate, seed)
+    return {
+        'rooms': rooms,
+        'turn_time': turn_time,
+        'moves_per_room_per_sec': move_rate,
+        'wheel': simulate(lambda clock: TimerWheel(tick=tick, clock=clock), *params),
+        'heap': simulate(HeapScheduler, *params),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rooms', type=int, default=50000)
+    parser.add_argument('--turn-time', type=float, default=30.0)
+    parser.add_argument('--tick', type=float, default=0.1)
+    parser.add_argument('--seconds', type=float, default=120.0)
+    parser.add_argument('--move-rate', type=float, default=0.1, help='ходов в секунду на комнату')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('timers', run(args.rooms, args.turn_time, args.tick, args.seconds, args.move_rate, args.seed))
+
+
+if __name__ == '__main__':
+    main()
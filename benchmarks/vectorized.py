@@ -0,0 +1,56 @@
+"""Пакетная симуляция: NumPy-движок против скалярного на одинаковых потоках фишек.
+
+Побитовое совпадение полей и результатов ходов обоих движков проверяет
+tests/test_vectorized.py.
+"""
+import argparse
+import random
+import time
+
+from match3.engine import create_game_board
+from match3.vectorized import HAVE_NUMPY, NumpyBatch, ScalarBatch, random_streams
+
+from .common import report
+from .matching import random_swap
+
+STREAM_LENGTH = 4096
+
+
+def make_inputs(count, moves, seed, width=8, height=8):
+    rng = random.Random(seed)
+    boards = [create_game_board(rng, width, height) for _ in range(count)]
+    swaps = [[random_swap(rng, width, height) for _ in range(count)] for _ in range(moves)]
+    return boards, swaps, random_streams(count, STREAM_LENGTH, seed)
+
+
+def moves_per_sec(batch_type, count, moves, seed):
+    boards, swaps, streams = make_inputs(count, moves, seed)
+    batch = batch_type(boards, streams)
+    start = time.perf_counter()
+    for move in swaps:
+        batch.play(move)
+    return count * moves / (time.perf_counter() - start)
+
+
+def run(count=10000, moves=20, seed=1):
+    results = {
+        'boards': count,
+        'moves_per_board': moves,
+        'scalar_moves_per_sec': round(moves_per_sec(ScalarBatch, count, moves, seed), 1),
+    }
+    if HAVE_NUMPY:
+        results['numpy_moves_per_sec'] = round(moves_per_sec(NumpyBatch, count, moves, seed), 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boards', type=int, default=10000)
+    parser.add_argument('--moves', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('vectorized', run(args.boards, args.moves, args.seed))
+
+
+if __name__ == '__main__':
+    main()
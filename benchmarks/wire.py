@@ -0,0 +1,54 @@
+"""Бинарный формат против JSON: размер и скорость кодирования поля и хода.
+
+Кодирование без потерь проверяет tests/test_wire.py.
+"""
+import argparse
+import json
+import random
+
+from match3.board import Board
+from match3.moves import MoveIndex, move_cells, playable_board
+from match3.wire import decode_board, decode_move, encode_board, encode_move
+
+from .common import measure, report
+
+
+def run(min_time=1.0, seed=1):
+    rng = random.Random(seed)
+    board = playable_board(rng)
+    row1, col1, row2, col2 = move_cells(min(MoveIndex(board).moves), board.width)
+    move = {'room': 'room-0001', 'from': {'row': row1, 'col': col1}, 'to': {'row': row2, 'col': col2}}
+
+    json_board = json.dumps(board.to_names())
+    packed_board = encode_board(board)
+    json_move = json.dumps(move)
+    packed_move = encode_move(row1, col1, row2, col2, board.width)
+
+    return {
+        'board_bytes': {'json': len(json_board), 'binary': len(packed_board)},
+        'move_bytes': {'json': len(json_move), 'binary': len(packed_move)},
+        'board_encode_per_sec': {
+            'json': round(measure(lambda: json.dumps(board.to_names()), min_time)),
+            'binary': round(measure(lambda: encode_board(board), min_time)),
+        },
+        'board_decode_per_sec': {
+            'json': round(measure(lambda: Board.from_names(json.loads(json_board)), min_time)),
+            'binary': round(measure(lambda: decode_board(packed_board), min_time)),
+        },
+        'move_decode_per_sec': {
+            'json': round(measure(lambda: json.loads(json_move), min_time)),
+            'binary': round(measure(lambda: decode_move(packed_move, board.width), min_time)),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--min-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report('wire', run(args.min_time, args.seed))
+
+
+if __name__ == '__main__':
+    main()
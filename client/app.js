@@ -0,0 +1,699 @@
+let socket = null;
+let currentRoom = '';
+let myPlayerId = '';
+let myPlayerName = '';
+let currentPlayer = '';
+let gameBoard = [];
+let boardSeq = 0;
+let turnDeadline = null;
+let turnTicker = null;
+let boardAnimation = 0;
+// Бинарный формат поля и ходов включается параметром страницы ?wire=binary
+const wireBinary = new URLSearchParams(window.location.search).get('wire') === 'binary';
+const TILE_NAMES = [null, 'red', 'blue', 'green', 'yellow', 'purple'];
+let selectedTile = null;
+let players = {};
+let gameActive = false;
+let isSinglePlayer = false;
+let selectedGameMode = '';
+let levelData = {
+    level: 1,
+    name: '',
+    goals: [],
+    targetScore: 0,
+    score: 0,
+    movesLeft: 0
+};
+const TILE_LABELS = {
+    red: 'красных',
+    blue: 'синих',
+    green: 'зеленых',
+    yellow: 'желтых',
+    purple: 'фиолетовых'
+};
+let highscoreData = {
+    currentScore: 0,
+    personalBest: 0
+};
+
+function showGameModes() {
+    myPlayerName = document.getElementById('playerName').value.trim() || 'Игрок';
+
+    if (myPlayerName.length === 0) {
+        alert('Пожалуйста, введите ваше имя');
+        return;
+    }
+
+    document.getElementById('singlePlayerInfo').classList.remove('hidden');
+    document.getElementById('gameModeSelect').classList.remove('hidden');
+    document.getElementById('connectSection').classList.add('hidden');
+}
+
+function hideGameModes() {
+    document.getElementById('gameModeSelect').classList.add('hidden');
+    document.getElementById('connectSection').classList.remove('hidden');
+    document.getElementById('singlePlayerInfo').classList.add('hidden');
+}
+
+function selectGameMode(mode) {
+    selectedGameMode = mode;
+    document.getElementById('startModeBtn').disabled = false;
+
+    // Убираем выделение со всех options
+    document.querySelectorAll('.mode-option').forEach(opt => {
+        opt.classList.remove('selected');
+    });
+
+    // Выделяем выбранный option
+    event.currentTarget.classList.add('selected');
+}
+
+function startSelectedGameMode() {
+    if (!selectedGameMode) {
+        alert('Пожалуйста, выберите режим игры');
+        return;
+    }
+
+    // Создаем уникальное имя комнаты для одиночной игры
+    currentRoom = 'singleplayer-' + selectedGameMode + '-' + Date.now();
+    isSinglePlayer = true;
+
+    document.getElementById('singlePlayerInfo').classList.remove('hidden');
+
+    if (socket) {
+        socket.disconnect();
+    }
+
+    socket = connectSocket();
+
+    setupSocketListeners();
+
+    socket.on('connect', function() {
+        updateStatus('Запуск игры...', 'playing');
+        socket.emit('join_single_player', { 
+            playerName: myPlayerName,
+            gameMode: selectedGameMode,
+            protocol: 'delta'
+        });
+    });
+}
+
+function connectToGame() {
+    currentRoom = document.getElementById('roomInput').value.trim() || 'default';
+    myPlayerName = document.getElementById('playerName').value.trim() || 'Игрок';
+
+    if (myPlayerName.length === 0) {
+        alert('Пожалуйста, введите ваше имя');
+        return;
+    }
+
+    isSinglePlayer = false;
+    document.getElementById('singlePlayerInfo').classList.add('hidden');
+
+    if (socket) {
+        socket.disconnect();
+    }
+
+    socket = connectSocket();
+
+    setupSocketListeners();
+
+    socket.on('connect', function() {
+        updateStatus('Подключено к серверу', 'playing');
+        socket.emit('join_room', { 
+            room: currentRoom,
+            playerName: myPlayerName,
+            protocol: 'delta'
+        });
+    });
+}
+
+function watchRoom() {
+    currentRoom = document.getElementById('roomInput').value.trim() || 'default';
+    isSinglePlayer = false;
+    document.getElementById('singlePlayerInfo').classList.add('hidden');
+
+    if (socket) {
+        socket.disconnect();
+    }
+
+    socket = connectSocket();
+
+    setupSocketListeners();
+
+    socket.on('watching', function(data) {
+        myPlayerId = null;
+        players = data.players;
+        gameBoard = data.board;
+        boardSeq = data.seq;
+        currentPlayer = data.currentPlayer;
+        gameActive = data.gameActive;
+        setTurnTimer(data.turnTimeLeft);
+
+        updateStatus('Вы смотрите игру. Зрителей: ' + data.spectators, 'waiting');
+        document.getElementById('connectSection').classList.add('hidden');
+        document.getElementById('gameSection').classList.remove('hidden');
+
+        updatePlayersBoard();
+        updateBoard();
+        updateGameStatus();
+    });
+
+    socket.on('connect', function() {
+        socket.emit('watch_room', {
+            room: currentRoom,
+            protocol: 'delta'
+        });
+    });
+}
+
+function findMatch() {
+    myPlayerName = document.getElementById('playerName').value.trim() || 'Игрок';
+    isSinglePlayer = false;
+    document.getElementById('singlePlayerInfo').classList.add('hidden');
+
+    if (socket) {
+        socket.disconnect();
+    }
+
+    socket = connectSocket();
+
+    setupSocketListeners();
+
+    socket.on('matchmaking', function(data) {
+        if (data.queued) {
+            updateStatus('Ищем соперников... В очереди: ' + data.waiting, 'waiting');
+        }
+    });
+
+    socket.on('match_found', function(data) {
+        currentRoom = data.room;
+        updateStatus('Соперники найдены! Игроков: ' + data.players, 'playing');
+    });
+
+    socket.on('connect', function() {
+        socket.emit('find_match', {
+            playerName: myPlayerName,
+            protocol: 'delta'
+        });
+    });
+}
+
+function setupSocketListeners() {
+    socket.on('joined', function(data) {
+        myPlayerId = data.playerId;
+        players = data.players;
+        gameBoard = data.board;
+        boardSeq = data.seq;
+        currentPlayer = data.currentPlayer;
+        gameActive = data.gameActive;
+        setTurnTimer(data.turnTimeLeft);
+
+        updateStatus(data.message, 'playing');
+        document.getElementById('connectSection').classList.add('hidden');
+        document.getElementById('gameSection').classList.remove('hidden');
+
+        updatePlayersBoard();
+        if (gameActive) {
+            updateBoard();
+            updateGameStatus();
+        }
+    });
+
+    socket.on('player_joined', function(data) {
+        players = data.players;
+        updatePlayersBoard();
+        updateStatus(`Игрок ${data.playerName} присоединился! (${Object.keys(players).length}/4 игроков)`, 'playing');
+    });
+
+    socket.on('player_left', function(data) {
+        players = data.players;
+        if (data.currentPlayer) {
+            currentPlayer = data.currentPlayer;
+        }
+        setTurnTimer(data.turnTimeLeft);
+        updatePlayersBoard();
+        updateStatus(`Игрок ${data.playerName} покинул игру`, 'waiting');
+    });
+
+    socket.on('room_closed', function(data) {
+        gameActive = false;
+        updateStatus('Комната закрыта: игра долго простаивала', 'waiting');
+    });
+
+    socket.on('game_start', function(data) {
+        gameBoard = data.board;
+        boardSeq = data.seq;
+        currentPlayer = data.currentPlayer;
+        gameActive = true;
+        setTurnTimer(data.turnTimeLeft);
+        updateBoard();
+        updateGameStatus();
+    });
+
+    socket.on('turn_skipped', function(data) {
+        currentPlayer = data.currentPlayer;
+        setTurnTimer(data.turnTimeLeft);
+        updateGameStatus();
+        if (data.skippedPlayer === myPlayerId) {
+            updateStatus('Время хода истекло - ход перешел к следующему игроку', 'waiting');
+        }
+    });
+
+    socket.on('board_update', function(data) {
+        if (data.board instanceof ArrayBuffer) {
+            Object.keys(data.scores).forEach(playerId => {
+                if (players[playerId]) {
+                    players[playerId].score = data.scores[playerId];
+                }
+            });
+            boardAnimation++;
+            gameBoard = decodeBoard(data.board);
+            updateBoard();
+            animateMatches(decodeCells(data.matches, gameBoard[0].length));
+        } else if (data.steps) {
+            // Разностное обновление: пропущенный номер - запрашиваем полный снимок
+            if (data.seq !== boardSeq + 1) {
+                socket.emit('resync');
+                return;
+            }
+            Object.keys(data.scores).forEach(playerId => {
+                if (players[playerId]) {
+                    players[playerId].score = data.scores[playerId];
+                }
+            });
+            applySteps(data.swap, data.steps);
+        } else {
+            boardAnimation++;
+            gameBoard = data.board;
+            players = data.players;
+            updateBoard();
+        }
+        boardSeq = data.seq;
+        currentPlayer = data.currentPlayer;
+        setTurnTimer(data.turnTimeLeft);
+        updatePlayersBoard();
+        updateGameStatus();
+
+        // Обновляем данные уровня, если это режим уровня
+        if (data.levelData) {
+            levelData = data.levelData;
+            updateLevelInfo();
+        }
+
+        // Обновляем данные рекордов, если это бесконечный режим
+        if (data.highscoreData) {
+            highscoreData = data.highscoreData;
+            updateHighscoreInfo();
+        }
+
+        // Анимация для совпадений
+        if (data.matches && data.matches.length > 0) {
+            animateMatches(data.matches);
+        }
+    });
+
+    socket.on('board_snapshot', function(data) {
+        boardAnimation++;
+        gameBoard = data.board;
+        boardSeq = data.seq;
+        currentPlayer = data.currentPlayer;
+        players = data.players;
+        setTurnTimer(data.turnTimeLeft);
+        updateBoard();
+        updatePlayersBoard();
+        updateGameStatus();
+    });
+
+    socket.on('board_reshuffled', function(data) {
+        boardAnimation++;
+        gameBoard = data.board;
+        boardSeq = data.seq;
+        updateBoard();
+        updateStatus('Ходов не осталось - поле перемешано', 'playing');
+    });
+
+    socket.on('hint', function(data) {
+        [data.from, data.to].forEach(({ row, col }) => {
+            const tile = document.querySelector(`[data-row="${row}"][data-col="${col}"]`);
+            if (tile) {
+                tile.classList.add('hint');
+                setTimeout(() => {
+                    tile.classList.remove('hint');
+                }, 1000);
+            }
+        });
+    });
+
+    socket.on('move_result', function(data) {
+        if (!data.valid) {
+            alert('Неверный ход! ' + data.message);
+        }
+    });
+
+    socket.on('game_over', function(data) {
+        gameActive = false;
+        setTurnTimer(null);
+        let message = '';
+
+        if (data.winner === myPlayerId) {
+            message = '🎉 Поздравляем! Вы победили! 🎉';
+        } else if (data.winner === 'draw') {
+            message = 'Ничья!';
+        } else if (data.winner === 'level_completed') {
+            message = '🎉 Уровень пройден! Отличная работа! 🎉';
+        } else if (data.winner === 'level_failed') {
+            message = '❌ Уровень не пройден. Попробуйте еще раз!';
+        } else {
+            const winnerName = players[data.winner]?.name || 'Неизвестный игрок';
+            message = `Победил ${winnerName}! Сыграем еще?`;
+        }
+
+        updateStatus(message, 'playing');
+
+        // Автоперезапуск через 5 секунд
+        setTimeout(() => {
+            if (isSinglePlayer) {
+                socket.emit('restart_single_player');
+            } else {
+                socket.emit('restart_game', { room: currentRoom });
+            }
+        }, 5000);
+    });
+
+    socket.on('single_player_started', function(data) {
+        myPlayerId = data.playerId;
+        players = data.players;
+        gameBoard = data.board;
+        boardSeq = data.seq;
+        currentPlayer = data.currentPlayer;
+        gameActive = true;
+
+        // Показываем соответствующую информацию для выбранного режима
+        if (data.gameMode === 'level') {
+            document.getElementById('levelInfo').classList.remove('hidden');
+            document.getElementById('highscoreInfo').classList.add('hidden');
+            levelData = data.levelData;
+            updateLevelInfo();
+            // В начале партии movesLeft - это лимит ходов уровня
+            document.getElementById('levelModeDetails').textContent = levelSummary(levelData);
+        } else if (data.gameMode === 'endless') {
+            document.getElementById('levelInfo').classList.add('hidden');
+            document.getElementById('highscoreInfo').classList.remove('hidden');
+            highscoreData = data.highscoreData;
+            updateHighscoreInfo();
+        }
+
+        updateStatus('Игра началась!', 'playing');
+        document.getElementById('connectSection').classList.add('hidden');
+        document.getElementById('gameSection').classList.remove('hidden');
+
+        updatePlayersBoard();
+        updateBoard();
+        updateGameStatus();
+    });
+
+    socket.on('error', function(data) {
+        updateStatus('Ошибка: ' + data.message, 'waiting');
+    });
+}
+
+function updateLevelInfo() {
+    document.getElementById('levelNumber').textContent = levelData.level;
+    document.getElementById('levelName').textContent = levelData.name;
+    document.getElementById('movesLeft').textContent = levelData.movesLeft;
+
+    // Цели уровня: фишки по цветам и очки
+    const goals = levelData.goals.map(goal =>
+        `<div><strong>Собрать ${TILE_LABELS[goal.tile]} кристаллов:</strong> ${goal.collected} из ${goal.target}</div>`
+    );
+    if (levelData.targetScore) {
+        goals.push(`<div><strong>Набрать очков:</strong> ${Math.min(levelData.score, levelData.targetScore)} из ${levelData.targetScore}</div>`);
+    }
+    document.getElementById('levelGoals').innerHTML = goals.join('');
+}
+
+function levelSummary(data) {
+    const goals = data.goals.map(goal => `${goal.target} ${TILE_LABELS[goal.tile]} кристаллов`);
+    if (data.targetScore) {
+        goals.push(`${data.targetScore} очков`);
+    }
+    return `Уровень ${data.level}: ${data.name} | Ограничение: ${data.movesLeft} ходов | Цель: ${goals.join(', ')}`;
+}
+
+function updateHighscoreInfo() {
+    document.getElementById('currentHighscore').textContent = highscoreData.personalBest;
+    document.getElementById('currentScore').textContent = highscoreData.currentScore;
+}
+
+function updatePlayersBoard() {
+    const playersBoard = document.getElementById('playersBoard');
+    playersBoard.innerHTML = '';
+
+    Object.keys(players).forEach(playerId => {
+        const player = players[playerId];
+        const playerCard = document.createElement('div');
+        playerCard.className = 'player-card';
+
+        if (playerId === currentPlayer) {
+            playerCard.classList.add('current');
+        }
+
+        if (playerId === myPlayerId) {
+            playerCard.style.background = '#e8f5e8';
+        }
+
+        playerCard.innerHTML = `
+            <div class="player-name">${player.name} ${playerId === myPlayerId ? '(Вы)' : ''}</div>
+            <div class="player-score">${player.score} очков</div>
+            <div style="font-size: 0.9em; color: #666;">${player.position || ''}</div>
+        `;
+
+        playersBoard.appendChild(playerCard);
+    });
+}
+
+function updateBoard(board = gameBoard) {
+    const boardElement = document.getElementById('gameBoard');
+    const width = board.length ? board[0].length : 0;
+
+    // Если размер поля не изменился, перекрашиваем существующие фишки
+    if (boardElement.children.length === board.length * width) {
+        Array.from(boardElement.children).forEach(tile => {
+            tile.className = `tile ${board[tile.dataset.row][tile.dataset.col]}`;
+        });
+        return;
+    }
+
+    // Размер поля задает уровень, ширина сетки берется из данных
+    boardElement.style.setProperty('--board-width', width);
+    boardElement.innerHTML = '';
+    for (let row = 0; row < board.length; row++) {
+        for (let col = 0; col < width; col++) {
+            const tile = document.createElement('div');
+            tile.className = `tile ${board[row][col]}`;
+            tile.dataset.row = row;
+            tile.dataset.col = col;
+            tile.onclick = () => selectTile(row, col);
+            boardElement.appendChild(tile);
+        }
+    }
+}
+
+function applySteps(swap, steps) {
+    // Модель поля обновляется сразу, а шаги каскада показываются по очереди
+    const animation = ++boardAnimation;
+    const [[row1, col1], [row2, col2]] = swap;
+    [gameBoard[row1][col1], gameBoard[row2][col2]] = [gameBoard[row2][col2], gameBoard[row1][col1]];
+    updateBoard();
+
+    const frames = [];
+    steps.forEach(step => {
+        step.cleared.forEach(([row, col]) => {
+            gameBoard[row][col] = null;
+        });
+        step.shifts.forEach(([col, fromRow, toRow]) => {
+            gameBoard[toRow][col] = gameBoard[fromRow][col];
+            gameBoard[fromRow][col] = null;
+        });
+        step.spawned.forEach(([col, tiles]) => {
+            tiles.forEach((tile, row) => {
+                gameBoard[row][col] = tile;
+            });
+        });
+        frames.push({ board: gameBoard.map(row => row.slice()), cleared: step.cleared });
+    });
+
+    frames.forEach((frame, index) => {
+        setTimeout(() => {
+            if (animation !== boardAnimation) return;
+            animateMatches(frame.cleared);
+            setTimeout(() => {
+                if (animation === boardAnimation) updateBoard(frame.board);
+            }, 200);
+        }, index * 400);
+    });
+}
+
+function selectTile(row, col) {
+    if (!gameActive || currentPlayer !== myPlayerId) return;
+
+    const tileElement = document.querySelector(`[data-row="${row}"][data-col="${col}"]`);
+
+    if (!selectedTile) {
+        // Первое нажатие - выбираем фишку
+        selectedTile = { row, col };
+        tileElement.classList.add('selected');
+    } else {
+        // Второе нажатие - пытаемся поменять фишки
+        const firstTile = document.querySelector(`[data-row="${selectedTile.row}"][data-col="${selectedTile.col}"]`);
+        firstTile.classList.remove('selected');
+
+        // Проверяем, что фишки соседние
+        const rowDiff = Math.abs(selectedTile.row - row);
+        const colDiff = Math.abs(selectedTile.col - col);
+
+        if ((rowDiff === 1 && colDiff === 0) || (rowDiff === 0 && colDiff === 1)) {
+            if (wireBinary) {
+                socket.emit('make_move_bin', encodeMove(selectedTile, { row, col }, gameBoard[0].length));
+            } else {
+                socket.emit('make_move', {
+                    room: currentRoom,
+                    from: selectedTile,
+                    to: { row, col }
+                });
+            }
+        }
+
+        selectedTile = null;
+    }
+}
+
+function connectSocket() {
+    return wireBinary ? io({ query: { wire: 'binary' } }) : io();
+}
+
+function readVarints(bytes, start) {
+    const values = [];
+    let value = 0;
+    let shift = 0;
+    for (let i = start; i < bytes.length; i++) {
+        value |= (bytes[i] & 0x7f) << shift;
+        if (bytes[i] < 0x80) {
+            values.push(value);
+            value = 0;
+            shift = 0;
+        } else {
+            shift += 7;
+        }
+    }
+    return values;
+}
+
+function decodeBoard(buffer) {
+    // Байт ширины, байт высоты, затем коды фишек по 3 бита от младших битов
+    const bytes = new Uint8Array(buffer);
+    const width = bytes[0];
+    const height = bytes[1];
+    const board = [];
+    for (let row = 0; row < height; row++) {
+        const line = [];
+        for (let col = 0; col < width; col++) {
+            const bit = (row * width + col) * 3;
+            const index = 2 + (bit >> 3);
+            const pair = bytes[index] | ((bytes[index + 1] || 0) << 8);
+            line.push(TILE_NAMES[(pair >> (bit & 7)) & 7]);
+        }
+        board.push(line);
+    }
+    return board;
+}
+
+function decodeCells(buffer, width) {
+    return readVarints(new Uint8Array(buffer), 0).map(index => [Math.floor(index / width), index % width]);
+}
+
+function encodeMove(from, to, width) {
+    // Код хода: номер левой/верхней клетки * 2 + направление (0 - вправо, 1 - вниз)
+    const first = (from.row < to.row || from.col < to.col) ? from : to;
+    let code = (first.row * width + first.col) * 2 + (from.row !== to.row ? 1 : 0);
+    const bytes = [];
+    while (code >= 0x80) {
+        bytes.push((code & 0x7f) | 0x80);
+        code >>= 7;
+    }
+    bytes.push(code);
+    return new Uint8Array(bytes).buffer;
+}
+
+function animateMatches(matches) {
+    matches.forEach(([row, col]) => {
+        const tile = document.querySelector(`[data-row="${row}"][data-col="${col}"]`);
+        if (tile) {
+            tile.classList.add('matched');
+            setTimeout(() => {
+                tile.classList.remove('matched');
+            }, 500);
+        }
+    });
+}
+
+function updateGameStatus() {
+    const statusElement = document.getElementById('gameStatus');
+
+    if (!gameActive) {
+        statusElement.textContent = 'Игра не активна';
+        statusElement.className = 'status waiting';
+        return;
+    }
+
+    const timeLeft = turnDeadline === null ? '' :
+        ` (${Math.max(0, Math.ceil((turnDeadline - Date.now()) / 1000))} с)`;
+    if (currentPlayer === myPlayerId) {
+        statusElement.textContent = '🎯 Ваш ход! Выберите две соседние фишки для обмена' + timeLeft;
+        statusElement.className = 'status my-turn';
+    } else {
+        const currentPlayerName = players[currentPlayer]?.name || 'Соперник';
+        statusElement.textContent = `⏳ Ход игрока ${currentPlayerName}...` + timeLeft;
+        statusElement.className = 'status waiting';
+    }
+}
+
+function setTurnTimer(seconds) {
+    // Сервер присылает оставшееся время хода, часы клиента в расчет не берутся
+    turnDeadline = (seconds === null || seconds === undefined) ? null : Date.now() + seconds * 1000;
+    if (turnDeadline !== null && turnTicker === null) {
+        turnTicker = setInterval(function() {
+            if (turnDeadline === null) {
+                clearInterval(turnTicker);
+                turnTicker = null;
+                return;
+            }
+            if (gameActive) {
+                updateGameStatus();
+            }
+        }, 1000);
+    }
+}
+
+function updateStatus(message, type) {
+    const statusElement = document.getElementById('status');
+    statusElement.textContent = message;
+    statusElement.className = 'status ' + type;
+}
+
+function requestHint() {
+    if (socket && gameActive && currentPlayer === myPlayerId) {
+        socket.emit('request_hint', { room: currentRoom });
+    }
+}
+
+function leaveGame() {
+    if (socket) {
+        socket.emit('leave_room', { room: currentRoom });
+        socket.disconnect();
+    }
+    document.getElementById('gameSection').classList.add('hidden');
+    document.getElementById('connectSection').classList.remove('hidden');
+    updateStatus('Введите название комнаты и ваше имя', 'waiting');
+}
@@ -0,0 +1 @@
+"""Игровой движок «Три в ряд», не зависящий от Flask/Socket.IO"""
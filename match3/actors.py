@@ -0,0 +1,103 @@
+"""Акторы комнат: события одной комнаты обрабатываются строго по очереди.
+
+У каждой комнаты с необработанными событиями есть актор - очередь заданий
+и одна задача, которая их выполняет. Пока задача работает, новые события
+встают в очередь, поэтому, например, перезапуск игры не может попасть в
+середину каскада. Когда очередь пуста, задача завершается и актор
+удаляется; следующее событие создаст его снова.
+"""
+import threading
+import time
+from collections import deque
+
+from .logs import EventLog
+
+log = EventLog()
+
+
+class RoomActor:
+    """Очередь заданий одной комнаты"""
+
+    __slots__ = ('room', 'queue', 'processed')
+
+    def __init__(self, room):
+        self.room = room
+        self.queue = deque()
+        self.processed = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+
+class ActorRegistry:
+    """Акторы всех комнат процесса и метрики их очередей.
+
+    spawn(fn) запускает fn в отдельной задаче (например,
+    socketio.start_background_task). max_depth - наибольшая длина очереди
+    одной комнаты за время работы, max_wait - наибольшее ожидание задания
+    в очереди в секундах.
+    """
+
+    def __init__(self, spawn):
+        self._spawn = spawn
+        self._actors = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.max_wait = 0.0
+
+    def submit(self, room, fn, *args):
+        """Ставит fn(*args) в очередь комнаты room"""
+        with self._lock:
+            actor = self._actors.get(room)
+            start = actor is None
+            if start:
+                actor = self._actors[room] = RoomActor(room)
+            actor.queue.append((time.perf_counter(), fn, args))
+            self.submitted += 1
+            if len(actor.queue) > self.max_depth:
+                self.max_depth = len(actor.queue)
+        if start:
+            self._spawn(self._drain, actor)
+
+    def _drain(self, actor):
+        while True:
+            with self._lock:
+                if not actor.queue:
+                    del self._actors[actor.room]
+                    return
+                queued, fn, args = actor.queue.popleft()
+            wait = time.perf_counter() - queued
+            if wait > self.max_wait:
+                self.max_wait = wait
+            try:
+                fn(*args)
+            except Exception:
+                self.failed += 1
+                log.exception('room_task_failed', room=actor.room)
+            actor.processed += 1
+            self.processed += 1
+
+    def depth(self, room):
+        actor = self._actors.get(room)
+        return len(actor) if actor else 0
+
+    def depths(self):
+        """Длины очередей комнат, у которых сейчас есть задания"""
+        with self._lock:
+            return {room: len(actor) for room, actor in self._actors.items()}
+
+    def stats(self):
+        depths = self.depths()
+        return {
+            'active_rooms': len(depths),
+            'queued': sum(depths.values()),
+            'max_queue_depth': max(depths.values(), default=0),
+            'peak_queue_depth': self.max_depth,
+            'peak_wait_ms': round(self.max_wait * 1000, 3),
+            'submitted': self.submitted,
+            'processed': self.processed,
+            'failed': self.failed,
+        }
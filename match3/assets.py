@@ -0,0 +1,119 @@
+"""Статические файлы клиента: собираются один раз при запуске и отдаются из памяти.
+
+Для каждого файла заранее готовы сжатые варианты (gzip и, если установлен
+пакет brotli, br), ETag и Last-Modified по времени изменения исходных
+файлов. CSS и JS получают адреса с хешем содержимого,
+поэтому браузер может кешировать их без ограничения срока, а index.html
+проверяется условным запросом и при совпадении ETag (или, без него,
+If-Modified-Since) получает 304.
+"""
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+try:
+    import brotli
+except ImportError:  # brotli есть в requirements.txt, но без него сервер отдает gzip
+    brotli = None
+
+HAVE_BROTLI = brotli is not None
+
+CLIENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'client')
+ASSET_PREFIX = '/assets/'
+
+# Файлы с хешем в адресе не меняются, index.html всегда перепроверяется
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+}
+
+# Порядок предпочтения кодировок при согласовании с Accept-Encoding
+ENCODINGS = ('br', 'gzip')
+
+
+class Asset:
+    """Готовый к отдаче файл: тело в каждой кодировке, ETag и заголовки кеширования.
+
+    modified - время изменения исходных файлов (секунды эпохи); в
+    Last-Modified оно идет с точностью до секунды, как в HTTP-дате.
+    headers[encoding] - готовые заголовки ответа 304 и полного ответа.
+    """
+
+    __slots__ = ('content_type', 'cache_control', 'digest', 'modified', 'variants', 'headers')
+
+    def __init__(self, body, content_type, cache_control, modified):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.modified = datetime.fromtimestamp(int(modified), timezone.utc)
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {None: body}
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.variants['gzip'] = compressed
+        if HAVE_BROTLI:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                self.variants['br'] = compressed
+        last_modified = format_datetime(self.modified, usegmt=True)
+        self.headers = {}
+        for encoding in self.variants:
+            revalidate = [
+                ('ETag', f'"{self.etag(encoding)}"'),
+                ('Last-Modified', last_modified),
+                ('Cache-Control', cache_control),
+                ('Vary', 'Accept-Encoding'),
+            ]
+            full = revalidate + [('Content-Encoding', encoding)] if encoding else revalidate
+            self.headers[encoding] = revalidate, full
+
+    def etag(self, encoding=None):
+        """ETag варианта: у разных кодировок разные представления"""
+        return self.digest if encoding is None else f'{self.digest}-{encoding}'
+
+    def not_modified(self, etag, if_none_match, if_modified_since):
+        """Можно ли ответить 304: If-None-Match важнее If-Modified-Since (RFC 9110)"""
+        if if_none_match:
+            return if_none_match.contains_weak(etag)
+        return if_modified_since is not None and self.modified <= if_modified_since
+
+    def negotiate(self, accepts):
+        """Кодировка для ответа; accepts(name) - допускает ли клиент кодировку"""
+        for encoding in ENCODINGS:
+            if encoding in self.variants and accepts(encoding):
+                return encoding
+        return None
+
+
+def hashed_name(name, digest):
+    base, ext = os.path.splitext(name)
+    return f'{base}.{digest[:10]}{ext}'
+
+
+def build_assets(directory=CLIENT_DIR):
+    """Читает клиент из directory; возвращает (index, {адрес: Asset})"""
+    assets = {}
+    urls = {}
+    for name in ('app.css', 'app.js'):
+        path = os.path.join(directory, name)
+        with open(path, 'rb') as f:
+            body = f.read()
+        ext = os.path.splitext(name)[1]
+        asset = Asset(body, CONTENT_TYPES[ext], IMMUTABLE, os.path.getmtime(path))
+        url = ASSET_PREFIX + hashed_name(name, asset.digest)
+        assets[url] = asset
+        urls[name] = url
+
+    path = os.path.join(directory, 'index.html')
+    with open(path, encoding='utf-8') as f:
+        page = f.read()
+    page = page.replace('{{ app_css }}', urls['app.css']).replace('{{ app_js }}', urls['app.js'])
+    # Страница меняется и вместе с адресами CSS и JS
+    modified = max([os.path.getmtime(path)] + [asset.modified.timestamp() for asset in assets.values()])
+    index = Asset(page.encode('utf-8'), CONTENT_TYPES['.html'], REVALIDATE, modified)
+    return index, assets
@@ -0,0 +1,242 @@
+"""Архив законченных партий для разбора споров и проверки на читерство.
+
+Партия хранится компактной записью: комната, время окончания, зерно,
+размер поля, режим, игроки и журнал ходов из match3.replay (varint-коды).
+Размер поля хранится в записи, поэтому партия уровня повторяется по
+архиву без файла уровней. Записи дописываются в файлы-сегменты каталога;
+когда сегмент дорастает до segment_bytes, начинается следующий. Формат
+записи::
+
+    varint(длина) | varint(время) varint(зерно) varint(флаги) varint(ходов)
+                  | varint(ширина) varint(высота)
+                  | строка(комната) строка(режим) varint(игроков) строка(имя)...
+                  | varint(длина журнала) журнал
+
+В сегментах прежнего формата (MAGIC_V1) ширины и высоты нет, такие
+партии считаются сыгранными на поле по умолчанию.
+
+Строка - varint(длина) и UTF-8. Запись кодируется в вызывающем потоке
+(микросекунды), а на диск ее пишет отдельный поток ОС, поэтому обработчик
+хода не ждет диска. Если очередь записи переполнена, запись отбрасывается
+и учитывается в dropped. Каталог может быть общим для нескольких воркеров:
+номер нового сегмента занимается созданием файла с O_EXCL, поэтому
+воркеры не затирают сегменты друг друга. Каталог создается вместе с
+первым сегментом. Читатель отображает сегменты в память и отдает
+партии по одной; недописанная запись в конце сегмента пропускается.
+"""
+import mmap
+import os
+import queue
+import threading
+import time
+
+from .board import BOARD_HEIGHT, BOARD_WIDTH
+from .replay import GameLog, replay
+from .wire import decode_varint, encode_varint
+
+MAGIC = b'M3AUDIT2'
+MAGIC_V1 = b'M3AUDIT1'
+SUFFIX = '.m3a'
+NO_RESHUFFLE = 1
+
+
+def _string(value):
+    data = value.encode('utf-8')
+    return encode_varint(len(data)) + data
+
+
+def _read_string(data, pos):
+    size, pos = decode_varint(data, pos)
+    return bytes(data[pos:pos + size]).decode('utf-8'), pos + size
+
+
+def encode_record(room, ended_at, log, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """Запись партии с длиной впереди"""
+    parts = [
+        encode_varint(int(ended_at)),
+        encode_varint(log.seed),
+        encode_varint(NO_RESHUFFLE if log.no_reshuffle else 0),
+        encode_varint(len(log)),
+        encode_varint(width),
+        encode_varint(height),
+        _string(room),
+        _string(log.mode),
+        encode_varint(len(log.players)),
+    ]
+    parts.extend(_string(name) for name in log.players)
+    parts.append(encode_varint(len(log.moves)))
+    parts.append(bytes(log.moves))
+    payload = b''.join(parts)
+    return encode_varint(len(payload)) + payload
+
+
+class AuditEntry:
+    __slots__ = ('room', 'ended_at', 'log', 'width', 'height')
+
+    def __init__(self, room, ended_at, log, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        self.room = room
+        self.ended_at = ended_at
+        self.log = log
+        self.width = width
+        self.height = height
+
+    def replay(self):
+        """Повтор партии на поле того размера, на котором ее сыграли"""
+        return replay(self.log, self.width, self.height)
+
+
+def decode_record(data, pos=0, sized=True):
+    """Читает запись с позиции pos; возвращает (AuditEntry, следующая позиция).
+
+    sized=False - запись прежнего формата, без ширины и высоты поля.
+    """
+    ended_at, pos = decode_varint(data, pos)
+    seed, pos = decode_varint(data, pos)
+    flags, pos = decode_varint(data, pos)
+    count, pos = decode_varint(data, pos)
+    width, height = BOARD_WIDTH, BOARD_HEIGHT
+    if sized:
+        width, pos = decode_varint(data, pos)
+        height, pos = decode_varint(data, pos)
+    room, pos = _read_string(data, pos)
+    mode, pos = _read_string(data, pos)
+    size, pos = decode_varint(data, pos)
+    players = []
+    for _ in range(size):
+        name, pos = _read_string(data, pos)
+        players.append(name)
+    size, pos = decode_varint(data, pos)
+    moves = data[pos:pos + size]
+    log = GameLog(seed, mode, players, moves, count, bool(flags & NO_RESHUFFLE))
+    return AuditEntry(room, ended_at, log, width, height), pos + size
+
+
+def segment_paths(directory):
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(SUFFIX)]
+
+
+def _last_number(directory):
+    existing = segment_paths(directory)
+    return int(os.path.basename(existing[-1])[:-len(SUFFIX)]) if existing else 0
+
+
+class AuditWriter:
+    """Дописывает записи в сегменты из фонового потока.
+
+    segment_bytes - размер, после которого начинается новый сегмент;
+    flush_interval - как часто сбрасывать буфер файла, когда записей нет;
+    max_pending - длина очереди, после которой записи отбрасываются.
+    """
+
+    def __init__(self, directory, segment_bytes=64 << 20, flush_interval=1.0, max_pending=100000):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self._number = None
+        self._file = None
+        self._size = 0
+        self._queue = queue.Queue(max_pending)
+        self.records = 0
+        self.bytes = 0
+        self.segments = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name='match3-audit', daemon=True)
+        self._thread.start()
+
+    def append(self, room, log, ended_at=None, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        """Ставит партию, сыгранную на поле width x height, в очередь записи; не ждет диска"""
+        record = encode_record(room, time.time() if ended_at is None else ended_at, log, width, height)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def stats(self):
+        return {
+            'records': self.records,
+            'bytes': self.bytes,
+            'segments': self.segments,
+            'pending': self._queue.qsize(),
+            'dropped': self.dropped,
+        }
+
+    def close(self):
+        """Дописывает очередь и закрывает сегмент"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._file is not None:
+                    self._file.flush()
+                continue
+            if record is None:
+                break
+            if self._file is None or self._size + len(record) > self.segment_bytes:
+                self._rotate()
+            self._file.write(record)
+            self._size += len(record)
+            self.records += 1
+            self.bytes += len(record)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        if self._number is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._number = _last_number(self.directory)
+        while True:
+            self._number += 1
+            path = os.path.join(self.directory, f'{self._number:08d}{SUFFIX}')
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                break
+            except FileExistsError:
+                # Номер занял другой воркер - продолжаем после его последнего сегмента
+                self._number = max(self._number, _last_number(self.directory))
+        self._file = os.fdopen(fd, 'wb', buffering=1 << 16)
+        self._file.write(MAGIC)
+        self._size = len(MAGIC)
+        self.segments += 1
+
+
+def read_segment(path):
+    """Партии одного сегмента по одной; файл отображается в память"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic = data[:len(MAGIC)]
+            if magic not in (MAGIC, MAGIC_V1):
+                raise ValueError(f'{path}: не сегмент архива партий')
+            sized = magic == MAGIC
+            pos = len(MAGIC)
+            end = len(data)
+            while pos < end:
+                try:
+                    size, start = decode_varint(data, pos)
+                except ValueError:
+                    return
+                if start + size > end:
+                    # Запись еще дописывается или сервер остановился посреди нее
+                    return
+                entry, _ = decode_record(data, start, sized)
+                yield entry
+                pos = start + size
+
+
+def read_archive(directory):
+    """Все партии каталога в порядке записи"""
+    for path in segment_paths(directory):
+        yield from read_segment(path)
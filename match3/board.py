@@ -0,0 +1,117 @@
+"""Компактное игровое поле: плоский bytearray с целочисленными кодами фишек"""
+from itertools import repeat
+
+# Типы фишек
+TILE_TYPES = ['red', 'blue', 'green', 'yellow', 'purple']
+BOARD_WIDTH = 8
+BOARD_HEIGHT = 8
+
+# Код 0 - пустая клетка, фишки кодируются с единицы в порядке TILE_TYPES
+EMPTY = 0
+TILE_CODES = tuple(range(1, len(TILE_TYPES) + 1))
+TILE_CODE = {name: code for code, name in zip(TILE_CODES, TILE_TYPES)}
+TILE_NAMES = (None,) + tuple(TILE_TYPES)
+_EMPTY_BYTE = bytes([EMPTY])
+
+
+class Board:
+    """Игровое поле ``height`` x ``width``, клетка (row, col) хранится в cells[row * width + col]"""
+
+    __slots__ = ('width', 'height', 'cells')
+
+    def __init__(self, width=BOARD_WIDTH, height=BOARD_HEIGHT, cells=None):
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height) if cells is None else bytearray(cells)
+
+    @classmethod
+    def from_names(cls, rows):
+        """Создает поле из списка строк с названиями цветов"""
+        height = len(rows)
+        width = len(rows[0]) if rows else 0
+        return cls(width, height, bytes(TILE_CODE.get(tile, EMPTY) for line in rows for tile in line))
+
+    def to_names(self):
+        """Поле в виде списка строк с названиями цветов для отправки клиенту"""
+        names = [TILE_NAMES[code] for code in self.cells]
+        width = self.width
+        return [names[start:start + width] for start in range(0, len(names), width)]
+
+    def copy(self):
+        return Board(self.width, self.height, self.cells)
+
+    def __eq__(self, other):
+        return (isinstance(other, Board) and self.width == other.width and
+                self.height == other.height and self.cells == other.cells)
+
+    def __repr__(self):
+        return f'Board({self.width}x{self.height})'
+
+    def get(self, row, col):
+        return self.cells[row * self.width + col]
+
+    def set(self, row, col, code):
+        self.cells[row * self.width + col] = code
+
+    def row(self, row):
+        """Коды фишек строки слева направо"""
+        start = row * self.width
+        return self.cells[start:start + self.width]
+
+    def col(self, col):
+        """Коды фишек столбца сверху вниз"""
+        return self.cells[col::self.width]
+
+    def swap(self, row1, col1, row2, col2):
+        """Меняет фишки местами"""
+        cells = self.cells
+        a = row1 * self.width + col1
+        b = row2 * self.width + col2
+        cells[a], cells[b] = cells[b], cells[a]
+
+    def clear(self, positions):
+        """Освобождает клетки из списка (row, col)"""
+        cells = self.cells
+        width = self.width
+        for row, col in positions:
+            cells[row * width + col] = EMPTY
+
+    def collapse(self, rng, spawned=None, cols=None):
+        """Фишки падают на освободившиеся места, сверху появляются новые.
+
+        Столбец сжимается за один линейный проход: непустые фишки сохраняют
+        порядок и прижимаются вниз, а освободившиеся клетки сверху сразу
+        заполняются (по столбцам слева направо, в столбце сверху вниз).
+        Возвращает список клеток (row, col), содержимое которых сдвинулось
+        или появилось заново. Если передан список spawned, в него
+        добавляются пары (col, коды новых фишек сверху вниз). cols - столбцы,
+        в которых есть пустые клетки, если они уже известны (остальные не
+        просматриваются).
+        """
+        cells = self.cells
+        width = self.width
+        missing = cells.count(EMPTY)
+        if not missing:
+            return []
+        # Все новые фишки разыгрываются одним вызовом в порядке заполнения
+        fresh = bytes(rng.choices(TILE_CODES, k=missing))
+        used = 0
+        changed = []
+        for col in (range(width) if cols is None else sorted(cols)):
+            column = cells[col::width]
+            lowest_empty = column.rfind(EMPTY)
+            if lowest_empty < 0:
+                continue
+            tiles = column.translate(None, _EMPTY_BYTE)
+            count = len(column) - len(tiles)
+            cells[col::width] = fresh[used:used + count] + tiles
+            if spawned is not None:
+                spawned.append((col, fresh[used:used + count]))
+            used += count
+            # Все, что выше самой нижней пустой клетки, сдвинулось вниз или появилось заново
+            changed.extend(zip(range(lowest_empty + 1), repeat(col)))
+        return changed
+
+    def count(self, code):
+        """Считает количество фишек с кодом code"""
+        return self.cells.count(code)
@@ -0,0 +1,199 @@
+"""Боты: оценка всех доступных ходов поля по выходу совпадений и каскадов.
+
+MoveEvaluator разыгрывает каждый ход в рабочих буферах, не трогая поле
+партии: клетки поля один раз копируются в базовые буферы (по строкам и по
+столбцам), ход делается в рабочих (обмен, поиск серий в затронутых
+строках и столбцах, падение фишек), а откат перед следующим ходом -
+копирование базовых буферов одним memcpy. Буферы и множество совпадений
+создаются один раз и переиспользуются; столбцы читаются по индексам, без
+срезов и временных bytes на каждый столбец. Серии первого шага находятся
+обходом соседей обмененных клеток прямо в базовых буферах, общих для всех
+ходов поля: ход без совпадений не копирует буферы и не запускает поиск.
+
+Новые фишки сверху заранее неизвестны (их выдаст генератор партии),
+поэтому освободившиеся клетки остаются пустыми: в каскаде участвуют только
+фишки, которые уже лежат на поле. Очки хода - число убранных фишек по всем
+шагам такого каскада, как считает очки сервер. С весами weights (вес по
+коду фишки) очки - сумма весов убранных фишек: так игрок уровня ценит
+фишки цветов своей цели.
+"""
+import random
+import re
+
+from .board import BOARD_HEIGHT, BOARD_WIDTH, EMPTY
+from .moves import DOWN, MoveIndex
+
+# Серия из трех и более одинаковых непустых фишек
+_RUN = re.compile(rb'([^\x00])\1\1+', re.S)
+
+
+class MoveEvaluator:
+    """Оценка ходов для полей width x height.
+
+    Рабочий буфер scratch хранит строки поля через пустой байт (шаг
+    width + 1), чтобы серии во всех нужных строках находились одним
+    проходом регулярного выражения и не переходили со строки на строку.
+    Буфер columns - то же поле по столбцам (шаг height + 1): в нем серии
+    столбца ищутся тем же выражением по диапазону, без копии столбца.
+    """
+
+    def __init__(self, width=BOARD_WIDTH, height=BOARD_HEIGHT, max_depth=10, weights=None):
+        self.width = width
+        self.height = height
+        self.max_depth = max_depth
+        self.weights = weights
+        self.stride = width + 1
+        self.column_stride = height + 1
+        self.base = bytearray(self.stride * height)
+        self.scratch = bytearray(self.stride * height)
+        self.base_columns = bytearray(self.column_stride * width)
+        self.columns = bytearray(self.column_stride * width)
+        self._matched = set()
+
+    def load(self, board):
+        """Копирует клетки поля в базовый буфер; дальше ходы оцениваются без поля"""
+        width = self.width
+        cells = board.cells
+        for row in range(self.height):
+            start = row * self.stride
+            self.base[start:start + width] = cells[row * width:(row + 1) * width]
+        for col in range(width):
+            start = col * self.column_stride
+            self.base_columns[start:start + self.height] = cells[col::width]
+
+    def score(self, code):
+        """(убранных фишек или сумма их весов, шагов каскада) для хода code на загруженном поле"""
+        width = self.width
+        stride = self.stride
+        column_stride = self.column_stride
+        scratch = self.scratch
+        columns = self.columns
+        row, col = divmod(code // 2, width)
+        index = row * stride + col
+        column_index = col * column_stride + row
+        if code % 2 == DOWN:
+            other = index + stride
+            column_other = column_index + 1
+        else:
+            other = index + 1
+            column_other = column_index + column_stride
+        # Первый шаг каскада читается из базовых буферов, без поиска по строкам и столбцам
+        matched = self._matched
+        matched.clear()
+        self._swap_runs(index, column_index, self.base[other], other, column_other)
+        self._swap_runs(other, column_other, self.base[index], index, column_index)
+        if not matched:
+            return 0, 0
+        scratch[:] = self.base
+        columns[:] = self.base_columns
+        scratch[index], scratch[other] = scratch[other], scratch[index]
+        columns[column_index], columns[column_other] = columns[column_other], columns[column_index]
+
+        weights = self.weights
+        cleared = depth = 0
+        while True:
+            cleared += len(matched) if weights is None else sum(weights[scratch[cell]] for cell in matched)
+            depth += 1
+            if depth >= self.max_depth:
+                break
+            matched = self._scan(*self._fall(matched))
+            if not matched:
+                break
+        return cleared, depth
+
+    def _swap_runs(self, index, column_index, tile, other, column_other):
+        """Добавляет в _matched серии через клетку index, куда обмен с клеткой other принес фишку tile.
+
+        На загруженном поле нет готовых серий, поэтому серия хода обязательно
+        проходит через одну из двух обмененных клеток: от нее идем влево,
+        вправо, вверх и вниз по базовым буферам, пока фишки совпадают с tile.
+        Пустые байты между строками и столбцами останавливают обход на краю поля.
+        """
+        base = self.base
+        base_columns = self.base_columns
+        matched = self._matched
+        start = end = index
+        while base[start - 1] == tile and start - 1 != other:
+            start -= 1
+        while base[end + 1] == tile and end + 1 != other:
+            end += 1
+        if end - start >= 2:
+            matched.update(range(start, end + 1))
+        top = bottom = column_index
+        while base_columns[top - 1] == tile and top - 1 != column_other:
+            top -= 1
+        while base_columns[bottom + 1] == tile and bottom + 1 != column_other:
+            bottom += 1
+        if bottom - top >= 2:
+            stride = self.stride
+            matched.update(range(index - (column_index - top) * stride, index + (bottom - column_index) * stride + 1,
+                                 stride))
+
+    def evaluate(self, board, codes=None):
+        """Пары (код хода, (убранных фишек, шагов каскада)) для ходов codes (по умолчанию все доступные)"""
+        if codes is None:
+            codes = MoveIndex(board).moves
+        self.load(board)
+        return [(code, self.score(code)) for code in sorted(codes)]
+
+    def choose(self, board, codes=None, rng=None, skill=1.0):
+        """Лучший ход; с вероятностью 1 - skill - случайный доступный (None, если ходов нет)"""
+        rng = rng or random
+        scored = self.evaluate(board, codes)
+        if not scored:
+            return None
+        if rng.random() >= skill:
+            return rng.choice(scored)[0]
+        best = max(score for _, score in scored)
+        return rng.choice([code for code, score in scored if score == best])
+
+    def _scan(self, rows, cols):
+        """Клетки серий в строках от rows[0] до rows[1] и в столбцах cols рабочего буфера"""
+        stride = self.stride
+        column_stride = self.column_stride
+        matched = self._matched
+        matched.clear()
+        for run in _RUN.finditer(self.scratch, rows[0] * stride, (rows[1] + 1) * stride):
+            matched.update(range(run.start(), run.end()))
+        for col in cols:
+            # Позиция в буфере столбцов: col * column_stride + row
+            top = col * column_stride
+            for run in _RUN.finditer(self.columns, top, top + column_stride):
+                matched.update(range((run.start() - top) * stride + col, (run.end() - top) * stride + col, stride))
+        return matched
+
+    def _fall(self, matched):
+        """Убирает клетки matched, фишки падают без пополнения; возвращает строки и столбцы для проверки"""
+        stride = self.stride
+        column_stride = self.column_stride
+        scratch = self.scratch
+        columns = self.columns
+        # Самая нижняя убранная строка каждого столбца: ниже нее ничего не сдвигается
+        lowest = {}
+        for cell in matched:
+            row, col = divmod(cell, stride)
+            scratch[cell] = EMPTY
+            columns[col * column_stride + row] = EMPTY
+            if lowest.get(col, -1) < row:
+                lowest[col] = row
+        for col, row in lowest.items():
+            # Снизу вверх: непустые фишки сдвигаются к write (cell - та же клетка в scratch),
+            # над ними остаются пустые клетки
+            top = col * column_stride
+            write = top + row
+            cell = row * stride + col
+            for read in range(write, top - 1, -1):
+                tile = columns[read]
+                if tile != EMPTY:
+                    if read != write:
+                        columns[write] = tile
+                        scratch[cell] = tile
+                    write -= 1
+                    cell -= stride
+            while write >= top:
+                columns[write] = EMPTY
+                scratch[cell] = EMPTY
+                write -= 1
+                cell -= stride
+        # Сдвинулось все, что выше самой нижней убранной клетки
+        return (0, max(lowest.values())), lowest
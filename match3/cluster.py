@@ -0,0 +1,207 @@
+"""Несколько процессов сервера: закрепление комнат за воркерами и очередь между ними.
+
+Каждая комната принадлежит ровно одному воркеру, который хранит ее
+состояние и обрабатывает ее события. Владелец выбирается rendezvous-
+хешированием по списку воркеров, поэтому все воркеры согласны между собой
+без общего реестра, а при добавлении воркера переезжает только 1/N комнат.
+
+Сокет может быть подключен к любому воркеру (он называется edge). События
+комнат, которые принадлежат другому воркеру, edge пересылает владельцу через
+очередь, а владелец просит edge добавить сокет в комнаты Socket.IO или убрать
+из них. Рассылка по комнатам между воркерами идет через message_queue
+Flask-SocketIO.
+
+Очередь подключаемая: ``local://`` работает внутри одного процесса (для
+разработки и проверок), ``tcp://host:port`` - между процессами через
+брокер match3.hub без внешних сервисов, ``redis://...`` - между процессами
+и машинами.
+Сообщения идут в JSON (bytes - как ``{"__bytes__": base64}``): из очереди
+на Redis может прийти что угодно, а pickle выполнил бы чужой код.
+"""
+import base64
+import hashlib
+import json
+import threading
+from functools import lru_cache
+
+DEFAULT_QUEUE = 'local://'
+CHANNEL_PREFIX = 'match3:worker:'
+
+
+@lru_cache(maxsize=65536)
+def _owner(workers, room):
+    return max(workers, key=lambda worker: _weight(worker, room))
+
+
+def _weight(worker, room):
+    digest = hashlib.blake2b(f'{worker}\x00{room}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _encode_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f'{type(value).__name__} нельзя передать через очередь')
+
+
+def _decode_object(obj):
+    if len(obj) == 1 and '__bytes__' in obj:
+        return base64.b64decode(obj['__bytes__'])
+    return obj
+
+
+def encode_message(message):
+    """Сообщение в байты для очереди; кортежи становятся списками"""
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':'), default=_encode_default).encode()
+
+
+def decode_message(payload):
+    """Сообщение из очереди; ValueError, если это не JSON"""
+    return json.loads(payload, object_hook=_decode_object)
+
+
+class RoomRouter:
+    """Воркер-владелец комнаты по rendezvous-хешированию"""
+
+    def __init__(self, workers):
+        if not workers:
+            raise ValueError('Нужен хотя бы один воркер')
+        self.workers = tuple(sorted(set(workers)))
+
+    def owner(self, room):
+        if len(self.workers) == 1:
+            return self.workers[0]
+        return _owner(self.workers, room)
+
+
+class LocalQueue:
+    """Очередь внутри одного процесса: сообщения доставляются сразу при публикации.
+
+    Сообщения сериализуются так же, как в RedisQueue, чтобы обработчики не
+    зависели от того, что получают общий с отправителем объект.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        payload = encode_message(message)
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, ()))
+        for callback in callbacks:
+            callback(decode_message(payload))
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+
+    def listen(self):
+        """Доставка синхронная, отдельный цикл приема не нужен"""
+
+    def close(self):
+        with self._lock:
+            self._subscribers.clear()
+
+
+class RedisQueue:
+    """Очередь на Redis pub/sub для воркеров в разных процессах.
+
+    Цикл приема читает сокет redis-py; под eventlet модули socket и select
+    должны быть заменены зелеными (server.py делает это при запуске), иначе
+    ожидание сообщения останавливает весь цикл событий.
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('Для очереди redis:// нужен пакет redis') from None
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._callbacks = {}
+
+    def publish(self, channel, message):
+        self._redis.publish(channel, encode_message(message))
+
+    def subscribe(self, channel, callback):
+        self._callbacks[channel] = callback
+        self._pubsub.subscribe(channel)
+
+    def listen(self):
+        """Цикл приема сообщений; запускается в фоновой задаче"""
+        for item in self._pubsub.listen():
+            callback = self._callbacks.get(item['channel'].decode())
+            if callback is not None:
+                callback(decode_message(item['data']))
+
+    def close(self):
+        self._pubsub.close()
+
+
+def make_queue(url=None):
+    """Очередь по адресу: local://, tcp://host:port (брокер match3.hub) или redis://host:port/db"""
+    url = url or DEFAULT_QUEUE
+    if url.startswith('local://'):
+        return LocalQueue()
+    if url.startswith('tcp://'):
+        from .hub import HubQueue
+        return HubQueue(url)
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisQueue(url)
+    raise ValueError(f'Неизвестная очередь: {url}')
+
+
+class Cluster:
+    """Воркер в группе: какие комнаты его, куда пересылать чужие события.
+
+    handlers - обработчики событий комнат по имени события; routes - комнаты
+    сокетов, подключенных к этому воркеру (нужны, чтобы переслать событие
+    без комнаты в данных); edges - воркеры, к которым подключены сокеты
+    игроков комнат этого воркера.
+    """
+
+    def __init__(self, worker_id, workers=None, queue=None):
+        self.worker_id = worker_id
+        self.router = RoomRouter(workers or [worker_id])
+        if worker_id not in self.router.workers:
+            raise ValueError(f'Воркер {worker_id} отсутствует в списке воркеров')
+        self.queue = queue or LocalQueue()
+        self.handlers = {}
+        self.routes = {}
+        self.edges = {}
+        self.forwarded = 0
+
+    def owns(self, room):
+        return self.router.owner(room) == self.worker_id
+
+    def edge_of(self, sid):
+        return self.edges.get(sid, self.worker_id)
+
+    def start(self, on_event, on_membership):
+        """Подписывается на свой канал: события от edge и команды от владельцев"""
+        dispatch = {'event': on_event, 'membership': on_membership}
+        self.queue.subscribe(CHANNEL_PREFIX + self.worker_id,
+                             lambda message: dispatch[message['kind']](message))
+
+    def forward(self, room, event, sid, args, wire=None):
+        """Пересылает событие комнаты воркеру-владельцу"""
+        self.forwarded += 1
+        self.queue.publish(CHANNEL_PREFIX + self.router.owner(room), {
+            'kind': 'event',
+            'room': room,
+            'event': event,
+            'sid': sid,
+            'args': args,
+            'wire': wire,
+            'edge': self.worker_id,
+        })
+
+    def membership(self, sid, op, rooms):
+        """Просит edge сокета выполнить join/leave комнат Socket.IO"""
+        self.queue.publish(CHANNEL_PREFIX + self.edge_of(sid), {
+            'kind': 'membership',
+            'op': op,
+            'sid': sid,
+            'rooms': list(rooms),
+        })
@@ -0,0 +1,107 @@
+"""Пул вычислений: генерация полей и разрешение ходов вне цикла событий.
+
+Режимы:
+
+* ``inline`` - все считается на месте, как раньше;
+* ``thread`` - в пуле потоков ОС;
+* ``process`` - в пуле процессов, поле передается копией и возвращается
+  вместе с шагами каскада.
+
+Ожидание результата задается функцией wait(future). Под eventlet ее
+нужно выполнять через ``eventlet.tpool``, тогда цикл событий продолжает
+обслуживать сокеты, пока ход считается.
+
+Генератор партии rng передается вместе с полем; из процесса возвращается
+его новое состояние, чтобы партия оставалась воспроизводимой.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .board import BOARD_HEIGHT, BOARD_WIDTH, Board
+from .engine import resolve_move
+from .moves import generate_board, reshuffle
+
+MODES = ('inline', 'thread', 'process')
+
+
+def _state(rng):
+    return None if rng is None else rng.getstate()
+
+
+def _generate(rng, width, height):
+    return generate_board(rng, width, height), _state(rng)
+
+
+def _resolve(cells, width, height, row1, col1, row2, col2, rng):
+    board = Board(width, height, cells)
+    steps = resolve_move(board, row1, col1, row2, col2, rng)
+    return bytes(board.cells), steps, _state(rng)
+
+
+def _reshuffle(cells, width, height, rng):
+    return bytes(reshuffle(Board(width, height, cells), rng).cells), _state(rng)
+
+
+def _restore(rng, state):
+    # В пуле потоков генератор тот же объект, в пуле процессов - копия
+    if rng is not None:
+        rng.setstate(state)
+
+
+def _result(future):
+    return future.result()
+
+
+class ComputePool:
+    """Выполняет тяжелые операции с полем в выбранном режиме"""
+
+    def __init__(self, mode='inline', size=None, wait=None):
+        if mode not in MODES:
+            raise ValueError(f'Неизвестный режим пула вычислений: {mode}')
+        self.mode = mode
+        self.size = size
+        if mode == 'thread':
+            self._pool = ThreadPoolExecutor(size, thread_name_prefix='match3-compute')
+        elif mode == 'process':
+            self._pool = ProcessPoolExecutor(size)
+        else:
+            self._pool = None
+        self._wait = wait or _result
+
+    def run(self, fn, *args):
+        """Вызывает fn(*args) в пуле и ждет результат"""
+        if self._pool is None:
+            return fn(*args)
+        return self._wait(self._pool.submit(fn, *args))
+
+    def playable_board(self, rng=None, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        return self.generate_board(rng, width, height)[0]
+
+    def generate_board(self, rng=None, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        """Играбельное поле и число попыток генерации"""
+        if self._pool is None:
+            return generate_board(rng, width, height)
+        (board, attempts), state = self.run(_generate, rng, width, height)
+        _restore(rng, state)
+        return board, attempts
+
+    def resolve_move(self, board, row1, col1, row2, col2, rng=None):
+        """То же, что engine.resolve_move: поле меняется на месте, возвращаются шаги каскада"""
+        if self._pool is None:
+            return resolve_move(board, row1, col1, row2, col2, rng)
+        cells, steps, state = self.run(_resolve, bytes(board.cells), board.width, board.height,
+                                       row1, col1, row2, col2, rng)
+        board.cells[:] = cells
+        _restore(rng, state)
+        return steps
+
+    def reshuffle(self, board, rng=None):
+        if self._pool is None:
+            return reshuffle(board, rng)
+        cells, state = self.run(_reshuffle, bytes(board.cells), board.width, board.height, rng)
+        board.cells[:] = cells
+        _restore(rng, state)
+        return board
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,48 @@
+"""Разностные обновления поля: шаги каскада вместо полного поля в каждом board_update"""
+from .board import EMPTY, TILE_CODE, TILE_NAMES
+
+
+def encode_step(step):
+    """Шаг каскада в виде для клиента.
+
+    cleared - убранные клетки [row, col]; shifts - падения фишек
+    [col, from_row, to_row], в каждом столбце снизу вверх; spawned -
+    новые фишки [col, [цвета сверху вниз]], занимающие верхние строки столбца.
+    """
+    cleared_rows = {}
+    for row, col in step.matches:
+        cleared_rows.setdefault(col, set()).add(row)
+
+    shifts = []
+    for col in sorted(cleared_rows):
+        rows = cleared_rows[col]
+        drop = 0
+        for row in range(max(rows), -1, -1):
+            if row in rows:
+                drop += 1
+            elif drop:
+                shifts.append([col, row, row + drop])
+
+    return {
+        'cleared': sorted([row, col] for row, col in step.matches),
+        'shifts': shifts,
+        'spawned': [[col, [TILE_NAMES[code] for code in codes]] for col, codes in step.spawned],
+    }
+
+
+def encode_steps(steps):
+    return [encode_step(step) for step in steps]
+
+
+def apply_steps(board, steps):
+    """Применяет закодированные шаги к полю Board (так же, как это делает клиент)"""
+    for step in steps:
+        for row, col in step['cleared']:
+            board.set(row, col, EMPTY)
+        for col, from_row, to_row in step['shifts']:
+            board.set(to_row, col, board.get(from_row, col))
+            board.set(from_row, col, EMPTY)
+        for col, names in step['spawned']:
+            for row, name in enumerate(names):
+                board.set(row, col, TILE_CODE[name])
+    return board
@@ -0,0 +1,164 @@
+"""Логика игрового поля: генерация, поиск совпадений, падение и заполнение фишек"""
+import random
+import re
+
+from .board import (
+    BOARD_HEIGHT, BOARD_WIDTH, EMPTY, TILE_CODE, TILE_CODES, Board,
+)
+
+
+def create_game_board(rng=None, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """Создает игровое поле без начальных совпадений за один проход.
+
+    Каждая клетка выбирается только из тех цветов, которые не замыкают
+    тройку с двумя соседями слева или сверху, поэтому перегенерация не нужна.
+    Для воспроизводимого поля передайте ``rng=random.Random(seed)``.
+    """
+    if len(TILE_CODES) < 3:
+        raise ValueError('Для поля без совпадений нужно минимум 3 типа фишек')
+    rng = rng or random
+
+    board = Board(width, height)
+    cells = board.cells
+    for row in range(height):
+        for col in range(width):
+            index = row * width + col
+            banned_left = cells[index - 1] if col >= 2 and cells[index - 1] == cells[index - 2] else EMPTY
+            banned_up = (cells[index - width] if row >= 2 and cells[index - width] == cells[index - 2 * width]
+                         else EMPTY)
+
+            if banned_left == EMPTY and banned_up == EMPTY:
+                cells[index] = rng.choice(TILE_CODES)
+            else:
+                allowed = [code for code in TILE_CODES if code != banned_left and code != banned_up]
+                cells[index] = rng.choice(allowed)
+
+    return board
+
+
+def check_matches(board):
+    """Проверяет совпадения на поле"""
+    matches = set()
+    cells = board.cells
+    width = board.width
+    height = board.height
+
+    # Строки и столбцы склеиваются через пустую клетку, чтобы серия не переходила на соседнюю линию
+    rows = b'\x00'.join([cells[start:start + width] for start in range(0, len(cells), width)])
+    for run in _RUN.finditer(rows):
+        row, col = divmod(run.start(), width + 1)
+        matches.update((row, c) for c in range(col, col + run.end() - run.start()))
+
+    cols = b'\x00'.join([cells[col::width] for col in range(width)])
+    for run in _RUN.finditer(cols):
+        col, row = divmod(run.start(), height + 1)
+        matches.update((r, col) for r in range(row, row + run.end() - run.start()))
+
+    return list(matches)
+
+
+# Серия из трех и более одинаковых непустых фишек
+_RUN = re.compile(rb'([^\x00])\1\1+', re.S)
+
+
+def check_matches_around(board, rows, cols):
+    """Ищет совпадения только в указанных строках и столбцах.
+
+    Если до изменения на поле не было совпадений, а все измененные клетки
+    лежат в переданных строках и столбцах, результат совпадает с
+    ``check_matches`` для всего поля (с точностью до порядка).
+    """
+    matches = set()
+
+    # Серии одинаковых фишек по строкам
+    for row in rows:
+        for run in _RUN.finditer(board.row(row)):
+            matches.update((row, col) for col in range(run.start(), run.end()))
+
+    # Серии одинаковых фишек по столбцам
+    for col in cols:
+        for run in _RUN.finditer(board.col(col)):
+            matches.update((row, col) for row in range(run.start(), run.end()))
+
+    return list(matches)
+
+
+def swap_lines(row1, col1, row2, col2):
+    """Строки и столбцы, которые затрагивает обмен двух фишек"""
+    return {row1, row2}, {col1, col2}
+
+
+def changed_lines(changed):
+    """Строки и столбцы, в которых лежат измененные клетки"""
+    return {row for row, _ in changed}, {col for _, col in changed}
+
+
+def remove_matches_and_refill(board, matches, rng=None, spawned=None):
+    """Удаляет совпадения и заполняет поле новыми фишками.
+
+    Возвращает список клеток, которые сдвинулись или заполнились заново;
+    новые фишки по столбцам добавляются в spawned (см. Board.collapse).
+    """
+    board.clear(matches)
+    return board.collapse(rng or random, spawned, {col for _, col in matches})
+
+
+class CascadeStep:
+    """Один шаг каскада: убранные клетки, их коды, клетки, изменившиеся после падения,
+    и новые фишки по столбцам"""
+
+    __slots__ = ('matches', 'codes', 'changed', 'spawned')
+
+    def __init__(self, matches, codes, changed, spawned):
+        self.matches = matches
+        self.codes = codes
+        self.changed = changed
+        self.spawned = spawned
+
+
+def resolve_move(board, row1, col1, row2, col2, rng=None):
+    """Меняет фишки местами и разрешает все каскады.
+
+    Возвращает список шагов CascadeStep; если обмен не дал совпадений,
+    фишки возвращаются на место и список пуст.
+    """
+    board.swap(row1, col1, row2, col2)
+    matches = check_matches_around(board, *swap_lines(row1, col1, row2, col2))
+    if not matches:
+        board.swap(row1, col1, row2, col2)
+        return []
+
+    steps = []
+    while matches:
+        codes = bytes(board.get(row, col) for row, col in matches)
+        spawned = []
+        changed = remove_matches_and_refill(board, matches, rng, spawned)
+        steps.append(CascadeStep(matches, codes, changed, spawned))
+        matches = check_matches_around(board, *changed_lines(changed))
+    return steps
+
+
+def is_valid_move(board, row1, col1, row2, col2):
+    """Проверяет валидность хода (только соседние клетки)"""
+    height = board.height
+    width = board.width
+    if (row1 < 0 or row1 >= height or col1 < 0 or col1 >= width or
+        row2 < 0 or row2 >= height or col2 < 0 or col2 >= width):
+        return False
+
+    # Проверяем, что клетки соседние
+    if abs(row1 - row2) + abs(col1 - col2) != 1:
+        return False
+
+    return True
+
+
+def swap_tiles(board, row1, col1, row2, col2):
+    """Меняет фишки местами"""
+    board.swap(row1, col1, row2, col2)
+    return board
+
+
+def count_tile_type(board, tile_type):
+    """Считает количество фишек определенного типа на поле"""
+    return board.count(TILE_CODE[tile_type])
@@ -0,0 +1,150 @@
+"""Рекорды игроков: постоянное хранилище с кешем в памяти и отложенной записью.
+
+Все рекорды читаются в память при запуске, поэтому personalBest отдается
+без обращения к диску. Новые рекорды сразу попадают в кеш, а в хранилище
+записываются пачкой: по таймеру и при остановке сервера. Если рекорд
+игрока обновился несколько раз между сбросами, записывается только
+последнее значение.
+
+Кеш рассчитан на один процесс: он читается из хранилища только при
+создании HighscoreStore, поэтому воркеры с общей базой не видят рекорды,
+поставленные друг у друга после запуска.
+"""
+import os
+import sqlite3
+import threading
+
+DEFAULT_DB = 'highscores.db'
+
+
+class MemoryBackend:
+    """Хранилище без диска: для разработки и проверок"""
+
+    def __init__(self):
+        self.scores = {}
+        self.writes = 0
+
+    def load(self):
+        return dict(self.scores)
+
+    def write_many(self, records):
+        for name, mode, score in records:
+            key = (name, mode)
+            self.scores[key] = max(score, self.scores.get(key, 0))
+        self.writes += 1
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """Рекорды в SQLite в режиме WAL; одна транзакция на пачку записей"""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS highscores ('
+            'name TEXT NOT NULL, mode TEXT NOT NULL, score INTEGER NOT NULL, '
+            'PRIMARY KEY (name, mode)) WITHOUT ROWID'
+        )
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT name, mode, score FROM highscores').fetchall()
+        return {(name, mode): score for name, mode, score in rows}
+
+    def write_many(self, records):
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                # Рекорд в базе только растет, даже если пачки пришли не по порядку
+                self._conn.executemany(
+                    'INSERT INTO highscores (name, mode, score) VALUES (?, ?, ?) '
+                    'ON CONFLICT (name, mode) DO UPDATE SET score = MAX(score, excluded.score)',
+                    records,
+                )
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def make_backend(url=None):
+    """Хранилище по адресу: ':memory:' - без диска, иначе путь к файлу SQLite"""
+    if url == ':memory:':
+        return MemoryBackend()
+    return SQLiteBackend(url or DEFAULT_DB)
+
+
+class HighscoreStore:
+    """Рекорды по (имя игрока, режим) с отложенной пакетной записью.
+
+    При batch=False каждый новый рекорд сразу пишется в хранилище (для
+    сравнения в бенчмарке).
+    """
+
+    def __init__(self, backend, batch=True):
+        self.backend = backend
+        self.batch = batch
+        self._scores = backend.load()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._scores)
+
+    def best(self, name, mode):
+        return self._scores.get((name, mode), 0)
+
+    def items(self):
+        """Пары ((имя, режим), рекорд) из кеша"""
+        return list(self._scores.items())
+
+    def record(self, name, mode, score):
+        """Учитывает результат; возвращает рекорд игрока после него"""
+        key = (name, mode)
+        best = self._scores.get(key, 0)
+        if score <= best:
+            return best
+        self._scores[key] = score
+        if not self.batch:
+            self.backend.write_many([(name, mode, score)])
+            return score
+        with self._lock:
+            self._pending[key] = score
+        return score
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Записывает накопленные рекорды одной пачкой; возвращает их количество"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            self.backend.write_many([(name, mode, score) for (name, mode), score in pending.items()])
+        except Exception:
+            # Не теряем рекорды: вернем их в очередь, более новые значения важнее
+            with self._lock:
+                for key, score in pending.items():
+                    self._pending[key] = max(score, self._pending.get(key, 0))
+            raise
+        return len(pending)
+
+    def close(self):
+        self.flush()
+        self.backend.close()
@@ -0,0 +1,191 @@
+"""Очередь между процессами без внешних сервисов: маленький брокер pub/sub на TCP.
+
+Брокер (``python -m match3.hub --port 7000``) принимает соединения воркеров
+и пересылает каждое опубликованное сообщение всем, кто подписан на его
+канал, включая отправителя - как Redis pub/sub. Адрес ``tcp://host:port``
+годится и для ROOM_QUEUE (HubQueue), и для SOCKETIO_MESSAGE_QUEUE
+(HubManager - менеджер клиентов python-socketio поверх того же брокера),
+поэтому несколько процессов server.py можно запустить на одной машине без
+Redis. Брокер не хранит сообщений и не ждет медленных подписчиков: это
+замена Redis для разработки и нагрузочных тестов, а не для боевой группы.
+
+Кадр: байт операции (S - подписка, P - публикация, M - доставка), длина
+канала (2 байта), длина данных (4 байта), канал, данные. Данные - JSON из
+match3.cluster.encode_message, брокер их не разбирает.
+"""
+import argparse
+import asyncio
+import socket
+import struct
+import threading
+from urllib.parse import urlsplit
+
+from socketio import PubSubManager
+
+from .cluster import decode_message, encode_message
+
+HEADER = struct.Struct('>cHI')
+SUBSCRIBE = b'S'
+PUBLISH = b'P'
+MESSAGE = b'M'
+
+
+def frame(op, channel, payload=b''):
+    channel = channel.encode()
+    return HEADER.pack(op, len(channel), len(payload)) + channel + payload
+
+
+def _address(url):
+    parts = urlsplit(url)
+    if parts.scheme != 'tcp' or not parts.port:
+        raise ValueError(f'Адрес брокера должен быть tcp://host:port, а не {url}')
+    return parts.hostname or '127.0.0.1', parts.port
+
+
+def _lock():
+    """Блокировка записи в сокет: под eventlet - зеленая, иначе ожидание остановило бы цикл событий"""
+    try:
+        from eventlet import patcher
+        from eventlet.semaphore import Semaphore
+    except ImportError:
+        return threading.Lock()
+    return Semaphore() if patcher.is_monkey_patched('socket') else threading.Lock()
+
+
+class HubConnection:
+    """Соединение с брокером: подписки, публикация и чтение доставленных сообщений"""
+
+    def __init__(self, url, timeout=10.0):
+        self._socket = socket.create_connection(_address(url), timeout=timeout)
+        self._socket.settimeout(None)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._socket.makefile('rb')
+        self._lock = _lock()
+
+    def _send(self, data):
+        with self._lock:
+            self._socket.sendall(data)
+
+    def subscribe(self, channel):
+        self._send(frame(SUBSCRIBE, channel))
+
+    def publish(self, channel, payload):
+        self._send(frame(PUBLISH, channel, payload))
+
+    def messages(self):
+        """Пары (канал, данные) по мере доставки; кончаются, когда брокер закрыл соединение"""
+        read = self._reader.read
+        while True:
+            header = read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            _, channel_size, size = HEADER.unpack(header)
+            channel = read(channel_size).decode()
+            yield channel, read(size)
+
+    def close(self):
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._reader.close()
+        self._socket.close()
+
+
+class HubQueue:
+    """Очередь пересылки событий комнат (как RedisQueue) на брокере tcp://"""
+
+    def __init__(self, url):
+        self._connection = HubConnection(url)
+        self._callbacks = {}
+
+    def publish(self, channel, message):
+        self._connection.publish(channel, encode_message(message))
+
+    def subscribe(self, channel, callback):
+        self._callbacks[channel] = callback
+        self._connection.subscribe(channel)
+
+    def listen(self):
+        """Цикл приема сообщений; запускается в фоновой задаче"""
+        for channel, payload in self._connection.messages():
+            callback = self._callbacks.get(channel)
+            if callback is not None:
+                callback(decode_message(payload))
+
+    def close(self):
+        self._connection.close()
+
+
+class HubManager(PubSubManager):
+    """Менеджер клиентов python-socketio на брокере tcp://: рассылка по комнатам между воркерами.
+
+    Сообщения идут в JSON, как у HubQueue, поэтому emit с несколькими
+    аргументами не поддерживается: кортеж аргументов станет одним списком.
+    """
+
+    name = 'hub'
+
+    def __init__(self, url, channel='flask-socketio', write_only=False, logger=None):
+        self._connection = HubConnection(url)
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        if not write_only:
+            self._connection.subscribe(channel)
+
+    def _publish(self, data):
+        self._connection.publish(self.channel, encode_message(data))
+
+    def _listen(self):
+        for channel, payload in self._connection.messages():
+            if channel == self.channel:
+                yield decode_message(payload)
+
+
+async def _serve(host, port, ready=None):
+    subscribers = {}
+
+    async def handle(reader, writer):
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        channels = []
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                op, channel_size, size = HEADER.unpack(header)
+                channel = (await reader.readexactly(channel_size)).decode()
+                payload = await reader.readexactly(size)
+                if op == SUBSCRIBE:
+                    subscribers.setdefault(channel, set()).add(writer)
+                    channels.append(channel)
+                elif op == PUBLISH:
+                    delivery = frame(MESSAGE, channel, payload)
+                    for subscriber in subscribers.get(channel, ()):
+                        subscriber.write(delivery)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for channel in channels:
+                subscribers.get(channel, set()).discard(writer)
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+def serve(host='127.0.0.1', port=7000, ready=None):
+    """Запускает брокер и работает до остановки процесса; ready(port) вызывается, когда порт открыт"""
+    asyncio.run(_serve(host, port, ready))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7000)
+    args = parser.parse_args()
+    serve(args.host, args.port, lambda port: print(f'match3 hub: tcp://{args.host}:{port}', flush=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Таблица лидеров: место игрока и страницы лучших результатов по режимам.
+
+Результаты режима хранятся в упорядоченном списке ключей (-очки, имя),
+разбитом на блоки ограниченного размера. Над длинами блоков построено
+дерево Фенвика, поэтому число ключей перед заданным (место игрока) и
+поиск ключа по номеру (начало страницы) стоят O(log n), а вставка и
+удаление - O(log n) плюс сдвиг внутри одного блока.
+
+Таблица живет в памяти одного процесса. Несколько воркеров строят ее из
+общей базы рекордов при запуске, а дальше каждый видит только свои
+обновления, поэтому их страницы лучших результатов расходятся.
+"""
+from bisect import bisect_left, insort
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+class RankedList:
+    """Упорядоченный список с поиском по номеру и подсчетом меньших ключей"""
+
+    LOAD = 512
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._blocks = [keys[start:start + self.LOAD] for start in range(0, len(keys), self.LOAD)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._len = len(keys)
+        self._build_tree()
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    def _build_tree(self):
+        tree = [0] + [len(block) for block in self._blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, block, delta):
+        tree = self._tree
+        i = block + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, block):
+        """Число ключей в блоках до block"""
+        tree = self._tree
+        total = 0
+        i = block
+        while i:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index):
+        """(блок, позиция в блоке) ключа с номером index"""
+        tree = self._tree
+        block = 0
+        step = 1 << (len(tree).bit_length() - 1)
+        while step:
+            nxt = block + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                block = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return block, index
+
+    def add(self, key):
+        blocks, maxes = self._blocks, self._maxes
+        self._len += 1
+        if not blocks:
+            blocks.append([key])
+            maxes.append(key)
+            self._build_tree()
+            return
+        i = bisect_left(maxes, key)
+        if i == len(blocks):
+            i -= 1
+        block = blocks[i]
+        insort(block, key)
+        maxes[i] = block[-1]
+        if len(block) > 2 * self.LOAD:
+            blocks[i:i + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            maxes[i:i + 1] = [block[self.LOAD - 1], block[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key):
+        blocks, maxes = self._blocks, self._maxes
+        i = bisect_left(maxes, key)
+        block = blocks[i] if i < len(blocks) else ()
+        j = bisect_left(block, key)
+        if j == len(block) or block[j] != key:
+            raise KeyError(key)
+        del block[j]
+        self._len -= 1
+        if block:
+            maxes[i] = block[-1]
+            self._tree_add(i, -1)
+        else:
+            del blocks[i], maxes[i]
+            self._build_tree()
+
+    def count_before(self, key):
+        """Сколько ключей меньше key"""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            return self._len
+        return self._prefix(i) + bisect_left(self._blocks[i], key)
+
+    def slice(self, start, count):
+        """Ключи с номерами start .. start + count - 1"""
+        if start >= self._len or count <= 0:
+            return []
+        i, j = self._locate(start)
+        result = []
+        blocks = self._blocks
+        while i < len(blocks) and len(result) < count:
+            result.extend(blocks[i][j:j + count - len(result)])
+            i += 1
+            j = 0
+        return result
+
+
+class Leaderboard:
+    """Лучшие результаты игроков по режимам; результат игрока может только расти"""
+
+    def __init__(self):
+        self._scores = {}
+        self._ranked = {}
+
+    @classmethod
+    def from_highscores(cls, items):
+        """Строит таблицы из пар ((имя, режим), рекорд), например HighscoreStore.items()"""
+        leaderboard = cls()
+        keys = {}
+        for (name, mode), score in items:
+            leaderboard._scores.setdefault(mode, {})[name] = score
+            keys.setdefault(mode, []).append((-score, name))
+        for mode, mode_keys in keys.items():
+            leaderboard._ranked[mode] = RankedList(mode_keys)
+        return leaderboard
+
+    def size(self, mode):
+        return len(self._scores.get(mode, ()))
+
+    def update(self, name, mode, score):
+        """Учитывает результат; возвращает True, если он стал новым лучшим для игрока"""
+        scores = self._scores.setdefault(mode, {})
+        ranked = self._ranked.get(mode)
+        if ranked is None:
+            ranked = self._ranked[mode] = RankedList()
+        old = scores.get(name)
+        if old is not None:
+            if score <= old:
+                return False
+            ranked.remove((-old, name))
+        scores[name] = score
+        ranked.add((-score, name))
+        return True
+
+    def score(self, name, mode):
+        return self._scores.get(mode, {}).get(name)
+
+    def rank(self, name, mode):
+        """Место игрока (1 - лучший, равные результаты делят место) или None"""
+        score = self.score(name, mode)
+        if score is None:
+            return None
+        return self._ranked[mode].count_before((-score, '')) + 1
+
+    def top(self, mode, limit=DEFAULT_LIMIT, offset=0):
+        """Страница таблицы: [{'rank', 'name', 'score'}] начиная с места offset + 1"""
+        ranked = self._ranked.get(mode)
+        if ranked is None:
+            return []
+        entries = []
+        rank = None
+        previous = None
+        for position, (negative, name) in enumerate(ranked.slice(offset, limit), offset):
+            if negative != previous:
+                rank = position + 1 if previous is not None else ranked.count_before((negative, '')) + 1
+                previous = negative
+            entries.append({'rank': rank, 'name': name, 'score': -negative})
+        return entries
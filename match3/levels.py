@@ -0,0 +1,214 @@
+"""Уровни: цели, лимит ходов и размер поля из файла данных.
+
+Файл - JSON вида ``{"levels": [...]}``, уровни идут в порядке прохождения::
+
+    {"id": "red-20", "name": "Красные кристаллы", "moves": 25,
+     "width": 8, "height": 8, "goals": {"red": 20}, "score": 0}
+
+goals - сколько фишек каждого цвета собрать, score - сколько очков набрать
+(10 за фишку, как в остальных режимах); нужна хотя бы одна цель. width и
+height по умолчанию 8. Файл читается и проверяется один раз: load_levels
+кеширует результат по пути, ошибка в файле - LevelError при запуске.
+
+Прогресс уровня считается по шагам каскада: коды убранных фишек уже есть
+в CascadeStep.codes, поэтому поле после хода не пересчитывается.
+"""
+import functools
+import json
+import os
+
+from .board import TILE_CODE, TILE_NAMES, TILE_TYPES
+from .replay import POINTS_PER_TILE
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels.json')
+MIN_SIDE = 4
+MAX_SIDE = 12
+MAX_MOVES = 200
+FIELDS = {'id', 'name', 'moves', 'width', 'height', 'goals', 'score'}
+LOG_MODE_PREFIX = 'level:'
+
+
+class LevelError(ValueError):
+    """Файл уровней не читается или уровень описан неверно"""
+
+
+class Level:
+    """Уровень: number - номер по порядку с единицы, goals - пары (код фишки, сколько собрать)"""
+
+    __slots__ = ('id', 'number', 'name', 'width', 'height', 'moves', 'goals', 'score')
+
+    def __init__(self, id, number, name, width, height, moves, goals, score):
+        self.id = id
+        self.number = number
+        self.name = name
+        self.width = width
+        self.height = height
+        self.moves = moves
+        self.goals = goals
+        self.score = score
+
+    def __repr__(self):
+        return f'Level({self.id!r})'
+
+    @property
+    def log_mode(self):
+        """Режим в журнале партии: по нему при повторе находится уровень и размер поля"""
+        return LOG_MODE_PREFIX + self.id
+
+    def progress(self):
+        return LevelProgress(self)
+
+
+class LevelProgress:
+    """Прогресс партии уровня: собранные фишки целей, очки и оставшиеся ходы"""
+
+    __slots__ = ('level', 'collected', 'score', 'moves_left')
+
+    def __init__(self, level):
+        self.level = level
+        self.collected = [0] * len(level.goals)
+        self.score = 0
+        self.moves_left = level.moves
+
+    def record(self, steps):
+        """Учитывает ход по его шагам каскада"""
+        collected = self.collected
+        for step in steps:
+            self.score += len(step.matches) * POINTS_PER_TILE
+            for i, (code, _) in enumerate(self.level.goals):
+                collected[i] += step.codes.count(code)
+        self.moves_left -= 1
+
+    @property
+    def completed(self):
+        return (self.score >= self.level.score
+                and all(count >= target for count, (_, target) in zip(self.collected, self.level.goals)))
+
+    @property
+    def failed(self):
+        return self.moves_left <= 0 and not self.completed
+
+    def data(self):
+        """levelData для клиента; targetCrystals и collectedCrystals - первая цель, как у старых клиентов"""
+        level = self.level
+        goals = [
+            {'tile': TILE_NAMES[code], 'target': target, 'collected': min(count, target)}
+            for count, (code, target) in zip(self.collected, level.goals)
+        ]
+        first = goals[0] if goals else {'target': 0, 'collected': 0}
+        return {
+            'level': level.number,
+            'levelId': level.id,
+            'name': level.name,
+            'goals': goals,
+            'targetScore': level.score,
+            'score': self.score,
+            'movesLeft': self.moves_left,
+            'targetCrystals': first['target'],
+            'collectedCrystals': first['collected'],
+        }
+
+
+class LevelSet:
+    """Уровни в порядке прохождения с поиском по id"""
+
+    def __init__(self, levels):
+        self.levels = tuple(levels)
+        self._by_id = {level.id: level for level in self.levels}
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __iter__(self):
+        return iter(self.levels)
+
+    @property
+    def first(self):
+        return self.levels[0]
+
+    def get(self, key):
+        """Уровень по id или номеру; None, если такого нет"""
+        if isinstance(key, int) and not isinstance(key, bool):
+            return self.levels[key - 1] if 1 <= key <= len(self.levels) else None
+        return self._by_id.get(key) if isinstance(key, str) else None
+
+    def next(self, level):
+        """Следующий уровень; после последнего - снова последний"""
+        return self.levels[min(level.number, len(self.levels) - 1)]
+
+    def from_log_mode(self, mode):
+        """Уровень партии по режиму из журнала; None для других режимов"""
+        if not mode.startswith(LOG_MODE_PREFIX):
+            return None
+        return self._by_id.get(mode[len(LOG_MODE_PREFIX):])
+
+
+def _positive_int(value, where, field, high):
+    if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= high:
+        raise LevelError(f'{where}: {field} - целое от 1 до {high}, а не {value!r}')
+    return value
+
+
+def parse_level(data, number):
+    """Проверяет описание уровня из файла и строит Level"""
+    where = f'Уровень {number}'
+    if not isinstance(data, dict):
+        raise LevelError(f'{where}: ожидается объект')
+    unknown = set(data) - FIELDS
+    if unknown:
+        raise LevelError(f'{where}: неизвестные поля {", ".join(sorted(unknown))}')
+
+    level_id = data.get('id')
+    if not isinstance(level_id, str) or not level_id:
+        raise LevelError(f'{where}: нужен непустой id')
+    where = f'Уровень {number} ({level_id})'
+    name = data.get('name', level_id)
+    if not isinstance(name, str):
+        raise LevelError(f'{where}: name - строка')
+
+    moves = _positive_int(data.get('moves'), where, 'moves', MAX_MOVES)
+    width = data.get('width', 8)
+    height = data.get('height', 8)
+    for field, side in (('width', width), ('height', height)):
+        if not isinstance(side, int) or isinstance(side, bool) or not MIN_SIDE <= side <= MAX_SIDE:
+            raise LevelError(f'{where}: {field} - целое от {MIN_SIDE} до {MAX_SIDE}, а не {side!r}')
+
+    goals = data.get('goals', {})
+    if not isinstance(goals, dict):
+        raise LevelError(f'{where}: goals - объект {{цвет: количество}}')
+    for tile in goals:
+        if tile not in TILE_CODE:
+            raise LevelError(f'{where}: неизвестный цвет {tile!r}, есть {", ".join(TILE_TYPES)}')
+    # Цели в порядке цветов, а не файла: так levelData не зависит от порядка ключей
+    goals = tuple((TILE_CODE[tile], _positive_int(goals[tile], where, f'goals.{tile}', width * height * moves))
+                  for tile in TILE_TYPES if tile in goals)
+
+    score = data.get('score', 0)
+    if not isinstance(score, int) or isinstance(score, bool) or score < 0:
+        raise LevelError(f'{where}: score - целое не меньше 0, а не {score!r}')
+    if not goals and not score:
+        raise LevelError(f'{where}: нужна цель - goals или score')
+    return Level(level_id, number, name, width, height, moves, goals, score)
+
+
+def parse_levels(data):
+    if not isinstance(data, dict) or not isinstance(data.get('levels'), list) or not data['levels']:
+        raise LevelError('Файл уровней: ожидается {"levels": [...]} хотя бы с одним уровнем')
+    levels = [parse_level(item, number) for number, item in enumerate(data['levels'], 1)]
+    seen = set()
+    for level in levels:
+        if level.id in seen:
+            raise LevelError(f'Уровень {level.number}: id {level.id!r} уже встречался')
+        seen.add(level.id)
+    return LevelSet(levels)
+
+
+@functools.lru_cache(maxsize=None)
+def load_levels(path=DEFAULT_PATH):
+    """Читает и проверяет файл уровней; повторный вызов с тем же путем берет результат из кеша"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise LevelError(f'Файл уровней {path}: {e}') from e
+    return parse_levels(data)
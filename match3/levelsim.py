@@ -0,0 +1,153 @@
+"""Проходимость уровней для настройки файла уровней: каждый уровень играется --games раз.
+
+Запуск: ``python -m match3.levelsim [--levels FILE]``. Ожидаемые доли
+прохождений уровней из match3/levels.json для игрока bot проверяет
+tests/test_levels.py: после правки уровня полосы там обновляются по
+свежему прогону.
+
+Партия играется как на сервере: поле размера уровня и новые фишки из
+генератора партии, после хода без доступных ходов поле перемешивается,
+прогресс считает LevelProgress. Игроки:
+
+* random - случайный доступный ход;
+* bot - как бот сервера: лучший по оценке ход с вероятностью --skill;
+* best - всегда лучший по оценке ход.
+
+Оценка хода - MoveEvaluator с весами: фишка цвета еще не выполненной цели
+стоит GOAL_WEIGHT, остальные - 1. Для каждого уровня и игрока сообщаются
+доля пройденных партий, медиана ходов до прохождения и средняя
+выполненная доля целей в непройденных партиях. Партии делятся между
+--workers процессами.
+"""
+import argparse
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from .bots import MoveEvaluator
+from .engine import resolve_move
+from .levels import DEFAULT_PATH, load_levels
+from .moves import MoveIndex, move_cells, playable_board, reshuffle
+from .replay import GameLog
+
+GOAL_WEIGHT = 4
+PLAYERS = ('random', 'bot', 'best')
+
+
+def goal_weights(progress):
+    """Веса фишек для оценки хода: цвета невыполненных целей дороже"""
+    weights = [1] * 256
+    for count, (code, target) in zip(progress.collected, progress.level.goals):
+        if count < target:
+            weights[code] = GOAL_WEIGHT
+    return weights
+
+
+def play(level, seed, skill):
+    """Партия уровня до победы или конца ходов; skill < 0 - случайный игрок.
+
+    Возвращает журнал и прогресс, как их оставил бы сервер.
+    """
+    log = GameLog(seed, level.log_mode)
+    rng = log.rng()
+    picker = random.Random(seed ^ 0x5EED)
+    evaluator = MoveEvaluator(level.width, level.height)
+    index = MoveIndex(playable_board(rng, level.width, level.height))
+    board = index.board
+    slot = log.slot('player', 'player')
+    progress = level.progress()
+    while not (progress.completed or progress.failed):
+        if skill < 0:
+            code = picker.choice(sorted(index.moves))
+        else:
+            evaluator.weights = goal_weights(progress)
+            code = evaluator.choose(board, index.moves, picker, skill)
+        row1, col1, row2, col2 = move_cells(code, board.width)
+        steps = resolve_move(board, row1, col1, row2, col2, rng)
+        log.record(slot, code)
+        progress.record(steps)
+        changed = [(row1, col1), (row2, col2)]
+        for step in steps:
+            changed.extend(step.changed)
+        index.update(changed)
+        if progress.completed or progress.failed:
+            log.no_reshuffle = not index
+        elif not index:
+            reshuffle(board, rng)
+            index.rebuild()
+    return log, progress
+
+
+def goal_fraction(progress):
+    """Выполненная доля целей: среднее по целям цветов и очкам, каждая не больше 1"""
+    level = progress.level
+    parts = [min(count / target, 1.0) for count, (_, target) in zip(progress.collected, level.goals)]
+    if level.score:
+        parts.append(min(progress.score / level.score, 1.0))
+    return sum(parts) / len(parts)
+
+
+def _simulate(path, level_id, skill, seeds):
+    level = load_levels(path).get(level_id)
+    passed = []
+    failed = []
+    for seed in seeds:
+        _, progress = play(level, seed, skill)
+        if progress.completed:
+            passed.append(level.moves - progress.moves_left)
+        else:
+            failed.append(goal_fraction(progress))
+    return passed, failed
+
+
+def simulate(path, level, skill, games, seed, workers=None, chunk_size=100):
+    """(ходов в каждой пройденной партии, доля целей в каждой непройденной)"""
+    seeds = [seed * 1_000_003 + n for n in range(games)]
+    chunks = [seeds[start:start + chunk_size] for start in range(0, games, chunk_size)]
+    if not workers:
+        results = [_simulate(path, level.id, skill, chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_simulate, [path] * len(chunks), [level.id] * len(chunks),
+                                    [skill] * len(chunks), chunks))
+    passed = [moves for chunk_passed, _ in results for moves in chunk_passed]
+    failed = [fraction for _, chunk_failed in results for fraction in chunk_failed]
+    return passed, failed
+
+
+def run(path=DEFAULT_PATH, games=2000, skill=0.85, players=PLAYERS, workers=None, seed=1):
+    skills = {'random': -1.0, 'bot': skill, 'best': 1.0}
+    results = {'levels_file': path, 'games_per_level': games, 'bot_skill': skill}
+    for level in load_levels(path):
+        entry = {
+            'name': level.name,
+            'size': f'{level.width}x{level.height}',
+            'moves': level.moves,
+        }
+        for player in players:
+            passed, failed = simulate(path, level, skills[player], games, seed, workers)
+            entry[player] = {
+                'pass_rate': round(len(passed) / games, 3),
+                'moves_to_pass_p50': sorted(passed)[len(passed) // 2] if passed else None,
+                'failed_goal_fraction': round(sum(failed) / len(failed), 3) if failed else None,
+            }
+        results[level.id] = entry
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--levels', default=DEFAULT_PATH, help='файл уровней')
+    parser.add_argument('--games', type=int, default=2000, help='партий на уровень и игрока')
+    parser.add_argument('--skill', type=float, default=0.85, help='skill игрока bot')
+    parser.add_argument('--players', default=','.join(PLAYERS), help='игроки через запятую')
+    parser.add_argument('--workers', type=int, default=None, help='размер пула процессов (по умолчанию без пула)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    players = [player for player in args.players.split(',') if player]
+    results = run(args.levels, args.games, args.skill, players, args.workers, args.seed)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Структурированный журнал сервера: события в JSON-строках через буфер.
+
+Обработчик события только кладет запись в ограниченную очередь, а в поток
+вывода ее пишет отдельный поток ОС (logging.handlers.QueueListener),
+поэтому медленный stdout не останавливает цикл событий. Если очередь
+переполнена, запись отбрасывается и учитывается в dropped.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на событие: время, уровень, событие и его поля"""
+
+    def format(self, record):
+        data = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'event': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', ()))
+        if record.exc_text:
+            data['error'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class BufferedHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не ждет места в очереди, а отбрасывает запись"""
+
+    def __init__(self, max_pending):
+        super().__init__(queue.Queue(max_pending))
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Трассировка форматируется сразу, чтобы запись не держала кадры стека
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class EventLog:
+    """Журнал событий: log.info('game_started', room=room, players=2)"""
+
+    def __init__(self, name='match3'):
+        self.logger = logging.getLogger(name)
+
+    def _log(self, level, event, fields, exc_info=False):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, event, extra={'fields': fields}, exc_info=exc_info)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def setup_logging(stream=None, level=logging.INFO, max_pending=10000, name='match3'):
+    """Подключает буферизованный JSON-вывод к журналу name; возвращает (handler, listener)"""
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    handler = BufferedHandler(max_pending)
+    listener = logging.handlers.QueueListener(handler.queue, output)
+    listener.start()
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.addHandler(handler)
+    logger.propagate = False
+    return handler, listener
@@ -0,0 +1,135 @@
+"""Подбор соперников: очередь игроков, которые собираются в комнаты по 2-4.
+
+Игроки ждут в корзинах по уровню игры (номер корзины задает вызывающий,
+например по рекорду). В корзине они лежат в порядке прихода, поэтому
+постановка и отмена стоят O(1). Комната собирается сразу, как только в
+корзине набралось max_players. Если игрок ждет дольше max_wait, комната
+собирается из тех, кто есть (не меньше min_players). После widen_after
+секунд ожидания в комнату можно взять игроков из соседних корзин. Сроки
+ожидания лежат в куче, поэтому poll стоит O(log n) на каждый истекший срок.
+"""
+import heapq
+import itertools
+import time
+
+
+class MatchPolicy:
+    """Сколько ждать полной комнаты, прежде чем начать неполную"""
+
+    def __init__(self, min_players=2, max_players=4, max_wait=10.0, widen_after=20.0, recheck=1.0):
+        if not 2 <= min_players <= max_players:
+            raise ValueError('Нужно 2 <= min_players <= max_players')
+        self.min_players = min_players
+        self.max_players = max_players
+        self.max_wait = max_wait
+        self.widen_after = widen_after
+        self.recheck = recheck
+
+
+class Ticket:
+    __slots__ = ('player', 'bucket', 'queued_at', 'data')
+
+    def __init__(self, player, bucket, queued_at, data):
+        self.player = player
+        self.bucket = bucket
+        self.queued_at = queued_at
+        self.data = data
+
+
+class Matchmaker:
+    """Очередь подбора; enqueue и poll возвращают собранные группы (списки Ticket)"""
+
+    def __init__(self, policy=None, clock=time.monotonic):
+        self.policy = policy or MatchPolicy()
+        self.clock = clock
+        self._tickets = {}
+        self._buckets = {}
+        self._deadlines = []
+        self._counter = itertools.count()
+        self.matched = 0
+        self.rooms = 0
+
+    def __len__(self):
+        return len(self._tickets)
+
+    def __contains__(self, player):
+        return player in self._tickets
+
+    def enqueue(self, player, bucket=0, data=None):
+        """Ставит игрока в очередь (повторная постановка заменяет прежнюю)"""
+        self.cancel(player)
+        now = self.clock()
+        ticket = Ticket(player, bucket, now, data)
+        self._tickets[player] = ticket
+        self._buckets.setdefault(bucket, {})[player] = ticket
+        heapq.heappush(self._deadlines, (now + self.policy.max_wait, next(self._counter), ticket))
+        return self._form(bucket, now)
+
+    def cancel(self, player):
+        """Убирает игрока из очереди; запись в куче сроков удалится лениво"""
+        ticket = self._tickets.pop(player, None)
+        if ticket is None:
+            return False
+        bucket = self._buckets[ticket.bucket]
+        del bucket[player]
+        if not bucket:
+            del self._buckets[ticket.bucket]
+        return True
+
+    def poll(self, now=None):
+        """Собирает неполные комнаты для игроков, чей срок ожидания истек"""
+        now = self.clock() if now is None else now
+        groups = []
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, _, ticket = heapq.heappop(deadlines)
+            if self._tickets.get(ticket.player) is not ticket:
+                continue
+            groups.extend(self._form(ticket.bucket, now))
+            if self._tickets.get(ticket.player) is ticket:
+                # Соперников пока нет - проверим снова чуть позже
+                heapq.heappush(deadlines, (now + self.policy.recheck, next(self._counter), ticket))
+        return groups
+
+    def _form(self, bucket, now):
+        policy = self.policy
+        groups = []
+        waiting = self._buckets.get(bucket)
+        while waiting and len(waiting) >= policy.max_players:
+            groups.append(self._take(list(itertools.islice(waiting.values(), policy.max_players))))
+            waiting = self._buckets.get(bucket)
+        if not waiting:
+            return groups
+
+        oldest = next(iter(waiting.values()))
+        waited = now - oldest.queued_at
+        if waited < policy.max_wait:
+            return groups
+        candidates = list(waiting.values())
+        if len(candidates) < policy.max_players and waited >= policy.widen_after:
+            for neighbour in (bucket - 1, bucket + 1):
+                candidates.extend(self._buckets.get(neighbour, {}).values())
+            candidates[1:] = sorted(candidates[1:], key=lambda ticket: ticket.queued_at)
+        if len(candidates) >= policy.min_players:
+            groups.append(self._take(candidates[:policy.max_players]))
+        return groups
+
+    def _take(self, tickets):
+        for ticket in tickets:
+            self.cancel(ticket.player)
+        self.matched += len(tickets)
+        self.rooms += 1
+        return tickets
+
+    def stats(self):
+        now = self.clock()
+        # Первый билет корзины - самый старый в ней
+        oldest = min((next(iter(waiting.values())).queued_at for waiting in self._buckets.values()),
+                     default=now)
+        return {
+            'queued': len(self._tickets),
+            'buckets': len(self._buckets),
+            'longest_wait_sec': round(now - oldest, 1),
+            'rooms_formed': self.rooms,
+            'average_room_size': round(self.matched / self.rooms, 2) if self.rooms else 0,
+        }
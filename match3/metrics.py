@@ -0,0 +1,163 @@
+"""Метрики сервера в текстовом формате Prometheus.
+
+Счетчики и гистограммы создаются один раз при запуске, у гистограммы
+массив корзин выделен заранее: запись - поиск корзины bisect и два
+сложения, без выделения памяти на событие. Метки задаются при создании
+(например, отдельная гистограмма на каждую фазу хода), поэтому на горячем
+пути нет поиска по словарю меток. Значения, которые дешевле посчитать при
+чтении (число комнат, сокетов), задаются функцией у Gauge.
+"""
+import json
+from bisect import bisect_left
+
+# Корзины для длительностей в секундах: от 10 мкс до 2.5 с
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _labels(labels, extra=None):
+    pairs = list(labels.items())
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        yield self.name + _labels(self.labels), self.value
+
+
+class Gauge:
+    """Значение, заданное set или функцией fn; fn может вернуть {значение метки: число} для label"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, fn=None, label=None, labels=None):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.label = label
+        self.labels = labels or {}
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        value = self.fn() if self.fn is not None else self.value
+        if self.label is None:
+            yield self.name + _labels(self.labels), value
+            return
+        for key, item in sorted(value.items()):
+            yield self.name + _labels(self.labels, (self.label, key)), item
+
+
+class Histogram:
+    kind = 'histogram'
+
+    __slots__ = ('name', 'help', 'labels', 'bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labels=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction):
+        """Верхняя граница корзины, в которую попадает доля fraction наблюдений"""
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target and count:
+                return bound
+        return 0.0
+
+    def samples(self):
+        seen = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            seen += count
+            yield self.name + '_bucket' + _labels(self.labels, ('le', _number(float(bound)))), seen
+        yield self.name + '_sum' + _labels(self.labels), self.sum
+        yield self.name + '_count' + _labels(self.labels), self.count
+
+
+class Registry:
+    """Все метрики процесса; render отдает их в текстовом формате Prometheus"""
+
+    def __init__(self, prefix='match3_'):
+        self.prefix = prefix
+        self._metrics = []
+
+    def add(self, metric):
+        metric.name = self.prefix + metric.name
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, **kwargs):
+        return self.add(Counter(name, help, **kwargs))
+
+    def gauge(self, name, help, **kwargs):
+        return self.add(Gauge(name, help, **kwargs))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, **kwargs):
+        return self.add(Histogram(name, help, buckets, **kwargs))
+
+    def histograms(self, name, help, label, values, buckets=LATENCY_BUCKETS):
+        """Гистограммы одного имени по значениям метки: {значение: Histogram}"""
+        return {value: self.histogram(name, help, buckets, labels={label: value}) for value in values}
+
+    def render(self):
+        lines = []
+        described = set()
+        for metric in self._metrics:
+            if metric.name not in described:
+                described.add(metric.name)
+                lines.append(f'# HELP {metric.name} {metric.help}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for sample, value in metric.samples():
+                lines.append(f'{sample} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def json_size(data):
+    """Размер сообщения Socket.IO: JSON без бинарных полей плюс их длина"""
+    binary = 0
+
+    def attachment(value):
+        nonlocal binary
+        binary += len(value)
+        return None
+
+    text = json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=attachment)
+    return len(text.encode('utf-8')) + binary
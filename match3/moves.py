@@ -0,0 +1,231 @@
+"""Индекс доступных ходов: обмены соседних фишек, которые дают совпадение"""
+import random
+
+from .board import BOARD_HEIGHT, BOARD_WIDTH, EMPTY
+from .engine import create_game_board
+
+# Код хода: номер левой или верхней клетки * 2 + направление
+RIGHT = 0
+DOWN = 1
+
+
+def move_code(row1, col1, row2, col2, width):
+    """Код обмена двух соседних клеток (порядок клеток не важен)"""
+    if (row2, col2) < (row1, col1):
+        row1, col1, row2, col2 = row2, col2, row1, col1
+    return (row1 * width + col1) * 2 + (DOWN if row2 != row1 else RIGHT)
+
+
+def move_cells(code, width):
+    """Клетки (row1, col1, row2, col2) хода по его коду"""
+    index, direction = divmod(code, 2)
+    row, col = divmod(index, width)
+    if direction == DOWN:
+        return row, col, row + 1, col
+    return row, col, row, col + 1
+
+
+class _Layout:
+    """Заранее посчитанные для размера поля шаблоны совпадений и зависимости ходов.
+
+    Для хода с кодом code хранится (p, q, patterns_p, patterns_q): фишка из q
+    приходит в p и дает тройку, если обе клетки одной из пар patterns_p
+    совпадают с ней по цвету (и наоборот для q). deps[cell] - коды ходов,
+    результат которых зависит от клетки cell.
+    """
+
+    _cache = {}
+
+    def __init__(self, width, height):
+        self.codes = []
+        self.moves = {}
+        deps = [set() for _ in range(width * height)]
+        for row in range(height):
+            for col in range(width):
+                for direction in (RIGHT, DOWN):
+                    code = (row * width + col) * 2 + direction
+                    row2, col2 = (row + 1, col) if direction == DOWN else (row, col + 1)
+                    if row2 >= height or col2 >= width:
+                        continue
+                    p = row * width + col
+                    q = row2 * width + col2
+                    patterns_p = self._patterns(row, col, q, width, height)
+                    patterns_q = self._patterns(row2, col2, p, width, height)
+                    self.codes.append(code)
+                    self.moves[code] = (p, q, patterns_p, patterns_q)
+                    for cell in {p, q}.union(*patterns_p, *patterns_q):
+                        deps[cell].add(code)
+        self.deps = [tuple(codes) for codes in deps]
+
+    @staticmethod
+    def _patterns(row, col, source, width, height):
+        """Пары клеток, образующие тройку с клеткой (row, col); пары с source исключены"""
+        patterns = []
+        for dr, dc in ((0, 1), (1, 0)):
+            line = []
+            for step in (-2, -1, 1, 2):
+                r, c = row + dr * step, col + dc * step
+                line.append(r * width + c if 0 <= r < height and 0 <= c < width else None)
+            for x, y in ((line[0], line[1]), (line[1], line[2]), (line[2], line[3])):
+                if x is not None and y is not None and source not in (x, y):
+                    patterns.append((x, y))
+        return tuple(patterns)
+
+    @classmethod
+    def get(cls, width, height):
+        layout = cls._cache.get((width, height))
+        if layout is None:
+            layout = cls._cache[(width, height)] = cls(width, height)
+        return layout
+
+
+def _makes_match(cells, move):
+    p, q, patterns_p, patterns_q = move
+    a = cells[p]
+    b = cells[q]
+    if a == b:
+        return False
+    for x, y in patterns_p:
+        if cells[x] == b and cells[y] == b:
+            return True
+    for x, y in patterns_q:
+        if cells[x] == a and cells[y] == a:
+            return True
+    return False
+
+
+def swap_makes_match(board, row1, col1, row2, col2):
+    """Даст ли обмен совпадение; само поле не меняется"""
+    layout = _Layout.get(board.width, board.height)
+    return _makes_match(board.cells, layout.moves[move_code(row1, col1, row2, col2, board.width)])
+
+
+def code_makes_match(board, code):
+    """Даст ли совпадение ход с кодом code; неизвестный код - False"""
+    move = _Layout.get(board.width, board.height).moves.get(code)
+    return move is not None and _makes_match(board.cells, move)
+
+
+def has_moves(board):
+    """Есть ли на поле хоть один ход; проверка останавливается на первом найденном"""
+    layout = _Layout.get(board.width, board.height)
+    cells = board.cells
+    for move in layout.moves.values():
+        if _makes_match(cells, move):
+            return True
+    return False
+
+
+class MoveIndex:
+    """Множество кодов ходов, дающих совпадение, для одного поля.
+
+    После изменения поля достаточно вызвать ``update`` со списком
+    измененных клеток: пересчитываются только ходы, результат которых
+    зависит от этих клеток.
+    """
+
+    __slots__ = ('board', 'moves', '_layout')
+
+    def __init__(self, board):
+        self.board = board
+        self._layout = _Layout.get(board.width, board.height)
+        self.moves = set()
+        self.rebuild()
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __contains__(self, code):
+        return code in self.moves
+
+    def has(self, row1, col1, row2, col2):
+        return move_code(row1, col1, row2, col2, self.board.width) in self.moves
+
+    def rebuild(self):
+        cells = self.board.cells
+        moves = self._layout.moves
+        self.moves = {code for code in self._layout.codes if _makes_match(cells, moves[code])}
+
+    def update(self, changed):
+        """Пересчитывает ходы, зависящие от измененных клеток (row, col)"""
+        width = self.board.width
+        deps = self._layout.deps
+        candidates = set()
+        for row, col in changed:
+            candidates.update(deps[row * width + col])
+
+        cells = self.board.cells
+        layout_moves = self._layout.moves
+        moves = self.moves
+        for code in candidates:
+            if _makes_match(cells, layout_moves[code]):
+                moves.add(code)
+            else:
+                moves.discard(code)
+
+    def hint(self, rng=None):
+        """Случайный доступный ход (row1, col1, row2, col2) или None"""
+        if not self.moves:
+            return None
+        return move_cells((rng or random).choice(sorted(self.moves)), self.board.width)
+
+
+def reshuffle(board, rng=None, attempts=20):
+    """Перемешивает фишки так, чтобы не было совпадений и был хотя бы один ход.
+
+    Фишки раскладываются по одной, как в create_game_board: в клетку
+    ставится первая из оставшихся фишек, которая не замыкает тройку с
+    соседями слева или сверху. Если так разложить не удалось, поле
+    генерируется заново.
+    """
+    rng = rng or random
+    width, height = board.width, board.height
+    tiles = list(board.cells)
+    for _ in range(attempts):
+        rng.shuffle(tiles)
+        if _deal(tiles, width, height) and MoveIndex(_as_board(board, tiles)):
+            board.cells[:] = bytes(tiles)
+            return board
+
+    while True:
+        fresh = create_game_board(rng, width, height)
+        if MoveIndex(fresh):
+            board.cells[:] = fresh.cells
+            return board
+
+
+def _deal(tiles, width, height):
+    """Переставляет tiles на месте без троек; False, если фишки не сложились"""
+    for index in range(len(tiles)):
+        row, col = divmod(index, width)
+        banned_left = tiles[index - 1] if col >= 2 and tiles[index - 1] == tiles[index - 2] else EMPTY
+        banned_up = (tiles[index - width] if row >= 2 and tiles[index - width] == tiles[index - 2 * width]
+                     else EMPTY)
+        for pick in range(index, len(tiles)):
+            if tiles[pick] != banned_left and tiles[pick] != banned_up:
+                tiles[index], tiles[pick] = tiles[pick], tiles[index]
+                break
+        else:
+            return False
+    return True
+
+
+def _as_board(board, tiles):
+    copy = board.copy()
+    copy.cells[:] = bytes(tiles)
+    return copy
+
+
+def playable_board(rng=None, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """Поле без совпадений, на котором есть хотя бы один ход"""
+    return generate_board(rng, width, height)[0]
+
+
+def generate_board(rng=None, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """То же, что playable_board; возвращает (поле, число сгенерированных полей)"""
+    attempts = 0
+    while True:
+        attempts += 1
+        board = create_game_board(rng, width, height)
+        if has_moves(board):
+            return board, attempts
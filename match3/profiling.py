@@ -0,0 +1,195 @@
+"""Профилирование по запросу: выборочный профилировщик стеков и замер обработчиков.
+
+SamplingProfiler раз в interval секунд снимает стеки потоков из отдельного
+потока ОС (sys._current_frames) и считает одинаковые стеки. В выборке
+хранятся объекты кода, строки собираются только в collapsed, поэтому
+снимок стоит десятки микросекунд. Пока код на Python держит GIL, поток
+профилировщика просыпается не чаще sys.getswitchinterval() (5 мс), так
+что интервал меньше этого дает не больше выборок. Результат - свернутые стеки для
+flamegraph.pl и speedscope: "поток;внешняя функция;...;внутренняя число".
+Под eventlet все зеленые потоки идут в одном потоке ОС, и в его стеке
+видно, что выполняется сейчас: обработчик события или цикл событий (hub).
+
+HandlerTimer замеряет каждый N-й вызов обработчиков событий и, пока
+работает профилировщик, помечает стеки именем события (корень
+"event:make_move"). Если обработчик уступает цикл (ожидание пула
+вычислений), выборки других зеленых потоков в это время тоже попадут под
+его метку.
+"""
+import heapq
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class ProfilerBusy(RuntimeError):
+    """Профилировщик уже запущен"""
+
+
+def frame_name(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class Profile:
+    """Результат профилирования: число выборок по (поток, метка, стек)"""
+
+    def __init__(self, stacks, samples, seconds, interval):
+        self.stacks = stacks
+        self.samples = samples
+        self.seconds = seconds
+        self.interval = interval
+
+    def collapsed(self):
+        """Свернутые стеки, по строке на стек, самые частые сверху"""
+        names = {}
+        lines = []
+        for (thread, label, codes), count in self.stacks.most_common():
+            frames = [thread] if label is None else [thread, f'event:{label}']
+            for code in reversed(codes):
+                name = names.get(code)
+                if name is None:
+                    name = names[code] = frame_name(code)
+                frames.append(name)
+            lines.append(f"{';'.join(frames)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Снимает стеки раз в interval секунд между start и stop"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.labels = {}  # поток -> событие, которое он сейчас обрабатывает
+        self.running = False
+        self._lock = threading.Lock()
+        self._stop = None
+        self._thread = None
+        self._stacks = None
+        self._started = 0.0
+        self._interval = interval
+
+    def start(self, interval=None, threads=None):
+        """Запускает выборку; threads - номера потоков (None - все, кроме самого профилировщика)"""
+        with self._lock:
+            if self.running:
+                raise ProfilerBusy('профилировщик уже запущен')
+            self.running = True
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._started = time.monotonic()
+        self._interval = interval or self.interval
+        self._thread = threading.Thread(target=self._run, args=(self._stacks, self._stop, self._interval, threads),
+                                        name='match3-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает выборку и возвращает Profile"""
+        self._stop.set()
+        self._thread.join()
+        stacks = self._stacks
+        profile = Profile(stacks, sum(stacks.values()), time.monotonic() - self._started, self._interval)
+        self.labels.clear()
+        self._stacks = None
+        with self._lock:
+            self.running = False
+        return profile
+
+    def _run(self, stacks, stop, interval, threads):
+        own = threading.get_ident()
+        names = {}
+        while not stop.wait(interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (threads is not None and ident not in threads):
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                name = names.get(ident)
+                if name is None:
+                    name = names[ident] = next(
+                        (thread.name for thread in threading.enumerate() if thread.ident == ident), str(ident))
+                stacks[name, self.labels.get(ident), tuple(codes)] += 1
+
+
+class HandlerTimer:
+    """Замер каждого N-го вызова обработчиков: гистограмма на событие и самые медленные вызовы.
+
+    histograms - {событие: Histogram}; события не из этого словаря не замеряются.
+    rate - доля замеряемых вызовов (0 - выключено, 1 - каждый вызов).
+    """
+
+    def __init__(self, histograms, rate=0.0, slowest=20, profiler=None):
+        self.histograms = histograms
+        self.profiler = profiler
+        self.keep = slowest
+        self.calls = dict.fromkeys(histograms, 0)
+        self.max = dict.fromkeys(histograms, 0.0)
+        self._slowest = []
+        self._order = 0
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        self.rate = min(max(float(rate), 0.0), 1.0)
+        self.every = round(1 / self.rate) if self.rate else 0
+
+    def call(self, event, fn, args, room=None):
+        """Вызывает fn(*args); каждый every-й вызов события замеряется"""
+        profiler = self.profiler
+        if profiler is not None and profiler.running:
+            ident = threading.get_ident()
+            profiler.labels[ident] = event
+            try:
+                return self._call(event, fn, args, room)
+            finally:
+                profiler.labels.pop(ident, None)
+        return self._call(event, fn, args, room)
+
+    def _call(self, event, fn, args, room):
+        if not self.every or event not in self.calls:
+            return fn(*args)
+        self.calls[event] += 1
+        if self.calls[event] % self.every:
+            return fn(*args)
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._record(event, time.perf_counter() - started, room)
+
+    def _record(self, event, seconds, room):
+        self.histograms[event].observe(seconds)
+        if seconds > self.max[event]:
+            self.max[event] = seconds
+        self._order += 1
+        entry = (seconds, self._order, event, room, time.time())
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def stats(self):
+        events = {}
+        for event, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            # Квантили - верхние границы корзин, не выше максимума
+            quantile = lambda fraction: round(min(histogram.quantile(fraction), self.max[event]) * 1000, 3)
+            events[event] = {
+                'calls': self.calls[event],
+                'sampled': histogram.count,
+                'mean_ms': round(histogram.sum / histogram.count * 1000, 3),
+                'p50_ms': quantile(0.5),
+                'p99_ms': quantile(0.99),
+                'max_ms': round(self.max[event] * 1000, 3),
+            }
+        return {
+            'rate': self.rate,
+            'events': events,
+            'slowest': [
+                {'event': event, 'room': room, 'ms': round(seconds * 1000, 3), 'at': round(at, 3)}
+                for seconds, _, event, room, at in sorted(self._slowest, reverse=True)
+            ],
+        }
@@ -0,0 +1,123 @@
+"""Воспроизводимые партии: зерно генератора, журнал ходов и повтор партии.
+
+Все случайное в партии (начальное поле, новые фишки, перемешивание)
+берется из random.Random(seed) этой партии, поэтому партия однозначно
+задается зерном и списком успешных ходов. Ход в журнале - два varint:
+код обмена из match3.moves и номер игрока в порядке входа в партию.
+Одиночная партия тратит на ход один-два байта на код и байт на игрока.
+
+replay повторяет партию так же, как сервер: тот же генератор, те же
+каскады и перемешивание поля, когда ходов не осталось. Индекс ходов при
+повторе не ведется: ход проверяется по шаблонам совпадений за O(1), а
+наличие ходов - обходом до первого найденного хода.
+"""
+import random
+
+from .board import BOARD_HEIGHT, BOARD_WIDTH, TILE_CODE, TILE_CODES
+from .engine import resolve_move
+from .moves import code_makes_match, has_moves, move_cells, playable_board, reshuffle
+from .wire import decode_varint, encode_varint
+
+RED = TILE_CODE['red']
+POINTS_PER_TILE = 10
+
+
+class ReplayError(ValueError):
+    """Журнал не сходится с правилами: ход без совпадений или неизвестный игрок"""
+
+
+def new_seed():
+    return random.SystemRandom().getrandbits(63)
+
+
+class GameLog:
+    """Журнал партии, в который только дописываются ходы.
+
+    players - имена игроков по номерам; no_reshuffle - после последнего
+    хода поле осталось без ходов и не перемешивалось (партия на нем кончилась).
+    """
+
+    __slots__ = ('seed', 'mode', 'players', 'moves', 'count', 'no_reshuffle', '_slots')
+
+    def __init__(self, seed, mode, players=None, moves=b'', count=None, no_reshuffle=False):
+        self.seed = seed
+        self.mode = mode
+        self.players = list(players or [])
+        self.moves = bytearray(moves)
+        self.count = count if count is not None else sum(1 for _ in self)
+        self.no_reshuffle = no_reshuffle
+        self._slots = {}
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Пары (номер игрока, код хода)"""
+        moves = self.moves
+        pos = 0
+        while pos < len(moves):
+            code, pos = decode_varint(moves, pos)
+            slot, pos = decode_varint(moves, pos)
+            yield slot, code
+
+    def rng(self):
+        return random.Random(self.seed)
+
+    def slot(self, sid, name):
+        """Номер игрока в журнале; новый игрок получает следующий номер"""
+        slot = self._slots.get(sid)
+        if slot is None:
+            slot = self._slots[sid] = len(self.players)
+            self.players.append(name)
+        return slot
+
+    def record(self, slot, code):
+        self.moves += encode_varint(code)
+        self.moves += encode_varint(slot)
+        self.count += 1
+
+
+class Replay:
+    """Итог повтора: поле, очки по номерам игроков, собранные красные фишки
+    и все собранные фишки по кодам (collected[код])"""
+
+    __slots__ = ('board', 'scores', 'collected_red', 'collected', 'reshuffles')
+
+    def __init__(self, board, scores, collected, reshuffles):
+        self.board = board
+        self.scores = scores
+        self.collected = collected
+        self.collected_red = collected[RED]
+        self.reshuffles = reshuffles
+
+
+def replay(log, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """Повторяет партию на поле width x height; ReplayError, если какой-то ход невозможен"""
+    rng = log.rng()
+    board = playable_board(rng, width, height)
+    scores = [0] * len(log.players)
+    collected = [0] * (len(TILE_CODES) + 1)
+    reshuffles = 0
+    last = len(log) - 1
+
+    for number, (slot, code) in enumerate(log):
+        if slot >= len(scores):
+            raise ReplayError(f'Ход {number}: нет игрока с номером {slot}')
+        if not code_makes_match(board, code):
+            raise ReplayError(f'Ход {number}: обмен {code} не дает совпадений')
+        row1, col1, row2, col2 = move_cells(code, width)
+        for step in resolve_move(board, row1, col1, row2, col2, rng):
+            scores[slot] += len(step.matches) * POINTS_PER_TILE
+            for tile in step.codes:
+                collected[tile] += 1
+        # Сервер перемешивает поле после хода, пока игра идет
+        if (number < last or not log.no_reshuffle) and not has_moves(board):
+            reshuffle(board, rng)
+            reshuffles += 1
+
+    return Replay(board, scores, collected, reshuffles)
+
+
+def replay_many(logs):
+    """Повторяет пачку партий; итоги в том же порядке"""
+    return [replay(log) for log in logs]
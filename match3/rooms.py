@@ -0,0 +1,136 @@
+"""Жизненный цикл комнат: состояния, выселение простаивающих и лимит комнат.
+
+Состояния комнаты::
+
+    waiting -> active -> finished -> active (перезапуск)
+        \\          \\          \\
+         +----------+----------+--> closed
+
+Для каждой комнаты в колесе таймеров стоит одна проверка простоя. События
+комнаты только обновляют время последней активности; когда проверка
+срабатывает раньше срока, она переставляется на оставшееся время. Так
+обновление активности стоит O(1), а полных обходов комнат нет.
+"""
+
+WAITING = 'waiting'
+ACTIVE = 'active'
+FINISHED = 'finished'
+CLOSED = 'closed'
+
+STATES = (WAITING, ACTIVE, FINISHED, CLOSED)
+TRANSITIONS = {
+    WAITING: {ACTIVE, CLOSED},
+    ACTIVE: {FINISHED, CLOSED},
+    FINISHED: {ACTIVE, CLOSED},
+    CLOSED: set(),
+}
+
+
+class RoomLimitReached(Exception):
+    """Достигнут лимит живых комнат; retry_after - через сколько секунд повторить"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Достигнут лимит комнат, повторите через {retry_after} с')
+        self.retry_after = retry_after
+
+
+class RoomRegistry:
+    """Состояния живых комнат и их таймеры простоя.
+
+    idle_timeout - сколько секунд без событий живет ожидающая или идущая
+    игра, finished_timeout - законченная; on_evict(room) вызывается, когда
+    комната простояла дольше. max_rooms - лимит живых комнат (None - без
+    лимита).
+    """
+
+    def __init__(self, wheel, on_evict, idle_timeout=600.0, finished_timeout=120.0,
+                 max_rooms=None, retry_after=5):
+        self.wheel = wheel
+        self.on_evict = on_evict
+        self.idle_timeout = idle_timeout
+        self.finished_timeout = finished_timeout
+        self.max_rooms = max_rooms
+        self.retry_after = retry_after
+        self._states = {}
+        self._last_seen = {}
+        self._timers = {}
+        self.closed = 0
+        self.evicted = 0
+        self.rejected = 0
+
+    def __contains__(self, room):
+        return room in self._states
+
+    def __len__(self):
+        return len(self._states)
+
+    def state(self, room):
+        return self._states.get(room, CLOSED)
+
+    def open(self, room, state=WAITING):
+        """Регистрирует новую комнату; RoomLimitReached, если живых комнат слишком много"""
+        if room in self._states:
+            return
+        if self.max_rooms is not None and len(self._states) >= self.max_rooms:
+            self.rejected += 1
+            raise RoomLimitReached(self.retry_after)
+        self._states[room] = state
+        self.touch(room)
+        self._schedule(room, self._timeout(room))
+
+    def transition(self, room, state):
+        current = self._states.get(room, CLOSED)
+        if state == current:
+            return
+        if state not in TRANSITIONS[current]:
+            raise ValueError(f'Комната {room}: переход {current} -> {state} невозможен')
+        if state == CLOSED:
+            self.close(room)
+            return
+        self._states[room] = state
+        self.touch(room)
+
+    def touch(self, room):
+        """Отмечает активность в комнате"""
+        if room in self._states:
+            self._last_seen[room] = self.wheel.clock()
+
+    def close(self, room):
+        if self._states.pop(room, None) is None:
+            return
+        self._last_seen.pop(room, None)
+        self.wheel.cancel(self._timers.pop(room, None))
+        self.closed += 1
+
+    def counts(self):
+        counts = dict.fromkeys(STATES[:-1], 0)
+        for state in self._states.values():
+            counts[state] += 1
+        return counts
+
+    def stats(self):
+        return {
+            **self.counts(),
+            'live': len(self._states),
+            'max_rooms': self.max_rooms,
+            'closed_total': self.closed,
+            'evicted_total': self.evicted,
+            'rejected_total': self.rejected,
+        }
+
+    def _timeout(self, room):
+        return self.finished_timeout if self._states[room] == FINISHED else self.idle_timeout
+
+    def _schedule(self, room, delay):
+        self._timers[room] = self.wheel.schedule(delay, self._check_idle, room)
+
+    def _check_idle(self, room):
+        if room not in self._states:
+            return
+        left = self._last_seen[room] + self._timeout(room) - self.wheel.clock()
+        if left > 0:
+            self._schedule(room, left)
+            return
+        self._timers.pop(room, None)
+        self.evicted += 1
+        self.on_evict(room)
@@ -0,0 +1,134 @@
+"""Зрители комнат: отдельные уровни рассылки и прореживание обновлений.
+
+Зритель не занимает место игрока и попадает в один из уровней комнаты:
+
+* живой уровень ``(0, protocol)`` получает каждое обновление поля в своем
+  формате, как игроки;
+* прореженный уровень ``(rate, SNAPSHOT)`` получает снимок поля не чаще
+  rate раз в секунду. Пока срок не подошел, изменения только отмечаются,
+  а по таймеру уходит последнее состояние.
+
+Каждый уровень - своя комната Socket.IO, поэтому рассылка стоит одну
+отправку на уровень, а не на зрителя, и частота снимков не зависит от
+темпа ходов. Таймеры прореживания стоят в общем колесе таймеров.
+"""
+from collections import Counter
+
+RATES = (1, 2, 5, 10)
+LIVE = 0
+SNAPSHOT = 'snapshot'
+
+
+def tier_for(protocol, max_rate=None):
+    """Уровень для зрителя: живой без max_rate, иначе наибольшая из RATES не выше max_rate"""
+    if not max_rate or max_rate <= 0:
+        return LIVE, protocol
+    rate = RATES[0]
+    for allowed in RATES:
+        if allowed <= max_rate:
+            rate = allowed
+    return rate, SNAPSHOT
+
+
+class Spectators:
+    """Зрители всех комнат; flush(room, tier) отправляет снимок прореженному уровню"""
+
+    def __init__(self, wheel, flush):
+        self.wheel = wheel
+        self.flush = flush
+        self._watchers = {}
+        self._rooms = {}
+        self._last = {}
+        self._timers = {}
+        self.snapshots = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._watchers)
+
+    def __contains__(self, sid):
+        return sid in self._watchers
+
+    def watch(self, sid, room, protocol, max_rate=None):
+        """Добавляет зрителя; возвращает его уровень"""
+        self.unwatch(sid)
+        tier = tier_for(protocol, max_rate)
+        self._watchers[sid] = (room, tier)
+        self._rooms.setdefault(room, {}).setdefault(tier, set()).add(sid)
+        return tier
+
+    def unwatch(self, sid):
+        """Убирает зрителя; возвращает (комната, уровень) или None"""
+        watched = self._watchers.pop(sid, None)
+        if watched is None:
+            return None
+        room, tier = watched
+        tiers = self._rooms[room]
+        tiers[tier].discard(sid)
+        if not tiers[tier]:
+            del tiers[tier]
+            self._forget(room, tier)
+            if not tiers:
+                del self._rooms[room]
+        return watched
+
+    def room_of(self, sid):
+        watched = self._watchers.get(sid)
+        return watched[0] if watched else None
+
+    def count(self, room):
+        return sum(map(len, self._rooms.get(room, {}).values()))
+
+    def live_tiers(self, room):
+        """Живые уровни комнаты, в которых есть зрители"""
+        return [tier for tier in self._rooms.get(room, ()) if tier[0] == LIVE]
+
+    def close(self, room):
+        """Комната закрылась: убирает всех ее зрителей и возвращает пары (sid, уровень)"""
+        watchers = [(sid, tier) for tier, sids in self._rooms.get(room, {}).items() for sid in sids]
+        for sid, _ in watchers:
+            self.unwatch(sid)
+        return watchers
+
+    def changed(self, room):
+        """Поле комнаты изменилось: прореженные уровни получат снимок, когда подойдет их срок"""
+        for tier in self._rooms.get(room, ()):
+            rate = tier[0]
+            if rate == LIVE:
+                continue
+            key = (room, tier)
+            if key in self._timers:
+                self.coalesced += 1
+                continue
+            wait = self._last.get(key, float('-inf')) + 1.0 / rate - self.wheel.clock()
+            if wait <= 0:
+                self._send(room, tier)
+            else:
+                self._timers[key] = self.wheel.schedule(wait, self._send, room, tier)
+
+    def stats(self):
+        tiers = Counter()
+        for room_tiers in self._rooms.values():
+            for tier, sids in room_tiers.items():
+                tiers['live' if tier[0] == LIVE else f'{tier[0]}hz'] += len(sids)
+        return {
+            'watchers': len(self._watchers),
+            'rooms': len(self._rooms),
+            'tiers': dict(tiers),
+            'snapshots': self.snapshots,
+            'coalesced': self.coalesced,
+        }
+
+    def _send(self, room, tier):
+        key = (room, tier)
+        self._timers.pop(key, None)
+        if tier not in self._rooms.get(room, ()):
+            return
+        self._last[key] = self.wheel.clock()
+        self.snapshots += 1
+        self.flush(room, tier)
+
+    def _forget(self, room, tier):
+        key = (room, tier)
+        self._last.pop(key, None)
+        self.wheel.cancel(self._timers.pop(key, None))
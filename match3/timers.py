@@ -0,0 +1,90 @@
+"""Общий планировщик таймеров на хешированном колесе.
+
+Время делится на тики длиной tick секунд, таймер кладется в ячейку колеса
+по номеру тика, в который он должен сработать. Постановка и отмена стоят
+O(1), а advance за каждый прошедший тик просматривает только одну ячейку,
+поэтому десятки тысяч ожидающих таймеров почти ничего не стоят. Таймеры с
+большой задержкой лежат в той же ячейке и пропускаются, пока не наступит
+их тик. Колесо не запускает своих потоков: advance вызывает одна фоновая
+задача сервера.
+"""
+import math
+import time
+
+from .logs import EventLog
+
+log = EventLog()
+
+
+class Timer:
+    __slots__ = ('deadline', 'tick', 'callback', 'args', 'active')
+
+    def __init__(self, deadline, tick, callback, args):
+        self.deadline = deadline
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.active = True
+
+
+class TimerWheel:
+    """Колесо из slots ячеек по tick секунд; clock - источник монотонного времени"""
+
+    def __init__(self, tick=0.1, slots=512, clock=time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self._slots = [[] for _ in range(slots)]
+        self._current = int(clock() / tick)
+        self._pending = 0
+        self.fired = 0
+
+    def __len__(self):
+        """Число ожидающих таймеров"""
+        return self._pending
+
+    def schedule(self, delay, callback, *args):
+        """Вызовет callback(*args) не раньше чем через delay секунд; возвращает Timer"""
+        deadline = self.clock() + delay
+        tick = max(self._current + 1, math.ceil(deadline / self.tick))
+        timer = Timer(deadline, tick, callback, args)
+        self._slots[tick % len(self._slots)].append(timer)
+        self._pending += 1
+        return timer
+
+    def cancel(self, timer):
+        """Отменяет таймер; сама запись удалится, когда колесо дойдет до ее ячейки"""
+        if timer is not None and timer.active:
+            timer.active = False
+            self._pending -= 1
+
+    def remaining(self, timer):
+        """Сколько секунд осталось до срабатывания таймера"""
+        return max(0.0, timer.deadline - self.clock())
+
+    def advance(self, now=None):
+        """Срабатывают все таймеры, чей тик уже наступил; возвращает их число"""
+        target = int((self.clock() if now is None else now) / self.tick)
+        slots = self._slots
+        fired = 0
+        while self._current < target:
+            self._current += 1
+            index = self._current % len(slots)
+            timers = slots[index]
+            if not timers:
+                continue
+            slots[index] = waiting = []
+            for timer in timers:
+                if not timer.active:
+                    continue
+                if timer.tick > self._current:
+                    waiting.append(timer)
+                    continue
+                timer.active = False
+                self._pending -= 1
+                fired += 1
+                try:
+                    timer.callback(*timer.args)
+                except Exception:
+                    log.exception('timer_failed')
+        self.fired += fired
+        return fired
@@ -0,0 +1,204 @@
+"""Пакетная симуляция ходов на стопке полей N x H x W для офлайн-расчетов.
+
+С NumPy совпадения ищутся сравнением сдвинутых массивов, падение фишек -
+устойчивой сортировкой столбцов, заполнение - одной выборкой из потока.
+Без NumPy используется скалярный движок из ``match3.engine``.
+
+Новые фишки берутся из заранее заданного потока: для каждого поля это
+последовательность индексов в TILE_CODES. При одинаковых потоках оба
+варианта дают побитово одинаковые поля и результаты.
+"""
+import random
+
+from .board import EMPTY, TILE_CODES, Board
+from .engine import check_matches, remove_matches_and_refill, swap_tiles
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для офлайн-симуляций
+    np = None
+
+HAVE_NUMPY = np is not None
+
+
+class StreamRandom:
+    """Источник новых фишек для скалярного движка, читающий заданный поток"""
+
+    __slots__ = ('values', 'pos')
+
+    def __init__(self, values, pos=0):
+        self.values = values
+        self.pos = pos
+
+    def choices(self, seq, k=1):
+        if self.pos + k > len(self.values):
+            raise ValueError('Поток новых фишек исчерпан')
+        values = self.values[self.pos:self.pos + k]
+        self.pos += k
+        return [seq[value] for value in values]
+
+
+def random_streams(count, length, seed=None):
+    """Потоки новых фишек для count полей по length значений в каждом"""
+    if HAVE_NUMPY:
+        return np.random.default_rng(seed).integers(0, len(TILE_CODES), size=(count, length), dtype=np.uint8)
+    rng = random.Random(seed)
+    return [bytes(rng.randrange(len(TILE_CODES)) for _ in range(length)) for _ in range(count)]
+
+
+class ScalarBatch:
+    """Набор полей, который ходит по одному полю за раз"""
+
+    def __init__(self, boards, streams):
+        self.boards = [board.copy() for board in boards]
+        self.rngs = [StreamRandom(stream) for stream in streams]
+
+    def __len__(self):
+        return len(self.boards)
+
+    def to_boards(self):
+        return [board.copy() for board in self.boards]
+
+    def count(self, code):
+        return [board.count(code) for board in self.boards]
+
+    def play(self, swaps):
+        """Делает по ходу на каждом поле; возвращает (valid, cleared, depth).
+
+        valid[n] - был ли ход засчитан, cleared[n][code] - сколько фишек
+        каждого кода убрано за ход со всеми каскадами, depth[n] - число шагов каскада.
+        """
+        valid, cleared, depth = [], [], []
+        for board, rng, swap in zip(self.boards, self.rngs, swaps):
+            counts = [0] * (len(TILE_CODES) + 1)
+            steps = 0
+            swap_tiles(board, *swap)
+            matches = check_matches(board)
+            if not matches:
+                swap_tiles(board, *swap)
+            while matches:
+                for row, col in matches:
+                    counts[board.get(row, col)] += 1
+                remove_matches_and_refill(board, matches, rng)
+                matches = check_matches(board)
+                steps += 1
+            valid.append(steps > 0)
+            cleared.append(counts)
+            depth.append(steps)
+        return valid, cleared, depth
+
+
+class NumpyBatch:
+    """Набор полей в одном массиве uint8 формы (N, H, W)"""
+
+    def __init__(self, boards, streams):
+        if not HAVE_NUMPY:
+            raise RuntimeError('NumpyBatch требует установленный NumPy')
+        height, width = boards[0].height, boards[0].width
+        self.cells = np.frombuffer(b''.join(bytes(board.cells) for board in boards),
+                                   dtype=np.uint8).reshape(len(boards), height, width).copy()
+        self.stream = np.asarray(streams, dtype=np.uint8)
+        self.pos = np.zeros(len(boards), dtype=np.int64)
+
+    def __len__(self):
+        return self.cells.shape[0]
+
+    def to_boards(self):
+        _, height, width = self.cells.shape
+        return [Board(width, height, cells.tobytes()) for cells in self.cells]
+
+    def count(self, code):
+        return (self.cells == code).sum(axis=(1, 2))
+
+    def find_matches(self):
+        """Маска клеток (N, H, W), входящих в серии из трех и более фишек"""
+        return find_matches(self.cells)
+
+    def swap(self, swaps, which=None):
+        """Меняет местами клетки (row1, col1) и (row2, col2) на полях which (по умолчанию на всех)"""
+        swaps = np.asarray(swaps, dtype=np.int64)
+        boards = np.arange(len(self)) if which is None else np.flatnonzero(which)
+        row1, col1, row2, col2 = swaps[boards].T
+        first = self.cells[boards, row1, col1].copy()
+        self.cells[boards, row1, col1] = self.cells[boards, row2, col2]
+        self.cells[boards, row2, col2] = first
+
+    def play(self, swaps):
+        """Делает по ходу на каждом поле; возвращает (valid, cleared, depth) как у ScalarBatch"""
+        self.swap(swaps)
+        mask = self.find_matches()
+        valid = mask.any(axis=(1, 2))
+        self.swap(swaps, ~valid)
+
+        codes = len(TILE_CODES) + 1
+        cleared = np.zeros((len(self), codes), dtype=np.int64)
+        depth = np.zeros(len(self), dtype=np.int64)
+
+        # Каскады считаются только на полях, где еще есть совпадения
+        active = np.flatnonzero(valid)
+        mask = mask[active]
+        while active.size:
+            cells = self.cells[active]
+            board, _, _ = np.nonzero(mask)
+            cleared[active] += np.bincount(board * codes + cells[mask], minlength=active.size * codes
+                                           ).reshape(active.size, codes)
+            depth[active] += 1
+            self.cells[active] = collapse(cells, mask, self.stream, active, self.pos)
+            mask = find_matches(self.cells[active])
+            keep = mask.any(axis=(1, 2))
+            active, mask = active[keep], mask[keep]
+        return valid, cleared, depth
+
+
+def find_matches(cells):
+    """Маска клеток стопки полей (N, H, W), входящих в серии из трех и более фишек"""
+    mask = np.zeros(cells.shape, dtype=bool)
+
+    # Начала горизонтальных и вертикальных троек
+    left, mid, right = cells[:, :, :-2], cells[:, :, 1:-1], cells[:, :, 2:]
+    start = (left == mid) & (mid == right) & (left != EMPTY)
+    mask[:, :, :-2] |= start
+    mask[:, :, 1:-1] |= start
+    mask[:, :, 2:] |= start
+
+    top, mid, bottom = cells[:, :-2, :], cells[:, 1:-1, :], cells[:, 2:, :]
+    start = (top == mid) & (mid == bottom) & (top != EMPTY)
+    mask[:, :-2, :] |= start
+    mask[:, 1:-1, :] |= start
+    mask[:, 2:, :] |= start
+    return mask
+
+
+def collapse(cells, mask, stream, boards, pos):
+    """Убирает клетки по маске, сдвигает фишки вниз и заполняет столбцы из потока.
+
+    cells - поля с номерами boards из пакета, stream и pos - потоки и
+    позиции в них для всего пакета; pos сдвигается на число новых фишек.
+    """
+    height = cells.shape[1]
+    cells[mask] = EMPTY
+
+    # Устойчивая сортировка по признаку «не пусто» поднимает пустые клетки наверх
+    order = np.argsort(cells != EMPTY, axis=1, kind='stable')
+    cells = np.take_along_axis(cells, order, axis=1)
+
+    # Заполнение в том же порядке, что и Board.collapse: по столбцам, сверху вниз
+    empties = mask.sum(axis=1)
+    offsets = np.cumsum(empties, axis=1) - empties
+    rows = np.arange(height)[None, :, None]
+    fill = rows < empties[:, None, :]
+    index = (pos[boards][:, None, None] + offsets[:, None, :] + rows)[fill]
+    if index.size and index.max() >= stream.shape[1]:
+        raise ValueError('Поток новых фишек исчерпан')
+    source = np.broadcast_to(boards[:, None, None], fill.shape)[fill]
+    cells[fill] = stream[source, index] + 1
+
+    pos[boards] += empties.sum(axis=1)
+    return cells
+
+
+def make_batch(boards, streams, use_numpy=None):
+    """Пакет полей на NumPy, если он доступен, иначе скалярный"""
+    if use_numpy is None:
+        use_numpy = HAVE_NUMPY
+    return NumpyBatch(boards, streams) if use_numpy else ScalarBatch(boards, streams)
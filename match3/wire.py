@@ -0,0 +1,71 @@
+"""Компактный бинарный формат поля и ходов для клиентов, выбравших wire=binary.
+
+Поле: байт ширины, байт высоты и коды фишек по 3 бита, начиная с младших
+битов первого байта. Ход: код обмена из match3.moves (номер левой или
+верхней клетки * 2 + направление) в виде varint, для поля 8x8 - один байт.
+"""
+from .board import Board
+from .moves import move_cells, move_code
+
+BITS_PER_TILE = 3
+TILE_MASK = (1 << BITS_PER_TILE) - 1
+
+
+def encode_board(board):
+    value = 0
+    for code in reversed(board.cells):
+        value = (value << BITS_PER_TILE) | code
+    packed = value.to_bytes((len(board.cells) * BITS_PER_TILE + 7) // 8, 'little')
+    return bytes((board.width, board.height)) + packed
+
+
+def decode_board(data):
+    if len(data) < 2:
+        raise ValueError('Слишком короткие данные поля')
+    width, height = data[0], data[1]
+    count = width * height
+    if len(data) != 2 + (count * BITS_PER_TILE + 7) // 8:
+        raise ValueError('Размер данных не совпадает с размером поля')
+    value = int.from_bytes(data[2:], 'little')
+    return Board(width, height, bytes((value >> (BITS_PER_TILE * i)) & TILE_MASK for i in range(count)))
+
+
+def encode_varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data, pos=0):
+    """Читает varint с позиции pos; возвращает (значение, следующая позиция)"""
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError('Обрезанный varint')
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_move(row1, col1, row2, col2, width):
+    return encode_varint(move_code(row1, col1, row2, col2, width))
+
+
+def decode_move(data, width):
+    """Клетки хода (row1, col1, row2, col2) из бинарных данных"""
+    code, pos = decode_varint(data)
+    if pos != len(data):
+        raise ValueError('Лишние байты после хода')
+    return move_cells(code, width)
+
+
+def encode_cells(cells, width):
+    """Список клеток (row, col) как varint-номера клеток"""
+    return b''.join(encode_varint(row * width + col) for row, col in cells)
@@ -1,939 +1,558 @@
-from flask import Flask, request
-from flask_socketio import SocketIO, emit, join_room, leave_room
 import os
+
+# Очереди на Redis и брокере match3.hub (ROOM_QUEUE, SOCKETIO_MESSAGE_QUEUE) читаются блокирующими
+# сокетами: без зеленых socket и select цикл приема остановил бы весь цикл eventlet. Патчатся только
+# они - журнал, пул вычислений и tpool по-прежнему работают в потоках ОС
+if any(os.environ.get(name, '').startswith(('redis://', 'rediss://', 'tcp://'))
+       for name in ('ROOM_QUEUE', 'SOCKETIO_MESSAGE_QUEUE')):
+    import eventlet
+    eventlet.monkey_patch(socket=True, select=True)
+
+from flask import Flask, Response, abort, jsonify, request
+from flask_socketio import SocketIO, emit
+from werkzeug.http import parse_accept_header
+import atexit
+import functools
+import hmac
+import math
 import random
+import signal
+import sys
+import threading
 import time
-import json
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+from match3.engine import is_valid_move
+from match3.moves import MoveIndex, move_cells, move_code
+from match3.compute import ComputePool
+from match3.delta import encode_steps
+from match3.wire import decode_move, encode_board, encode_cells
+from match3.assets import ASSET_PREFIX, ENCODINGS, build_assets
+from match3.audit import AuditWriter
+from match3.bots import MoveEvaluator
+from match3.actors import ActorRegistry
+from match3.cluster import Cluster, make_queue
+from match3.highscores import HighscoreStore, make_backend
+from match3.leaderboard import DEFAULT_LIMIT, MAX_LIMIT, Leaderboard
+from match3.levels import DEFAULT_PATH as DEFAULT_LEVELS, load_levels
+from match3.logs import EventLog, setup_logging
+from match3.matchmaking import Matchmaker, MatchPolicy
+from match3.metrics import Registry, json_size
+from match3.profiling import HandlerTimer, ProfilerBusy, SamplingProfiler
+from match3.replay import GameLog, new_seed
+from match3.rooms import ACTIVE, FINISHED, RoomLimitReached, RoomRegistry
+from match3.spectators import LIVE, Spectators
+from match3.timers import TimerWheel
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'match3-multiplayer-competition'
 
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Журнал событий в JSON-строках: обработчик только кладет запись в очередь (LOG_BUFFER записей,
+# лишние отбрасываются), в stdout пишет отдельный поток
+log_handler, log_listener = setup_logging(
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    max_pending=int(os.environ.get('LOG_BUFFER', 10000))
+)
+log = EventLog()
+
+# Несколько воркеров: WORKERS - список всех воркеров через запятую, WORKER_ID - этот воркер,
+# ROOM_QUEUE - очередь для пересылки событий комнат владельцу, SOCKETIO_MESSAGE_QUEUE -
+# очередь Flask-SocketIO для рассылки по комнатам между воркерами (redis:// или tcp:// брокера
+# match3.hub)
+WORKER_ID = os.environ.get('WORKER_ID', 'worker-0')
+WORKERS = [worker for worker in os.environ.get('WORKERS', WORKER_ID).split(',') if worker]
+
+MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+if MESSAGE_QUEUE and MESSAGE_QUEUE.startswith('tcp://'):
+    # Брокер match3.hub: Flask-SocketIO о нем не знает, менеджер клиентов передается готовым
+    from match3.hub import HubManager
+    socketio = SocketIO(app, cors_allowed_origins="*", client_manager=HubManager(MESSAGE_QUEUE))
+else:
+    socketio = SocketIO(app, cors_allowed_origins="*", message_queue=MESSAGE_QUEUE)
+cluster = Cluster(WORKER_ID, WORKERS, make_queue(os.environ.get('ROOM_QUEUE')))
+# События каждой комнаты выполняются по очереди в ее акторе
+actors = ActorRegistry(socketio.start_background_task)
+
+def wait_off_hub(future):
+    """Ждет результат пула в потоке ОС, чтобы цикл eventlet продолжал работать"""
+    from eventlet import tpool
+    return tpool.execute(future.result)
+
+# Один планировщик таймеров на все комнаты, его крутит фоновая задача run_timers
+timers = TimerWheel(tick=float(os.environ.get('TIMER_TICK', 0.1)))
+
+# Состояния живых комнат: простаивающие закрываются в своем акторе, число комнат
+# ограничено MAX_ROOMS (0 - без лимита)
+lifecycle = RoomRegistry(
+    timers,
+    on_evict=lambda room: actors.submit(room, close_room, room, 'idle'),
+    idle_timeout=float(os.environ.get('ROOM_IDLE_TIMEOUT', 600)),
+    finished_timeout=float(os.environ.get('ROOM_FINISHED_TIMEOUT', 120)),
+    max_rooms=int(os.environ.get('MAX_ROOMS', 0)) or None
+)
+
+# Зрители: живые получают каждое обновление, прореженные - снимок не чаще maxRate раз в секунду;
+# снимок отправляется из актора комнаты
+spectators = Spectators(timers, flush=lambda room, tier: actors.submit(room, emit_spectator_snapshot, room, tier))
+
+# Генерация полей и разрешение ходов: COMPUTE_POOL=inline|thread|process, COMPUTE_WORKERS - размер пула
+compute = ComputePool(
+    os.environ.get('COMPUTE_POOL', 'inline'),
+    int(os.environ.get('COMPUTE_WORKERS', 0)) or None,
+    wait_off_hub if socketio.async_mode == 'eventlet' else None
+)
 
 # Хранилище игр, игроков и рекордов
 games = {}
 players = {}
-highscores = {}  # Для хранения рекордов по режимам
+# Файлы сервера лежат в DATA_DIR (по умолчанию data/ рядом с server.py), а не в текущем каталоге
+DATA_DIR = os.environ.get('DATA_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+# Рекорды по режимам: SQLite (HIGHSCORE_DB, по умолчанию DATA_DIR/highscores.db; ':memory:' - без
+# диска) с кешем в памяти, новые рекорды сбрасываются на диск раз в HIGHSCORE_FLUSH_INTERVAL секунд
+# и при остановке. Кеш у каждого воркера свой и читается из базы только при запуске: с несколькими
+# воркерами personalBest знает лишь рекорды, поставленные до запуска воркера или на нем самом
+highscores = HighscoreStore(make_backend(os.environ.get('HIGHSCORE_DB') or os.path.join(DATA_DIR, 'highscores.db')))
+HIGHSCORE_FLUSH_INTERVAL = float(os.environ.get('HIGHSCORE_FLUSH_INTERVAL', 5))
+# Таблица лидеров строится из рекордов и обновляется вместе с ними - тоже в памяти воркера:
+# с несколькими воркерами /leaderboard у каждого свой, пока воркер не перезапустится
+leaderboard = Leaderboard.from_highscores(highscores.items())
+if len(cluster.router.workers) > 1:
+    log.warning('per_worker_cache', caches=['highscores', 'leaderboard'], workers=len(cluster.router.workers))
+wire_formats = {}  # sid -> 'binary' для клиентов с бинарным форматом
+# Архив законченных партий для разбора споров: сегменты в AUDIT_DIR (по умолчанию DATA_DIR/audit,
+# пусто - без архива) по AUDIT_SEGMENT_MB мегабайт, пишет фоновый поток
+AUDIT_DIR = os.environ.get('AUDIT_DIR', os.path.join(DATA_DIR, 'audit'))
+audit = AuditWriter(AUDIT_DIR, int(float(os.environ.get('AUDIT_SEGMENT_MB', 64)) * (1 << 20))) if AUDIT_DIR else None
 
-# Типы фишек
-TILE_TYPES = ['red', 'blue', 'green', 'yellow', 'purple']
 MAX_PLAYERS = 4
-BOARD_WIDTH = 8
-BOARD_HEIGHT = 8
-
-def create_game_board():
-    """Создает игровое поле без начальных совпадений"""
-    board = []
-    for _ in range(BOARD_HEIGHT):
-        row = [random.choice(TILE_TYPES) for _ in range(BOARD_WIDTH)]
-        board.append(row)
-    
-    # Убеждаемся, что нет начальных совпадений
-    while check_matches(board):
-        board = []
-        for _ in range(BOARD_HEIGHT):
-            row = [random.choice(TILE_TYPES) for _ in range(BOARD_WIDTH)]
-            board.append(row)
-    
-    return board
+# Время на ход в мультиплеере, секунд (0 - без ограничения); истекший ход пропускается
+TURN_TIME = float(os.environ.get('TURN_TIME', 30))
 
-def check_matches(board):
-    """Проверяет совпадения на поле"""
-    matches = set()
-    
-    # Проверка горизонтальных совпадений
-    for row in range(BOARD_HEIGHT):
-        for col in range(BOARD_WIDTH - 2):
-            if (board[row][col] == board[row][col + 1] == board[row][col + 2] and 
-                board[row][col] is not None):
-                matches.add((row, col))
-                matches.add((row, col + 1))
-                matches.add((row, col + 2))
-    
-    # Проверка вертикальных совпадений
-    for row in range(BOARD_HEIGHT - 2):
-        for col in range(BOARD_WIDTH):
-            if (board[row][col] == board[row + 1][col] == board[row + 2][col] and 
-                board[row][col] is not None):
-                matches.add((row, col))
-                matches.add((row + 1, col))
-                matches.add((row + 2, col))
-    
-    return list(matches)
+# Уровни одиночной игры из LEVELS_FILE (по умолчанию match3/levels.json); файл читается
+# и проверяется при запуске, ошибка в нем останавливает сервер
+levels = load_levels(os.environ.get('LEVELS_FILE') or DEFAULT_LEVELS)
 
-def remove_matches_and_refill(board, matches):
-    """Удаляет совпадения и заполняет поле новыми фишками"""
-    # Удаляем совпадения
-    for row, col in matches:
-        board[row][col] = None
-    
-    # Фишки падают вниз
-    for col in range(BOARD_WIDTH):
-        empty_cells = []
-        for row in range(BOARD_HEIGHT - 1, -1, -1):
-            if board[row][col] is None:
-                empty_cells.append(row)
-            elif empty_cells:
-                lowest_empty = empty_cells.pop(0)
-                board[lowest_empty][col] = board[row][col]
-                board[row][col] = None
-                empty_cells.append(row)
-    
-    # Заполняем пустые места новыми фишками
-    for col in range(BOARD_WIDTH):
-        for row in range(BOARD_HEIGHT):
-            if board[row][col] is None:
-                board[row][col] = random.choice(TILE_TYPES)
-    
-    return board
+# Подбор соперников: комната собирается сразу при MATCH_MAX_PLAYERS игроках или через
+# MATCH_MAX_WAIT секунд из тех, кто есть; MATCH_SKILL_BUCKET - ширина корзины по рекорду
+# бесконечного режима (0 - без учета уровня)
+matchmaker = Matchmaker(MatchPolicy(
+    min_players=int(os.environ.get('MATCH_MIN_PLAYERS', 2)),
+    max_players=int(os.environ.get('MATCH_MAX_PLAYERS', MAX_PLAYERS)),
+    max_wait=float(os.environ.get('MATCH_MAX_WAIT', 10)),
+    widen_after=float(os.environ.get('MATCH_WIDEN_AFTER', 20))
+))
+MATCH_SKILL_BUCKET = int(os.environ.get('MATCH_SKILL_BUCKET', 500))
+MATCH_POLL_INTERVAL = 0.5
 
-def is_valid_move(board, row1, col1, row2, col2):
-    """Проверяет валидность хода (только соседние клетки)"""
-    if (row1 < 0 or row1 >= BOARD_HEIGHT or col1 < 0 or col1 >= BOARD_WIDTH or
-        row2 < 0 or row2 >= BOARD_HEIGHT or col2 < 0 or col2 >= BOARD_WIDTH):
-        return False
-    
-    # Проверяем, что клетки соседние
-    if abs(row1 - row2) + abs(col1 - col2) != 1:
-        return False
-    
-    return True
+# Боты: если обычная комната BOT_FILL_AFTER секунд (0 - без ботов) ждет игроков, свободные
+# места до старта занимают боты. Бот думает около BOT_THINK_TIME секунд и с вероятностью
+# BOT_SKILL выбирает лучший по оценке ход, иначе случайный
+BOT_FILL_AFTER = float(os.environ.get('BOT_FILL_AFTER', 20))
+BOT_THINK_TIME = float(os.environ.get('BOT_THINK_TIME', 1.0))
+BOT_SKILL = float(os.environ.get('BOT_SKILL', 0.85))
+bot_moves = MoveEvaluator()
+bot_rng = random.Random()
+
+# Метрики для /metrics: гистограммы создаются здесь, на горячем пути только observe;
+# размер board_update считается для каждого METRICS_PAYLOAD_SAMPLE-го обновления
+metrics = Registry()
+METRICS_PAYLOAD_SAMPLE = max(1, int(os.environ.get('METRICS_PAYLOAD_SAMPLE', 16)))
+LOOP_LAG_INTERVAL = 0.1
+move_phases = metrics.histograms(
+    'move_phase_seconds', 'Время фаз хода: проверка, поиск совпадения, каскад, рассылка',
+    'phase', ('validate', 'match', 'cascade', 'emit'))
+cascade_depth = metrics.histogram(
+    'cascade_depth', 'Шагов каскада за ход', buckets=(1, 2, 3, 4, 5, 6, 7, 8, 10, 15))
+moves_rejected = metrics.counter('moves_rejected_total', 'Отклоненные ходы')
+board_attempts = metrics.histogram(
+    'board_generation_attempts', 'Полей, сгенерированных до играбельного', buckets=(1, 2, 3, 5, 10, 20, 50))
+payload_bytes = metrics.histograms(
+    'board_update_bytes', 'Размер board_update по форматам (выборочно)', 'protocol',
+    ('full', 'delta', 'binary'), buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384))
+loop_lag = metrics.histogram('event_loop_lag_seconds', 'Опоздание пробуждения фоновой задачи')
+connected_sockets = metrics.gauge('connected_sockets', 'Сокеты, подключенные к этому воркеру')
+metrics.gauge('rooms', 'Живые комнаты по режимам', label='mode',
+              fn=lambda: Counter(game['game_mode'] for game in games.values()))
+metrics.gauge('sockets', 'Игроки и зрители комнат этого воркера по режимам', label='mode',
+              fn=lambda: sockets_by_mode())
+metrics.gauge('bots', 'Боты в комнатах', fn=lambda: sum(
+    1 for game in games.values() for data in game['players'].values() if data.get('bot')))
+metrics.gauge('room_queue_depth', 'Заданий в очередях акторов комнат', fn=lambda: actors.stats()['queued'])
+metrics.gauge('timers_pending', 'Таймеров в колесе', fn=lambda: len(timers))
+metrics.gauge('matchmaking_queued', 'Игроков в очереди подбора', fn=lambda: len(matchmaker))
+metrics.gauge('audit_dropped', 'Партий, не попавших в архив',
+              fn=lambda: audit.dropped if audit is not None else 0)
+metrics.gauge('log_dropped', 'Записей журнала, отброшенных при полном буфере', fn=lambda: log_handler.dropped)
+
+# Профилирование для администратора: ADMIN_TOKEN включает /admin/* (без него раздел отвечает 404).
+# Из обработчиков PROFILE_EVENTS замеряется доля PROFILE_SAMPLE_RATE вызовов (0 - без замеров),
+# долю можно поменять на ходу через /admin/handlers
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+PROFILE_EVENTS = [event for event in os.environ.get(
+    'PROFILE_EVENTS', 'make_move,make_move_bin,join_room,join_single_player').split(',') if event]
+PROFILE_MAX_SECONDS = 60
+profiler = SamplingProfiler()
+handler_timer = HandlerTimer(
+    metrics.histograms('handler_seconds', 'Время обработчиков событий (выборочно)', 'event', PROFILE_EVENTS),
+    rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    profiler=profiler
+)
+
+# Клиент (client/) собирается и сжимается один раз при запуске
+client_index, client_assets = build_assets()
 
-def swap_tiles(board, row1, col1, row2, col2):
-    """Меняет фишки местами"""
-    board[row1][col1], board[row2][col2] = board[row2][col2], board[row1][col1]
-    return board
-
-def count_tile_type(board, tile_type):
-    """Считает количество фишек определенного типа на поле"""
-    count = 0
-    for row in board:
-        for tile in row:
-            if tile == tile_type:
-                count += 1
-    return count
-
-def check_level_goal(game):
-    """Проверяет выполнение цели уровня"""
-    if game['game_mode'] == 'level':
-        if game['level_type'] == 'collect_red':
-            collected = game['initial_red'] - count_tile_type(game['board'], 'red')
-            return collected >= game['level_goal']
-    return False
+# Форматы board_update: полное поле (старые клиенты) или шаги каскада;
+# формат 'binary' выбирается при подключении, а не при входе в комнату
+PROTOCOLS = ('full', 'delta')
 
 @app.route('/')
 def home():
-    return '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Три в ряд - Соревнование</title>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <style>
-            * {
-                box-sizing: border-box;
-                margin: 0;
-                padding: 0;
-                font-family: 'Arial', sans-serif;
-            }
-            
-            body {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                padding: 20px;
-            }
-            
-            .container {
-                background: white;
-                border-radius: 15px;
-                padding: 30px;
-                box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-                max-width: 900px;
-                width: 100%;
-                text-align: center;
-            }
-            
-            h1 {
-                color: #333;
-                margin-bottom: 20px;
-                font-size: 2.5em;
-            }
-            
-            .game-info {
-                margin: 15px 0;
-            }
-            
-            .players-board {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                gap: 15px;
-                margin: 20px 0;
-            }
-            
-            .player-card {
-                padding: 15px;
-                border-radius: 10px;
-                background: #f8f9fa;
-                transition: all 0.3s;
-                border: 3px solid transparent;
-            }
-            
-            .player-card.current {
-                background: #e3f2fd;
-                border-color: #2196f3;
-                transform: scale(1.05);
-            }
-            
-            .player-card .player-name {
-                font-weight: bold;
-                font-size: 1.2em;
-                margin-bottom: 10px;
-            }
-            
-            .player-card .player-score {
-                font-size: 1.5em;
-                color: #333;
-            }
-            
-            .game-board {
-                display: grid;
-                grid-template-columns: repeat(8, 60px);
-                gap: 3px;
-                margin: 25px auto;
-                justify-content: center;
-                background: #f0f0f0;
-                padding: 10px;
-                border-radius: 10px;
-            }
-            
-            .tile {
-                width: 60px;
-                height: 60px;
-                border: 2px solid #ddd;
-                border-radius: 8px;
-                cursor: pointer;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                font-size: 24px;
-                transition: all 0.2s;
-                background: white;
-            }
-            
-            .tile.red { background: #ff6b6b; }
-            .tile.blue { background: #4ecdc4; }
-            .tile.green { background: #a3d9a5; }
-            .tile.yellow { background: #ffe66d; }
-            .tile.purple { background: #b19cd9; }
-            
-            .tile.selected {
-                border: 3px solid #333;
-                transform: scale(0.95);
-                box-shadow: 0 0 10px rgba(0,0,0,0.3);
-            }
-            
-            .tile.matched {
-                animation: pulse 0.5s;
-            }
-            
-            @keyframes pulse {
-                0% { transform: scale(1); }
-                50% { transform: scale(1.1); }
-                100% { transform: scale(1); }
-            }
-            
-            .status {
-                margin: 20px 0;
-                padding: 15px;
-                border-radius: 10px;
-                font-size: 18px;
-                font-weight: bold;
-            }
-            
-            .waiting { background: #fff3cd; color: #856404; }
-            .playing { background: #d4edda; color: #155724; }
-            .my-turn { background: #cce5ff; color: #004085; }
-            
-            .controls {
-                margin: 20px 0;
-            }
-            
-            input, button {
-                padding: 12px 20px;
-                margin: 8px;
-                border: 2px solid #ddd;
-                border-radius: 8px;
-                font-size: 16px;
-            }
-            
-            input {
-                width: 250px;
-                text-align: center;
-            }
-            
-            button {
-                background: #667eea;
-                color: white;
-                border: none;
-                cursor: pointer;
-                transition: background 0.3s;
-                font-weight: bold;
-            }
-            
-            button:hover {
-                background: #5a6fd8;
-                transform: translateY(-2px);
-            }
-            
-            button:disabled {
-                background: #ccc;
-                cursor: not-allowed;
-                transform: none;
-            }
-            
-            .hidden {
-                display: none;
-            }
-            
-            .room-info {
-                background: #e9ecef;
-                padding: 10px;
-                border-radius: 8px;
-                margin: 10px 0;
-                font-size: 14px;
-            }
-            
-            .single-player-info {
-                background: #d4edda;
-                padding: 10px;
-                border-radius: 8px;
-                margin: 10px 0;
-                font-size: 14px;
-            }
-            
-            .mode-buttons {
-                display: flex;
-                justify-content: center;
-                gap: 10px;
-                margin: 15px 0;
-            }
-            
-            .mode-buttons button {
-                flex: 1;
-                max-width: 200px;
-            }
-            
-            .single-player-btn {
-                background: #28a745;
-            }
-            
-            .single-player-btn:hover {
-                background: #218838;
-            }
-            
-            .game-mode-select {
-                background: #e9ecef;
-                padding: 20px;
-                border-radius: 10px;
-                margin: 20px 0;
-            }
-            
-            .mode-option {
-                background: white;
-                border: 2px solid #ddd;
-                border-radius: 10px;
-                padding: 20px;
-                margin: 10px 0;
-                cursor: pointer;
-                transition: all 0.3s;
-            }
-            
-            .mode-option:hover {
-                border-color: #667eea;
-                transform: translateY(-2px);
-            }
-            
-            .mode-option.selected {
-                border-color: #28a745;
-                background: #f8fff9;
-            }
-            
-            .mode-title {
-                font-size: 1.2em;
-                font-weight: bold;
-                margin-bottom: 10px;
-                color: #333;
-            }
-            
-            .mode-description {
-                color: #666;
-                margin-bottom: 10px;
-            }
-            
-            .mode-details {
-                font-size: 0.9em;
-                color: #888;
-            }
-            
-            .level-info {
-                background: #e3f2fd;
-                padding: 15px;
-                border-radius: 8px;
-                margin: 15px 0;
-                border-left: 4px solid #2196f3;
-            }
-            
-            .highscore-info {
-                background: #fff3cd;
-                padding: 15px;
-                border-radius: 8px;
-                margin: 15px 0;
-                border-left: 4px solid #ffc107;
-            }
-            
-            @media (max-width: 768px) {
-                .container {
-                    padding: 20px;
-                }
-                
-                .game-board {
-                    grid-template-columns: repeat(8, 40px);
-                }
-                
-                .tile {
-                    width: 40px;
-                    height: 40px;
-                    font-size: 18px;
-                }
-                
-                h1 {
-                    font-size: 2em;
-                }
-                
-                input {
-                    width: 200px;
-                }
-                
-                .mode-buttons {
-                    flex-direction: column;
-                }
-                
-                .mode-buttons button {
-                    max-width: none;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>🎮 Три в ряд - Соревнование</h1>
-            
-            <div id="connectSection">
-                <div class="game-info">
-                    <input type="text" id="roomInput" value="competition-room" placeholder="Название комнаты">
-                    <input type="text" id="playerName" placeholder="Ваше имя" maxlength="15">
-                </div>
-                
-                <div class="mode-buttons">
-                    <button onclick="connectToGame()">🎯 Присоединиться к соревнованию</button>
-                    <button class="single-player-btn" onclick="showGameModes()">🎮 Играть один</button>
-                </div>
-                
-                <div id="status" class="status waiting">
-                    Введите название комнаты и ваше имя
-                </div>
-                
-                <div class="room-info">
-                    <strong>Соревнование:</strong> Максимум 4 игрока | Победа при 500 очках
-                </div>
-                
-                <div class="single-player-info hidden" id="singlePlayerInfo">
-                    <strong>Одиночная игра:</strong> Выберите режим игры
-                </div>
-                
-                <div id="gameModeSelect" class="game-mode-select hidden">
-                    <div class="mode-option" onclick="selectGameMode('endless')">
-                        <div class="mode-title">♾️ Бесконечный режим</div>
-                        <div class="mode-description">Наберите как можно больше очков! Нет ограничений по времени или ходам.</div>
-                        <div class="mode-details">Рекорды сохраняются</div>
-                    </div>
-                    
-                    <div class="mode-option" onclick="selectGameMode('level')">
-                        <div class="mode-title">🏆 Уровень с целью</div>
-                        <div class="mode-description">Соберите 20 красных кристаллов за ограниченное количество ходов.</div>
-                        <div class="mode-details">Ограничение: 25 ходов | Цель: 20 красных кристаллов</div>
-                    </div>
-                    
-                    <div class="controls">
-                        <button onclick="startSelectedGameMode()" id="startModeBtn" disabled>Начать выбранный режим</button>
-                        <button onclick="hideGameModes()">Назад</button>
-                    </div>
-                </div>
-            </div>
-            
-            <div id="gameSection" class="hidden">
-                <div class="players-board" id="playersBoard"></div>
-                
-                <div id="levelInfo" class="level-info hidden">
-                    <div><strong>Цель уровня:</strong> Собрать <span id="targetCrystals">20</span> красных кристаллов</div>
-                    <div><strong>Собрано:</strong> <span id="collectedCrystals">0</span> красных кристаллов</div>
-                    <div><strong>Осталось ходов:</strong> <span id="movesLeft">25</span></div>
-                </div>
-                
-                <div id="highscoreInfo" class="highscore-info hidden">
-                    <div><strong>Ваш рекорд:</strong> <span id="currentHighscore">0</span> очков</div>
-                    <div><strong>Текущий счет:</strong> <span id="currentScore">0</span> очков</div>
-                </div>
-                
-                <div id="gameStatus" class="status waiting">Подготовка к игре...</div>
-                
-                <div class="game-board" id="gameBoard"></div>
-                
-                <div class="controls">
-                    <button onclick="leaveGame()">Покинуть игру</button>
-                </div>
-            </div>
-        </div>
-
-        <script src="https://cdn.socket.io/4.5.0/socket.io.min.js"></script>
-        <script>
-            let socket = null;
-            let currentRoom = '';
-            let myPlayerId = '';
-            let myPlayerName = '';
-            let currentPlayer = '';
-            let gameBoard = [];
-            let selectedTile = null;
-            let players = {};
-            let gameActive = false;
-            let isSinglePlayer = false;
-            let selectedGameMode = '';
-            let levelData = {
-                targetCrystals: 20,
-                collectedCrystals: 0,
-                movesLeft: 25
-            };
-            let highscoreData = {
-                currentScore: 0,
-                personalBest: 0
-            };
-            
-            function showGameModes() {
-                myPlayerName = document.getElementById('playerName').value.trim() || 'Игрок';
-                
-                if (myPlayerName.length === 0) {
-                    alert('Пожалуйста, введите ваше имя');
-                    return;
-                }
-                
-                document.getElementById('singlePlayerInfo').classList.remove('hidden');
-                document.getElementById('gameModeSelect').classList.remove('hidden');
-                document.getElementById('connectSection').classList.add('hidden');
-            }
-            
-            function hideGameModes() {
-                document.getElementById('gameModeSelect').classList.add('hidden');
-                document.getElementById('connectSection').classList.remove('hidden');
-                document.getElementById('singlePlayerInfo').classList.add('hidden');
-            }
-            
-            function selectGameMode(mode) {
-                selectedGameMode = mode;
-                document.getElementById('startModeBtn').disabled = false;
-                
-                // Убираем выделение со всех options
-                document.querySelectorAll('.mode-option').forEach(opt => {
-                    opt.classList.remove('selected');
-                });
-                
-                // Выделяем выбранный option
-                event.currentTarget.classList.add('selected');
-            }
-            
-            function startSelectedGameMode() {
-                if (!selectedGameMode) {
-                    alert('Пожалуйста, выберите режим игры');
-                    return;
-                }
-                
-                // Создаем уникальное имя комнаты для одиночной игры
-                currentRoom = 'singleplayer-' + selectedGameMode + '-' + Date.now();
-                isSinglePlayer = true;
-                
-                document.getElementById('singlePlayerInfo').classList.remove('hidden');
-                
-                if (socket) {
-                    socket.disconnect();
-                }
-                
-                socket = io();
-                
-                setupSocketListeners();
-                
-                socket.on('connect', function() {
-                    updateStatus('Запуск игры...', 'playing');
-                    socket.emit('join_single_player', { 
-                        playerName: myPlayerName,
-                        gameMode: selectedGameMode
-                    });
-                });
-            }
-            
-            function connectToGame() {
-                currentRoom = document.getElementById('roomInput').value.trim() || 'default';
-                myPlayerName = document.getElementById('playerName').value.trim() || 'Игрок';
-                
-                if (myPlayerName.length === 0) {
-                    alert('Пожалуйста, введите ваше имя');
-                    return;
-                }
-                
-                isSinglePlayer = false;
-                document.getElementById('singlePlayerInfo').classList.add('hidden');
-                
-                if (socket) {
-                    socket.disconnect();
-                }
-                
-                socket = io();
-                
-                setupSocketListeners();
-                
-                socket.on('connect', function() {
-                    updateStatus('Подключено к серверу', 'playing');
-                    socket.emit('join_room', { 
-                        room: currentRoom,
-                        playerName: myPlayerName
-                    });
-                });
-            }
-            
-            function setupSocketListeners() {
-                socket.on('joined', function(data) {
-                    myPlayerId = data.playerId;
-                    players = data.players;
-                    
-                    updateStatus(data.message, 'playing');
-                    document.getElementById('connectSection').classList.add('hidden');
-                    document.getElementById('gameSection').classList.remove('hidden');
-                    
-                    updatePlayersBoard();
-                });
-                
-                socket.on('player_joined', function(data) {
-                    players = data.players;
-                    updatePlayersBoard();
-                    updateStatus(`Игрок ${data.playerName} присоединился! (${Object.keys(players).length}/4 игроков)`, 'playing');
-                });
-                
-                socket.on('player_left', function(data) {
-                    players = data.players;
-                    updatePlayersBoard();
-                    updateStatus(`Игрок ${data.playerName} покинул игру`, 'waiting');
-                });
-                
-                socket.on('game_start', function(data) {
-                    gameBoard = data.board;
-                    currentPlayer = data.currentPlayer;
-                    gameActive = true;
-                    updateBoard();
-                    updateGameStatus();
-                });
-                
-                socket.on('board_update', function(data) {
-                    gameBoard = data.board;
-                    currentPlayer = data.currentPlayer;
-                    players = data.players;
-                    updateBoard();
-                    updatePlayersBoard();
-                    updateGameStatus();
-                    
-                    // Обновляем данные уровня, если это режим уровня
-                    if (data.levelData) {
-                        levelData = data.levelData;
-                        updateLevelInfo();
-                    }
-                    
-                    // Обновляем данные рекордов, если это бесконечный режим
-                    if (data.highscoreData) {
-                        highscoreData = data.highscoreData;
-                        updateHighscoreInfo();
-                    }
-                    
-                    // Анимация для совпадений
-                    if (data.matches && data.matches.length > 0) {
-                        animateMatches(data.matches);
-                    }
-                });
-                
-                socket.on('move_result', function(data) {
-                    if (!data.valid) {
-                        alert('Неверный ход! ' + data.message);
-                    }
-                });
-                
-                socket.on('game_over', function(data) {
-                    gameActive = false;
-                    let message = '';
-                    
-                    if (data.winner === myPlayerId) {
-                        message = '🎉 Поздравляем! Вы победили! 🎉';
-                    } else if (data.winner === 'draw') {
-                        message = 'Ничья!';
-                    } else if (data.winner === 'level_completed') {
-                        message = '🎉 Уровень пройден! Отличная работа! 🎉';
-                    } else if (data.winner === 'level_failed') {
-                        message = '❌ Уровень не пройден. Попробуйте еще раз!';
-                    } else {
-                        const winnerName = players[data.winner]?.name || 'Неизвестный игрок';
-                        message = `Победил ${winnerName}! Сыграем еще?`;
-                    }
-                    
-                    updateStatus(message, 'playing');
-                    
-                    // Автоперезапуск через 5 секунд
-                    setTimeout(() => {
-                        if (isSinglePlayer) {
-                            socket.emit('restart_single_player');
-                        } else {
-                            socket.emit('restart_game', { room: currentRoom });
-                        }
-                    }, 5000);
-                });
-                
-                socket.on('single_player_started', function(data) {
-                    myPlayerId = data.playerId;
-                    players = data.players;
-                    gameBoard = data.board;
-                    currentPlayer = data.currentPlayer;
-                    gameActive = true;
-                    
-                    // Показываем соответствующую информацию для выбранного режима
-                    if (data.gameMode === 'level') {
-                        document.getElementById('levelInfo').classList.remove('hidden');
-                        document.getElementById('highscoreInfo').classList.add('hidden');
-                        levelData = data.levelData;
-                        updateLevelInfo();
-                    } else if (data.gameMode === 'endless') {
-                        document.getElementById('levelInfo').classList.add('hidden');
-                        document.getElementById('highscoreInfo').classList.remove('hidden');
-                        highscoreData = data.highscoreData;
-                        updateHighscoreInfo();
-                    }
-                    
-                    updateStatus('Игра началась!', 'playing');
-                    document.getElementById('connectSection').classList.add('hidden');
-                    document.getElementById('gameSection').classList.remove('hidden');
-                    
-                    updatePlayersBoard();
-                    updateBoard();
-                    updateGameStatus();
-                });
-                
-                socket.on('error', function(data) {
-                    updateStatus('Ошибка: ' + data.message, 'waiting');
-                });
-            }
-            
-            function updateLevelInfo() {
-                document.getElementById('targetCrystals').textContent = levelData.targetCrystals;
-                document.getElementById('collectedCrystals').textContent = levelData.collectedCrystals;
-                document.getElementById('movesLeft').textContent = levelData.movesLeft;
-            }
-            
-            function updateHighscoreInfo() {
-                document.getElementById('currentHighscore').textContent = highscoreData.personalBest;
-                document.getElementById('currentScore').textContent = highscoreData.currentScore;
-            }
-            
-            function updatePlayersBoard() {
-                const playersBoard = document.getElementById('playersBoard');
-                playersBoard.innerHTML = '';
-                
-                Object.keys(players).forEach(playerId => {
-                    const player = players[playerId];
-                    const playerCard = document.createElement('div');
-                    playerCard.className = 'player-card';
-                    
-                    if (playerId === currentPlayer) {
-                        playerCard.classList.add('current');
-                    }
-                    
-                    if (playerId === myPlayerId) {
-                        playerCard.style.background = '#e8f5e8';
-                    }
-                    
-                    playerCard.innerHTML = `
-                        <div class="player-name">${player.name} ${playerId === myPlayerId ? '(Вы)' : ''}</div>
-                        <div class="player-score">${player.score} очков</div>
-                        <div style="font-size: 0.9em; color: #666;">${player.position || ''}</div>
-                    `;
-                    
-                    playersBoard.appendChild(playerCard);
-                });
-            }
-            
-            function updateBoard() {
-                const boardElement = document.getElementById('gameBoard');
-                boardElement.innerHTML = '';
-                
-                for (let row = 0; row < gameBoard.length; row++) {
-                    for (let col = 0; col < gameBoard[row].length; col++) {
-                        const tile = document.createElement('div');
-                        tile.className = `tile ${gameBoard[row][col]}`;
-                        tile.dataset.row = row;
-                        tile.dataset.col = col;
-                        tile.onclick = () => selectTile(row, col);
-                        boardElement.appendChild(tile);
-                    }
-                }
-            }
-            
-            function selectTile(row, col) {
-                if (!gameActive || currentPlayer !== myPlayerId) return;
-                
-                const tileElement = document.querySelector(`[data-row="${row}"][data-col="${col}"]`);
-                
-                if (!selectedTile) {
-                    // Первое нажатие - выбираем фишку
-                    selectedTile = { row, col };
-                    tileElement.classList.add('selected');
-                } else {
-                    // Второе нажатие - пытаемся поменять фишки
-                    const firstTile = document.querySelector(`[data-row="${selectedTile.row}"][data-col="${selectedTile.col}"]`);
-                    firstTile.classList.remove('selected');
-                    
-                    // Проверяем, что фишки соседние
-                    const rowDiff = Math.abs(selectedTile.row - row);
-                    const colDiff = Math.abs(selectedTile.col - col);
-                    
-                    if ((rowDiff === 1 && colDiff === 0) || (rowDiff === 0 && colDiff === 1)) {
-                        socket.emit('make_move', {
-                            room: currentRoom,
-                            from: selectedTile,
-                            to: { row, col }
-                        });
-                    }
-                    
-                    selectedTile = null;
-                }
-            }
-            
-            function animateMatches(matches) {
-                matches.forEach(([row, col]) => {
-                    const tile = document.querySelector(`[data-row="${row}"][data-col="${col}"]`);
-                    if (tile) {
-                        tile.classList.add('matched');
-                        setTimeout(() => {
-                            tile.classList.remove('matched');
-                        }, 500);
-                    }
-                });
-            }
-            
-            function updateGameStatus() {
-                const statusElement = document.getElementById('gameStatus');
-                
-                if (!gameActive) {
-                    statusElement.textContent = 'Игра не активна';
-                    statusElement.className = 'status waiting';
-                    return;
-                }
-                
-                if (currentPlayer === myPlayerId) {
-                    statusElement.textContent = '🎯 Ваш ход! Выберите две соседние фишки для обмена';
-                    statusElement.className = 'status my-turn';
-                } else {
-                    const currentPlayerName = players[currentPlayer]?.name || 'Соперник';
-                    statusElement.textContent = `⏳ Ход игрока ${currentPlayerName}...`;
-                    statusElement.className = 'status waiting';
-                }
-            }
-            
-            function updateStatus(message, type) {
-                const statusElement = document.getElementById('status');
-                statusElement.textContent = message;
-                statusElement.className = 'status ' + type;
-            }
-            
-            function leaveGame() {
-                if (socket) {
-                    socket.emit('leave_room', { room: currentRoom });
-                    socket.disconnect();
-                }
-                document.getElementById('gameSection').classList.add('hidden');
-                document.getElementById('connectSection').classList.remove('hidden');
-                updateStatus('Введите название комнаты и ваше имя', 'waiting');
-            }
-        </script>
-    </body>
-    </html>
-    '''
+    return send_asset(client_index)
+
+@app.route(ASSET_PREFIX + '<name>')
+def static_asset(name):
+    asset = client_assets.get(ASSET_PREFIX + name)
+    if asset is None:
+        abort(404)
+    return send_asset(asset)
+
+@functools.lru_cache(maxsize=256)
+def accepted_encodings(header):
+    """Кодировки, допустимые по Accept-Encoding; у браузеров заголовок почти всегда один и тот же"""
+    accept = parse_accept_header(header)
+    return frozenset(name for name in ENCODINGS if accept[name] > 0)
+
+def send_asset(asset):
+    """Отдает заранее собранный файл в подходящей кодировке или 304 по ETag и Last-Modified"""
+    encoding = asset.negotiate(accepted_encodings(request.headers.get('Accept-Encoding', '')).__contains__)
+    revalidate, full = asset.headers[encoding]
+    if asset.not_modified(asset.etag(encoding), request.if_none_match, request.if_modified_since):
+        return Response(status=304, headers=revalidate)
+    return Response(asset.variants[encoding], content_type=asset.content_type, headers=full)
 
 @app.route('/health')
 def health():
-    return {'status': 'healthy', 'active_games': len(games)}
+    return {
+        'status': 'healthy',
+        'active_games': len(games),
+        'worker': cluster.worker_id,
+        'forwarded_events': cluster.forwarded,
+        'rooms': lifecycle.stats(),
+        'room_queues': actors.stats(),
+        'timers': len(timers),
+        'spectators': spectators.stats(),
+        'audit': audit.stats() if audit is not None else None,
+        'matchmaking': matchmaker.stats()
+    }
+
+@app.route('/metrics')
+def metrics_page():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def require_admin():
+    """Пускает только с заголовком Authorization: Bearer <ADMIN_TOKEN>"""
+    if not ADMIN_TOKEN:
+        abort(404)
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        abort(403)
+
+def float_arg(name, default, low, high):
+    try:
+        value = float(request.values.get(name, default))
+    except ValueError:
+        abort(400)
+    # nan проходит через min/max как есть, inf - тоже не число для настройки
+    if not math.isfinite(value):
+        abort(400)
+    return min(max(value, low), high)
+
+@app.route('/admin/profile')
+def admin_profile():
+    """Профилирует процесс seconds секунд; ответ - свернутые стеки для flamegraph.pl или speedscope.
+
+    По умолчанию снимается только главный поток (под eventlet в нем цикл событий и все
+    обработчики), threads=all - все потоки, включая пул вычислений и фоновые записи.
+    """
+    require_admin()
+    seconds = float_arg('seconds', 10, 0.1, PROFILE_MAX_SECONDS)
+    interval = float_arg('interval', profiler.interval, 0.001, 1.0)
+    threads = None if request.args.get('threads') == 'all' else {threading.main_thread().ident}
+    try:
+        profiler.start(interval, threads)
+    except ProfilerBusy:
+        abort(409)
+    log.info('profile_started', seconds=seconds, interval=interval)
+    try:
+        socketio.sleep(seconds)
+    finally:
+        profile = profiler.stop()
+    return Response(profile.collapsed(), mimetype='text/plain', headers={
+        'X-Profile-Samples': str(profile.samples),
+        'X-Profile-Seconds': f'{profile.seconds:.3f}'
+    })
+
+@app.route('/admin/handlers', methods=['GET', 'POST'])
+def admin_handlers():
+    """Выборочные замеры обработчиков; POST с rate меняет долю замеряемых вызовов"""
+    require_admin()
+    if request.method == 'POST':
+        handler_timer.set_rate(float_arg('rate', handler_timer.rate, 0.0, 1.0))
+        log.info('handler_sampling_changed', rate=handler_timer.rate)
+    return jsonify(handler_timer.stats())
+
+def sockets_by_mode():
+    """Игроки по режимам комнат и зрители отдельно"""
+    counts = Counter(games[data['room']]['game_mode'] for data in players.values() if data['room'] in games)
+    counts['spectator'] = len(spectators)
+    return counts
+
+@app.route('/leaderboard/<mode>')
+def leaderboard_page(mode):
+    limit, offset = page_args(request.args)
+    name = request.args.get('name')
+    return jsonify(leaderboard_data(mode, limit, offset, name))
+
+@socketio.on('get_leaderboard')
+def handle_get_leaderboard(data=None):
+    data = data or {}
+    mode = data.get('mode', 'endless')
+    limit, offset = page_args(data)
+    emit('leaderboard', leaderboard_data(mode, limit, offset, players.get(request.sid, {}).get('name')))
+
+def page_args(args):
+    """limit и offset страницы таблицы лидеров из параметров запроса"""
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+        offset = int(args.get('offset', 0))
+    except (TypeError, ValueError):
+        limit, offset = DEFAULT_LIMIT, 0
+    return min(max(limit, 1), MAX_LIMIT), max(offset, 0)
+
+def leaderboard_data(mode, limit, offset, name=None):
+    data = {
+        'mode': mode,
+        'total': leaderboard.size(mode),
+        'offset': offset,
+        'entries': leaderboard.top(mode, limit, offset)
+    }
+    if name:
+        data['me'] = {'name': name, 'rank': leaderboard.rank(name, mode), 'score': leaderboard.score(name, mode)}
+    return data
+
+def room_event(event, room_of):
+    """Регистрирует обработчик события комнаты.
+
+    room_of(sid, data) - комната события. Если комната принадлежит другому
+    воркеру, событие пересылается ему, иначе встает в очередь актора комнаты.
+    События без комнаты состояние игр не меняют и выполняются сразу.
+    """
+    def decorator(handler):
+        cluster.handlers[event] = handler
+        
+        @socketio.on(event)
+        @functools.wraps(handler)
+        def edge(*args):
+            sid = request.sid
+            room = room_of(sid, args[0] if args else None)
+            previous = cluster.routes.get(sid)
+            if event in ('join_room', 'join_single_player', 'watch_room'):
+                matchmaker.cancel(sid)
+                # Переход в другую комнату - сначала выход из прежней
+                if previous is not None and previous != room:
+                    dispatch_room_event(previous, 'leave_room', sid, ({'room': previous},))
+                cluster.routes[sid] = room
+            elif event in ('leave_room', 'disconnect'):
+                matchmaker.cancel(sid)
+                cluster.routes.pop(sid, None)
+                if event == 'leave_room':
+                    # Выход относится к комнате, в актор которой он ушел, а не к названной клиентом
+                    args = ({'room': room},)
+            if event == 'disconnect':
+                connected_sockets.inc(-1)
+            
+            if room is None:
+                return handler(*args)
+            dispatch_room_event(room, event, sid, args)
+            if event == 'disconnect' and not cluster.owns(room):
+                wire_formats.pop(sid, None)
+        
+        return handler
+    return decorator
+
+def data_room(default=None):
+    return lambda sid, data: (data or {}).get('room', default)
+
+def player_room(sid, data=None):
+    return cluster.routes.get(sid)
+
+def move_room(sid, data):
+    return cluster.routes.get(sid) or (data or {}).get('room')
+
+def dispatch_room_event(room, event, sid, args):
+    """В очередь актора комнаты, если комната наша, иначе воркеру-владельцу"""
+    if cluster.owns(room):
+        actors.submit(room, run_room_event, room, event, sid, args)
+    else:
+        cluster.forward(room, event, sid, args, wire_formats.get(sid))
+
+@contextmanager
+def socket_context(sid):
+    """Контекст события Socket.IO от имени sid: внутри работают request.sid и emit"""
+    with app.test_request_context('/socket.io/'):
+        request.sid = sid
+        request.namespace = '/'
+        yield
+
+def run_room_event(room, event, sid, args):
+    """Выполняет обработчик события в акторе комнаты от имени сокета sid"""
+    lifecycle.touch(room)
+    with socket_context(sid):
+        handler_timer.call(event, cluster.handlers[event], args, room)
+    
+    if event == 'disconnect':
+        cluster.edges.pop(sid, None)
+        wire_formats.pop(sid, None)
+
+def handle_forwarded_event(message):
+    """Событие комнаты этого воркера, пришедшее от воркера, к которому подключен сокет"""
+    sid = message['sid']
+    cluster.edges[sid] = message['edge']
+    if message['wire']:
+        wire_formats[sid] = message['wire']
+    actors.submit(message['room'], run_room_event, message['room'], message['event'], sid, message['args'])
+
+def handle_membership(message):
+    """Владелец комнаты добавляет подключенный к этому воркеру сокет в комнаты или убирает из них"""
+    change_membership(message['sid'], message['op'], *message['rooms'])
 
 @socketio.on('connect')
 def handle_connect():
-    print(f'Player connected: {request.sid}')
+    connected_sockets.inc()
+    log.info('socket_connected', sid=request.sid)
+    # Бинарный формат согласуется при подключении: io({query: {wire: 'binary'}})
+    if request.args.get('wire') == 'binary':
+        wire_formats[request.sid] = 'binary'
+        emit('wire', {'format': 'binary'})
 
-@socketio.on('disconnect')
+@room_event('disconnect', player_room)
 def handle_disconnect():
-    print(f'Player disconnected: {request.sid}')
-    if request.sid in players:
-        player_data = players[request.sid]
+    log.info('socket_disconnected', sid=request.sid)
+    wire_formats.pop(request.sid, None)
+    remove_player(request.sid)
+
+def remove_player(sid, room=None):
+    """Убирает игрока из его игры при любом выходе; опустевшая комната закрывается.
+
+    room - комната, из которой выходит игрок. Выход из прежней комнаты при переходе
+    выполняется в ее акторе и может опоздать: если вход в новую комнату уже случился,
+    игрок убирается только из прежней игры, а его данные и новая комната не меняются.
+    """
+    if (room is None or spectators.room_of(sid) == room) and stop_watching(sid):
+        return
+    player_data = players.get(sid)
+    if room is None or (player_data is not None and player_data['room'] == room):
+        player_data = players.pop(sid, None)
+        if player_data is None:
+            return
         room = player_data['room']
-        
-        if room in games:
-            game = games[room]
-            
-            # Удаляем игрока из игры
-            if request.sid in game['players']:
-                player_name = game['players'][request.sid]['name']
-                del game['players'][request.sid]
-                
-                # Уведомляем других игроков
-                emit('player_left', {
-                    'playerName': player_name,
-                    'players': game['players']
-                }, room=room)
-                
-                # Если игроков не осталось, удаляем игру
-                if len(game['players']) == 0:
-                    del games[room]
-                # Если остался 1 игрок, завершаем игру
-                elif len(game['players']) == 1 and game['game_active']:
-                    remaining_player_id = list(game['players'].keys())[0]
-                    emit('game_over', {'winner': remaining_player_id}, room=room)
-                    game['game_active'] = False
-        
-        del players[request.sid]
+        leave_game_room(room, player_data['protocol'], sid)
+    else:
+        # Формат прежней комнаты уже не известен - выход из каналов всех форматов
+        channels = [board_channel(room, protocol) for protocol in PROTOCOLS + ('binary',)]
+        change_membership(sid, 'leave', room, *channels)
+    
+    game = games.get(room)
+    if game is None or sid not in game['players']:
+        return
+    
+    # Если уходит текущий игрок, ход переходит к следующему
+    if game['current_player'] == sid and len(game['players']) > 1:
+        next_player(room)
+    player_name = game['players'].pop(sid)['name']
+    
+    # Если людей не осталось, удаляем игру (с одними ботами комната не живет)
+    if not humans(game):
+        close_room(room, 'empty')
+        return
+    
+    # Уведомляем других игроков
+    socketio.emit('player_left', {
+        'playerName': player_name,
+        'players': game['players'],
+        'currentPlayer': game['current_player'],
+        'turnTimeLeft': turn_time_left(game)
+    }, to=room)
+    
+    # Если остался 1 игрок, завершаем игру
+    if len(game['players']) == 1 and game['game_active']:
+        finish_game(room, next(iter(game['players'])))
+
+def finish_game(room, winner):
+    """Игра окончена: комната переходит в finished и ждет перезапуска или закрытия"""
+    games[room]['game_active'] = False
+    stop_turn(games[room])
+    archive_game(room, games[room])
+    lifecycle.transition(room, FINISHED)
+    socketio.emit('game_over', {'winner': winner}, to=room)
+
+def close_room(room, reason):
+    """Закрывает комнату: игра удаляется, оставшиеся игроки выходят из комнат Socket.IO"""
+    lifecycle.close(room)
+    game = games.pop(room, None)
+    if game is None:
+        return
+    
+    stop_turn(game)
+    timers.cancel(game.pop('fill_timer', None))
+    archive_game(room, game)
+    log.info('room_closed', room=room, reason=reason, mode=game['game_mode'], moves=len(game['log']))
+    if game['players'] or spectators.count(room):
+        socketio.emit('room_closed', {'reason': reason}, to=room)
+    for sid in game['players']:
+        player_data = players.get(sid)
+        if player_data and player_data['room'] == room:
+            del players[sid]
+            leave_game_room(room, player_data['protocol'], sid)
+    for sid, tier in spectators.close(room):
+        change_membership(sid, 'leave', room, spectator_channel(room, tier))
+
+def open_room(room):
+    """Регистрирует комнату новой игры; при превышении MAX_ROOMS клиент получает retryAfter"""
+    try:
+        lifecycle.open(room)
+    except RoomLimitReached as e:
+        emit('error', {
+            'message': 'Сервер перегружен, попробуйте через несколько секунд',
+            'retryAfter': e.retry_after
+        })
+        return False
+    return True
 
-@socketio.on('join_room')
+@room_event('join_room', data_room('default'))
 def handle_join_room(data):
     room = data.get('room', 'default')
     player_name = data.get('playerName', 'Игрок')
-    
-    join_room(room)
-    players[request.sid] = {
-        'room': room,
-        'name': player_name
-    }
+    protocol = requested_protocol(data)
+    stop_watching(request.sid)
     
     if room not in games:
+        if not open_room(room):
+            return
+        
         # Создаем новую игру
         games[room] = {
+            **new_round('multiplayer'),
             'players': {},
-            'board': create_game_board(),
             'current_player': None,
             'game_active': False,
             'move_count': 0,
-            'game_mode': 'multiplayer'
+            'game_mode': 'multiplayer',
+            'seq': 0,
+            # Комната подбора ждет всех подобранных игроков, обычная стартует с двумя
+            'start_at': min(max(int(data.get('matchSize', 2)), 2), MAX_PLAYERS)
         }
     
     game = games[room]
@@ -941,9 +560,15 @@ def handle_join_room(data):
     # Проверяем, не заполнена ли комната
     if len(game['players']) >= MAX_PLAYERS:
         emit('error', {'message': 'Комната заполнена (максимум 4 игрока)'})
-        leave_room(room)
         return
     
+    join_game_room(room, protocol)
+    players[request.sid] = {
+        'room': room,
+        'name': player_name,
+        'protocol': protocol
+    }
+    
     # Добавляем игрока
     game['players'][request.sid] = {
         'name': player_name,
@@ -955,7 +580,12 @@ def handle_join_room(data):
     emit('joined', {
         'playerId': request.sid,
         'message': f'Вы присоединились к комнате. Игроков: {len(game["players"])}/{MAX_PLAYERS}',
-        'players': game['players']
+        'players': game['players'],
+        'board': game['board'].to_names(),
+        'seq': game['seq'],
+        'currentPlayer': game['current_player'],
+        'gameActive': game['game_active'],
+        'turnTimeLeft': turn_time_left(game)
     })
     
     # Уведомляем других игроков
@@ -964,29 +594,125 @@ def handle_join_room(data):
         'players': game['players']
     }, room=room, include_self=False)
     
-    # Если игроков достаточно, начинаем игру
-    if len(game['players']) >= 2 and not game['game_active']:
+    # Если игроков достаточно, начинаем игру, иначе через BOT_FILL_AFTER секунд места займут боты
+    if len(game['players']) >= game['start_at'] and not game['game_active']:
+        start_game(room)
+    elif BOT_FILL_AFTER > 0 and not game['game_active']:
+        wait_for_bots(room)
+
+def humans(game):
+    return [sid for sid, data in game['players'].items() if not data.get('bot')]
+
+def wait_for_bots(room):
+    """Ставит (или переставляет после нового игрока) таймер заполнения комнаты ботами"""
+    game = games[room]
+    timers.cancel(game.pop('fill_timer', None))
+    game['fill_wait'] = game.get('fill_wait', 0) + 1
+    game['fill_timer'] = timers.schedule(BOT_FILL_AFTER, actors.submit, room, fill_with_bots, room, game['fill_wait'])
+
+def fill_with_bots(room, wait):
+    """Комната не набралась: боты занимают места до числа игроков для старта, игра начинается"""
+    game = games.get(room)
+    if game is None or game['game_active'] or game.get('fill_wait') != wait or not humans(game):
+        return
+    game.pop('fill_timer', None)
+    
+    added = 0
+    while len(game['players']) < game['start_at']:
+        bot = f'bot-{uuid.uuid4().hex[:12]}'
+        added += 1
+        game['players'][bot] = {
+            'name': f'Бот {added}',
+            'score': 0,
+            'position': len(game['players']) + 1,
+            'bot': True
+        }
+        socketio.emit('player_joined', {'playerName': game['players'][bot]['name'], 'players': game['players']}, to=room)
+    log.info('bots_joined', room=room, bots=added)
+    with socket_context(humans(game)[0]):
         start_game(room)
 
-@socketio.on('join_single_player')
+def play_bot_turn(room, turn):
+    """Ход бота: выбранный оценкой ход проходит через make_move, как ход игрока"""
+    game = games.get(room)
+    if game is None or not game['game_active'] or game.get('turn') != turn:
+        return
+    
+    bot = game['current_player']
+    code = bot_moves.choose(game['board'], game['move_index'].moves, bot_rng, BOT_SKILL)
+    if code is None:
+        return
+    with socket_context(bot):
+        make_move(room, *move_cells(code, game['board'].width))
+
+@socketio.on('find_match')
+def handle_find_match(data=None):
+    """Игрок встает в очередь подбора; комнату и старт игры сервер создает сам"""
+    data = data or {}
+    sid = request.sid
+    previous = cluster.routes.pop(sid, None)
+    if previous is not None:
+        dispatch_room_event(previous, 'leave_room', sid, ({'room': previous},))
+    
+    player_name = data.get('playerName', 'Игрок')
+    bucket = highscores.best(player_name, 'endless') // MATCH_SKILL_BUCKET if MATCH_SKILL_BUCKET else 0
+    groups = matchmaker.enqueue(sid, bucket, {
+        'playerName': player_name,
+        'protocol': data.get('protocol', 'full')
+    })
+    emit('matchmaking', {'queued': sid in matchmaker, 'waiting': len(matchmaker)})
+    for group in groups:
+        start_match(group)
+
+@socketio.on('cancel_match')
+def handle_cancel_match(data=None):
+    matchmaker.cancel(request.sid)
+    emit('matchmaking', {'queued': False, 'waiting': len(matchmaker)})
+
+def start_match(tickets):
+    """Создает комнату для подобранной группы: каждый игрок входит в нее как через join_room"""
+    room = f'match-{uuid.uuid4().hex[:12]}'
+    for ticket in tickets:
+        sid = ticket.player
+        cluster.routes[sid] = room
+        socketio.emit('match_found', {'room': room, 'players': len(tickets)}, to=sid)
+        dispatch_room_event(room, 'join_room', sid, ({**ticket.data, 'room': room, 'matchSize': len(tickets)},))
+
+def run_matchmaking():
+    """Фоновая задача: собирает неполные комнаты для игроков, ждущих дольше MATCH_MAX_WAIT"""
+    while True:
+        socketio.sleep(MATCH_POLL_INTERVAL)
+        for group in matchmaker.poll():
+            start_match(group)
+
+@room_event('join_single_player', lambda sid, data: f"singleplayer-{sid}")
 def handle_join_single_player(data):
     player_name = data.get('playerName', 'Игрок')
     game_mode = data.get('gameMode', 'endless')
+    level = data.get('level')
+    # Уровень - id строкой или номер; список или словарь не ищутся в уровнях вовсе
+    if game_mode == 'level' and level is not None and (isinstance(level, bool) or not isinstance(level, (str, int))):
+        emit('error', {'message': 'Неизвестный уровень'})
+        return
+    
+    protocol = requested_protocol(data)
     
     # Создаем уникальный room_id для одиночной игры
     room_id = f"singleplayer-{request.sid}"
+    if not open_room(room_id):
+        return
     
-    join_room(room_id)
+    join_game_room(room_id, protocol)
     players[request.sid] = {
         'room': room_id,
-        'name': player_name
+        'name': player_name,
+        'protocol': protocol
     }
     
     # Создаем игру в зависимости от режима
     if game_mode == 'endless':
         # Бесконечный режим
-        personal_best = highscores.get(player_name, {}).get('endless', 0)
-        
+        personal_best = highscores.best(player_name, 'endless')
         games[room_id] = {
             'players': {
                 request.sid: {
@@ -995,17 +721,20 @@ def handle_join_single_player(data):
                     'position': 1
                 }
             },
-            'board': create_game_board(),
+            **new_round('endless'),
             'current_player': request.sid,
             'game_active': True,
             'game_mode': 'endless',
-            'move_count': 0
+            'move_count': 0,
+            'seq': 0
         }
+        lifecycle.transition(room_id, ACTIVE)
         
         emit('single_player_started', {
             'playerId': request.sid,
             'players': games[room_id]['players'],
-            'board': games[room_id]['board'],
+            'board': games[room_id]['board'].to_names(),
+            'seq': games[room_id]['seq'],
             'currentPlayer': games[room_id]['current_player'],
             'gameMode': 'endless',
             'highscoreData': {
@@ -1015,42 +744,64 @@ def handle_join_single_player(data):
         })
         
     elif game_mode == 'level':
-        # Режим уровня с целью
-        board = create_game_board()
-        initial_red = count_tile_type(board, 'red')
-        
-        games[room_id] = {
-            'players': {
-                request.sid: {
-                    'name': player_name,
-                    'score': 0,
-                    'position': 1
-                }
-            },
-            'board': board,
-            'current_player': request.sid,
-            'game_active': True,
-            'game_mode': 'level',
-            'level_type': 'collect_red',
-            'level_goal': 20,
-            'moves_left': 25,
-            'collected_red': 0,
-            'initial_red': initial_red,
-            'move_count': 0
-        }
-        
-        emit('single_player_started', {
-            'playerId': request.sid,
-            'players': games[room_id]['players'],
-            'board': games[room_id]['board'],
-            'currentPlayer': games[room_id]['current_player'],
-            'gameMode': 'level',
-            'levelData': {
-                'targetCrystals': 20,
-                'collectedCrystals': 0,
-                'movesLeft': 25
+        # Режим уровня с целью: уровень по id или номеру, по умолчанию первый
+        start_level(room_id, player_name, levels.get(level) or levels.first)
+
+def start_level(room, player_name, level):
+    """Новая партия уровня level в одиночной комнате игрока"""
+    progress = level.progress()
+    games[room] = {
+        'players': {
+            request.sid: {
+                'name': player_name,
+                'score': 0,
+                'position': 1
             }
-        })
+        },
+        **new_round('level', level),
+        'current_player': request.sid,
+        'game_active': True,
+        'game_mode': 'level',
+        'level_progress': progress,
+        'move_count': 0,
+        'seq': 0
+    }
+    lifecycle.transition(room, ACTIVE)
+    
+    emit('single_player_started', {
+        'playerId': request.sid,
+        'players': games[room]['players'],
+        'board': games[room]['board'].to_names(),
+        'seq': games[room]['seq'],
+        'currentPlayer': games[room]['current_player'],
+        'gameMode': 'level',
+        'levelData': progress.data()
+    })
+
+def new_round(mode, level=None):
+    """Новая партия: свой генератор с новым зерном, журнал ходов и играбельное поле.
+
+    Поле уровня - его размера, а в журнал вместо режима пишется уровень, чтобы
+    партию можно было повторить.
+    """
+    log = GameLog(new_seed(), level.log_mode if level else mode)
+    rng = log.rng()
+    if level is None:
+        board, attempts = compute.generate_board(rng)
+    else:
+        board, attempts = compute.generate_board(rng, level.width, level.height)
+    board_attempts.observe(attempts)
+    move_index = MoveIndex(board)
+    return {'rng': rng, 'log': log, 'board': move_index.board, 'move_index': move_index, 'archived': False}
+
+def archive_game(room, game):
+    """Партия окончена или брошена: журнал уходит в архив, один раз за партию"""
+    log = game['log']
+    if audit is not None and len(log) and not game['archived']:
+        # Поле без ходов значит, что после последнего хода его не перемешивали
+        log.no_reshuffle = not game['move_index']
+        audit.append(room, log, width=game['board'].width, height=game['board'].height)
+    game['archived'] = True
 
 def start_game(room):
     """Начинает игру в комнате"""
@@ -1060,156 +811,356 @@ def start_game(room):
     game = games[room]
     game['game_active'] = True
     game['move_count'] = 0
+    timers.cancel(game.pop('fill_timer', None))
+    lifecycle.transition(room, ACTIVE)
     
-    # Выбираем случайного первого игрока
+    # Первый игрок выводится из зерна партии, чтобы не сдвигать генератор поля
     player_ids = list(game['players'].keys())
-    game['current_player'] = random.choice(player_ids)
+    game['current_player'] = player_ids[game['log'].seed % len(player_ids)]
+    start_turn(room)
     
     # Сбрасываем очки
     for player_id in game['players']:
         game['players'][player_id]['score'] = 0
     
-    print(f'Game started in room {room} with {len(player_ids)} players')
+    log.info('game_started', room=room, players=len(player_ids), seed=game['log'].seed)
     
     # Уведомляем всех игроков
     emit('game_start', {
-        'board': game['board'],
+        'board': game['board'].to_names(),
+        'seq': game['seq'],
         'currentPlayer': game['current_player'],
-        'players': game['players']
+        'players': game['players'],
+        'turnTimeLeft': turn_time_left(game)
     }, room=room)
 
-@socketio.on('make_move')
+@room_event('make_move', move_room)
 def handle_make_move(data):
-    room = data.get('room')
     from_pos = data.get('from')
     to_pos = data.get('to')
+    # Ход идет только в комнату игрока: имени комнаты от клиента верить нельзя (в одиночной
+    # игре браузер присылает свое имя, а чужое имя не должно давать ходить в чужой партии)
+    room = players.get(request.sid, {}).get('room')
+    make_move(room, from_pos['row'], from_pos['col'], to_pos['row'], to_pos['col'])
+
+@room_event('make_move_bin', player_room)
+def handle_make_move_binary(data):
+    """Ход в бинарном формате: varint-код обмена, комната берется из данных игрока"""
+    room = players.get(request.sid, {}).get('room')
+    if room not in games:
+        reject_move('Игра не найдена')
+        return
     
+    try:
+        row1, col1, row2, col2 = decode_move(bytes(data), games[room]['board'].width)
+    except (TypeError, ValueError):
+        reject_move('Неверный ход')
+        return
+    make_move(room, row1, col1, row2, col2)
+
+def make_move(room, row1, col1, row2, col2):
+    """Ход текущего игрока: обмен двух соседних фишек"""
     if room not in games:
-        emit('move_result', {'valid': False, 'message': 'Игра не найдена'})
+        reject_move('Игра не найдена')
         return
     
     game = games[room]
+    started = time.perf_counter()
     
     # Проверяем, что ход делает текущий игрок
     if game['current_player'] != request.sid:
-        emit('move_result', {'valid': False, 'message': 'Не ваш ход'})
+        reject_move('Не ваш ход')
         return
     
     # Проверяем валидность хода
-    if not is_valid_move(game['board'], from_pos['row'], from_pos['col'], to_pos['row'], to_pos['col']):
-        emit('move_result', {'valid': False, 'message': 'Неверный ход'})
+    if not is_valid_move(game['board'], row1, col1, row2, col2):
+        reject_move('Неверный ход')
         return
+    validated = time.perf_counter()
+    move_phases['validate'].observe(validated - started)
     
-    # Меняем фишки местами
-    game['board'] = swap_tiles(game['board'], from_pos['row'], from_pos['col'], to_pos['row'], to_pos['col'])
+    # Ходы без совпадений отклоняем по индексу, не трогая поле
+    found = game['move_index'].has(row1, col1, row2, col2)
+    matched = time.perf_counter()
+    move_phases['match'].observe(matched - validated)
+    if not found:
+        reject_move('Нет совпадений')
+        return
     
-    # Проверяем совпадения
-    matches = check_matches(game['board'])
+    # Меняем фишки местами и разрешаем каскады
+    steps = compute.resolve_move(game['board'], row1, col1, row2, col2, game['rng'])
     
-    if matches:
+    if steps:
+        game_log = game['log']
+        game_log.record(game_log.slot(request.sid, game['players'][request.sid]['name']),
+                        move_code(row1, col1, row2, col2, game['board'].width))
+        changed = [(row1, col1), (row2, col2)]
+        for step in steps:
+            changed.extend(step.changed)
+        game['move_index'].update(changed)
+        cascaded = time.perf_counter()
+        move_phases['cascade'].observe(cascaded - matched)
+        cascade_depth.observe(len(steps))
+        
         if game['game_mode'] == 'multiplayer' or game['game_mode'] == 'endless':
-            # Обычный режим: начисляем очки
-            points = len(matches) * 10
-            game['players'][request.sid]['score'] += points
+            # Обычный режим: начисляем очки за каждый шаг каскада
+            for step in steps:
+                game['players'][request.sid]['score'] += len(step.matches) * 10
             game['move_count'] += 1
             
-            # Удаляем совпадения и заполняем поле
-            game['board'] = remove_matches_and_refill(game['board'], matches)
-            
-            # Проверяем каскадные совпадения
-            cascade_matches = check_matches(game['board'])
-            while cascade_matches:
-                points = len(cascade_matches) * 10
-                game['players'][request.sid]['score'] += points
-                game['board'] = remove_matches_and_refill(game['board'], cascade_matches)
-                cascade_matches = check_matches(game['board'])
-            
             # Проверяем условие победы для мультиплеера
             if game['game_mode'] == 'multiplayer':
                 winner = check_winner(game)
                 if winner:
-                    emit('game_over', {'winner': winner}, room=room)
-                    game['game_active'] = False
+                    finish_game(room, winner)
                 else:
                     # Передаем ход следующему игроку
                     next_player(room)
                     
                     # Обновляем поле для всех игроков
-                    emit('board_update', {
-                        'board': game['board'],
-                        'currentPlayer': game['current_player'],
-                        'players': game['players'],
-                        'matches': matches
-                    }, room=room)
+                    emit_board_update(room, steps, (row1, col1, row2, col2))
             
             # Для бесконечного режима
             elif game['game_mode'] == 'endless':
                 player_name = game['players'][request.sid]['name']
                 current_score = game['players'][request.sid]['score']
-                personal_best = highscores.get(player_name, {}).get('endless', 0)
                 
-                # Обновляем рекорд если нужно
-                if current_score > personal_best:
-                    if player_name not in highscores:
-                        highscores[player_name] = {}
-                    highscores[player_name]['endless'] = current_score
-                    personal_best = current_score
+                # Обновляем рекорд если нужно (на диск он попадет со следующей пачкой)
+                personal_best = highscores.record(player_name, 'endless', current_score)
+                if personal_best == current_score:
+                    leaderboard.update(player_name, 'endless', current_score)
                 
-                emit('board_update', {
-                    'board': game['board'],
-                    'currentPlayer': game['current_player'],
-                    'players': game['players'],
-                    'matches': matches,
+                emit_board_update(room, steps, (row1, col1, row2, col2), {
                     'highscoreData': {
                         'currentScore': current_score,
                         'personalBest': personal_best
                     }
-                }, room=room)
+                })
         
         elif game['game_mode'] == 'level':
-            # Режим уровня: считаем красные кристаллы и уменьшаем ходы
-            red_matches = [pos for pos in matches if game['board'][pos[0]][pos[1]] == 'red']
-            red_points = len(red_matches)
-            game['collected_red'] += red_points
-            game['moves_left'] -= 1
+            # Режим уровня: цели считаются по убранным фишкам каскада, поле не пересчитывается
+            progress = game['level_progress']
+            progress.record(steps)
+            game['players'][request.sid]['score'] = progress.score
             game['move_count'] += 1
             
-            # Удаляем совпадения и заполняем поле
-            game['board'] = remove_matches_and_refill(game['board'], matches)
-            
-            # Проверяем каскадные совпадения
-            cascade_matches = check_matches(game['board'])
-            while cascade_matches:
-                red_cascade = [pos for pos in cascade_matches if game['board'][pos[0]][pos[1]] == 'red']
-                red_points = len(red_cascade)
-                game['collected_red'] += red_points
-                game['board'] = remove_matches_and_refill(game['board'], cascade_matches)
-                cascade_matches = check_matches(game['board'])
-            
             # Проверяем условие победы/поражения уровня
-            if game['collected_red'] >= game['level_goal']:
-                emit('game_over', {'winner': 'level_completed'}, room=room)
-                game['game_active'] = False
-            elif game['moves_left'] <= 0:
-                emit('game_over', {'winner': 'level_failed'}, room=room)
-                game['game_active'] = False
+            if progress.completed or progress.failed:
+                result = 'level_completed' if progress.completed else 'level_failed'
+                log.info('level_finished', room=room, level=progress.level.id, result=result,
+                         moves=game['move_count'], score=progress.score)
+                finish_game(room, result)
             else:
                 # Обновляем поле
-                emit('board_update', {
-                    'board': game['board'],
-                    'currentPlayer': game['current_player'],
-                    'players': game['players'],
-                    'matches': matches,
-                    'levelData': {
-                        'targetCrystals': game['level_goal'],
-                        'collectedCrystals': game['collected_red'],
-                        'movesLeft': game['moves_left']
-                    }
-                }, room=room)
+                emit_board_update(room, steps, (row1, col1, row2, col2), {
+                    'levelData': progress.data()
+                })
+        
+        if game['game_active']:
+            ensure_moves_available(room)
+        move_phases['emit'].observe(time.perf_counter() - cascaded)
     else:
-        # Если нет совпадений, отменяем ход
-        game['board'] = swap_tiles(game['board'], from_pos['row'], from_pos['col'], to_pos['row'], to_pos['col'])
-        emit('move_result', {'valid': False, 'message': 'Нет совпадений'})
+        # Если нет совпадений, ход отменен
+        reject_move('Нет совпадений')
+
+def reject_move(message):
+    """Отклоняет ход: ответ игроку и счетчик отклоненных ходов"""
+    moves_rejected.inc()
+    emit('move_result', {'valid': False, 'message': message})
+
+def run_timers():
+    """Фоновая задача: продвигает общее колесо таймеров"""
+    while True:
+        socketio.sleep(timers.tick)
+        timers.advance()
+
+def monitor_loop_lag():
+    """Фоновая задача: насколько позже срока просыпается задача - столько ждут события в цикле"""
+    while True:
+        started = time.perf_counter()
+        socketio.sleep(LOOP_LAG_INTERVAL)
+        loop_lag.observe(max(0.0, time.perf_counter() - started - LOOP_LAG_INTERVAL))
+
+def flush_highscores():
+    """Фоновая задача: периодически сохраняет накопленные рекорды; SQLite пишет поток ОС"""
+    from eventlet import tpool
+    while True:
+        socketio.sleep(HIGHSCORE_FLUSH_INTERVAL)
+        try:
+            tpool.execute(highscores.flush)
+        except Exception:
+            log.exception('highscore_flush_failed')
+
+def ensure_moves_available(room):
+    """Перемешивает поле, если на нем не осталось ни одного хода"""
+    game = games[room]
+    if game['move_index']:
+        return
+    
+    compute.reshuffle(game['board'], game['rng'])
+    game['move_index'].rebuild()
+    game['seq'] += 1
+    emit('board_reshuffled', {'board': game['board'].to_names(), 'seq': game['seq']}, room=room)
+
+def emit_board_update(room, steps, swap, extra=None):
+    """Рассылает результат хода: полное поле старым клиентам, шаги каскада - новым"""
+    game = games[room]
+    game['seq'] += 1
+    mover = request.sid
+    extra = {**(extra or {}), 'turnTimeLeft': turn_time_left(game)}
+    
+    updates = {}
+    updates['full'] = {
+        'board': game['board'].to_names(),
+        'seq': game['seq'],
+        'currentPlayer': game['current_player'],
+        'players': game['players'],
+        'matches': steps[0].matches,
+        **extra
+    }
+    
+    row1, col1, row2, col2 = swap
+    updates['delta'] = {
+        'seq': game['seq'],
+        'currentPlayer': game['current_player'],
+        'scores': {mover: game['players'][mover]['score']},
+        'swap': [[row1, col1], [row2, col2]],
+        'steps': encode_steps(steps),
+        **extra
+    }
+    
+    # Бинарные клиенты получают упакованное поле и номера убранных клеток
+    width = game['board'].width
+    updates['binary'] = {
+        'seq': game['seq'],
+        'currentPlayer': game['current_player'],
+        'scores': {mover: game['players'][mover]['score']},
+        'board': encode_board(game['board']),
+        'matches': encode_cells(steps[0].matches, width),
+        **extra
+    }
+    
+    if game['seq'] % METRICS_PAYLOAD_SAMPLE == 0:
+        for protocol, update in updates.items():
+            payload_bytes[protocol].observe(json_size(update))
+    
+    for protocol, update in updates.items():
+        emit('board_update', update, room=board_channel(room, protocol))
+    # Живые зрители получают те же обновления через свои комнаты, прореженные - снимок позже
+    for tier in spectators.live_tiers(room):
+        emit('board_update', updates[tier[1]], room=spectator_channel(room, tier))
+    spectators.changed(room)
+
+def requested_protocol(data):
+    if wire_formats.get(request.sid) == 'binary':
+        return 'binary'
+    protocol = data.get('protocol', 'full')
+    return protocol if protocol in PROTOCOLS else 'full'
+
+def board_channel(room, protocol):
+    """Комната Socket.IO, в которую уходят обновления поля в формате protocol"""
+    return f'{room}#{protocol}'
+
+def spectator_channel(room, tier):
+    """Комната Socket.IO уровня зрителей: живого в формате protocol или прореженного"""
+    rate, protocol = tier
+    return board_channel(room, f'watch-{protocol}' if rate == LIVE else f'watch-{rate}hz')
+
+def join_game_room(room, protocol, sid=None):
+    change_membership(sid or request.sid, 'join', room, board_channel(room, protocol))
+
+def leave_game_room(room, protocol, sid=None):
+    change_membership(sid or request.sid, 'leave', room, board_channel(room, protocol))
+
+def change_membership(sid, op, *rooms):
+    """join/leave комнат Socket.IO выполняется на воркере, к которому подключен сокет"""
+    if cluster.edge_of(sid) != cluster.worker_id:
+        cluster.membership(sid, op, rooms)
+        return
+    change = socketio.server.enter_room if op == 'join' else socketio.server.leave_room
+    for name in rooms:
+        change(sid, name, namespace='/')
+
+@room_event('resync', player_room)
+def handle_resync(data=None):
+    """Полный снимок поля для клиента, пропустившего обновление"""
+    room = players.get(request.sid, {}).get('room') or spectators.room_of(request.sid)
+    if room not in games:
+        return
+    
+    game = games[room]
+    emit('board_snapshot', {
+        'board': game['board'].to_names(),
+        'seq': game['seq'],
+        'currentPlayer': game['current_player'],
+        'players': game['players'],
+        'turnTimeLeft': turn_time_left(game)
+    })
+
+@room_event('watch_room', data_room('default'))
+def handle_watch_room(data):
+    """Зритель не занимает место игрока; maxRate - не больше стольких обновлений поля в секунду"""
+    room = data.get('room', 'default')
+    game = games.get(room)
+    if game is None or game['game_mode'] != 'multiplayer':
+        emit('error', {'message': 'Комната не найдена'})
+        return
+    if request.sid in game['players']:
+        emit('error', {'message': 'Вы уже играете в этой комнате'})
+        return
+    
+    stop_watching(request.sid)
+    try:
+        max_rate = float(data.get('maxRate') or 0)
+    except (TypeError, ValueError):
+        max_rate = 0
+    tier = spectators.watch(request.sid, room, requested_protocol(data), max_rate)
+    change_membership(request.sid, 'join', room, spectator_channel(room, tier))
+    emit('watching', {
+        'room': room,
+        'players': game['players'],
+        'board': game['board'].to_names(),
+        'seq': game['seq'],
+        'currentPlayer': game['current_player'],
+        'gameActive': game['game_active'],
+        'turnTimeLeft': turn_time_left(game),
+        'maxRate': tier[0] or None,
+        'spectators': spectators.count(room)
+    })
+
+def stop_watching(sid):
+    """Убирает зрителя из его комнат; False, если sid не зритель"""
+    watched = spectators.unwatch(sid)
+    if watched is None:
+        return False
+    room, tier = watched
+    change_membership(sid, 'leave', room, spectator_channel(room, tier))
+    return True
+
+def emit_spectator_snapshot(room, tier):
+    """Последнее состояние поля для прореженного уровня зрителей"""
+    game = games.get(room)
+    if game is None:
+        return
+    socketio.emit('board_snapshot', {
+        'board': game['board'].to_names(),
+        'seq': game['seq'],
+        'currentPlayer': game['current_player'],
+        'players': game['players'],
+        'turnTimeLeft': turn_time_left(game)
+    }, to=spectator_channel(room, tier))
+
+@room_event('request_hint', player_room)
+def handle_request_hint(data=None):
+    # Комнату берем из данных сервера: одиночная комната клиенту неизвестна
+    room = players.get(request.sid, {}).get('room')
+    if room not in games or games[room]['current_player'] != request.sid:
+        return
+    
+    hint = games[room]['move_index'].hint()
+    if hint:
+        row1, col1, row2, col2 = hint
+        emit('hint', {'from': {'row': row1, 'col': col1}, 'to': {'row': row2, 'col': col2}})
 
 def next_player(room):
     """Передает ход следующему игроку"""
@@ -1225,6 +1176,42 @@ def next_player(room):
     current_index = player_ids.index(game['current_player'])
     next_index = (current_index + 1) % len(player_ids)
     game['current_player'] = player_ids[next_index]
+    start_turn(room)
+
+def start_turn(room):
+    """Ставит таймер хода текущего игрока в общее колесо таймеров"""
+    game = games[room]
+    stop_turn(game)
+    game['turn'] = game.get('turn', 0) + 1
+    if TURN_TIME > 0 and game['game_mode'] == 'multiplayer' and game['game_active']:
+        # Срабатывание таймера тоже проходит через актор комнаты
+        game['turn_timer'] = timers.schedule(TURN_TIME, actors.submit, room, skip_turn, room, game['turn'])
+    if game['game_active'] and game['players'].get(game['current_player'], {}).get('bot'):
+        think = BOT_THINK_TIME * bot_rng.uniform(0.5, 1.5)
+        game['bot_timer'] = timers.schedule(think, actors.submit, room, play_bot_turn, room, game['turn'])
+
+def stop_turn(game):
+    timers.cancel(game.pop('turn_timer', None))
+    timers.cancel(game.pop('bot_timer', None))
+
+def turn_time_left(game):
+    """Сколько секунд осталось на текущий ход (None - без ограничения)"""
+    timer = game.get('turn_timer')
+    return round(timers.remaining(timer), 1) if timer is not None and timer.active else None
+
+def skip_turn(room, turn):
+    """Время хода истекло: ход переходит к следующему игроку"""
+    game = games.get(room)
+    if game is None or not game['game_active'] or game.get('turn') != turn:
+        return
+    
+    skipped = game['current_player']
+    next_player(room)
+    socketio.emit('turn_skipped', {
+        'skippedPlayer': skipped,
+        'currentPlayer': game['current_player'],
+        'turnTimeLeft': turn_time_left(game)
+    }, to=room)
 
 def check_winner(game):
     """Проверяет, достиг ли какой-либо игрок условия победы"""
@@ -1250,25 +1237,22 @@ def check_winner(game):
     
     return None
 
-@socketio.on('leave_room')
+@room_event('leave_room', move_room)
 def handle_leave_room(data):
-    room = data.get('room')
-    leave_room(room)
-    
-    if request.sid in players:
-        del players[request.sid]
+    remove_player(request.sid, data.get('room'))
 
-@socketio.on('restart_game')
+@room_event('restart_game', data_room())
 def handle_restart_game(data):
     room = data.get('room')
     if room in games:
         game = games[room]
         if len(game['players']) >= 2:
             # Пересоздаем игру
-            game['board'] = create_game_board()
+            archive_game(room, game)
+            game.update(new_round('multiplayer'))
             start_game(room)
 
-@socketio.on('restart_single_player')
+@room_event('restart_single_player', player_room)
 def handle_restart_single_player():
     if request.sid in players:
         player_data = players[request.sid]
@@ -1277,12 +1261,12 @@ def handle_restart_single_player():
         if room in games:
             game = games[room]
             game_mode = game['game_mode']
+            archive_game(room, game)
             
             if game_mode == 'endless':
                 # Бесконечный режим - создаем новую игру
                 player_name = game['players'][request.sid]['name']
-                personal_best = highscores.get(player_name, {}).get('endless', 0)
-                
+                personal_best = highscores.best(player_name, 'endless')
                 games[room] = {
                     'players': {
                         request.sid: {
@@ -1291,17 +1275,20 @@ def handle_restart_single_player():
                             'position': 1
                         }
                     },
-                    'board': create_game_board(),
+                    **new_round('endless'),
                     'current_player': request.sid,
                     'game_active': True,
                     'game_mode': 'endless',
-                    'move_count': 0
+                    'move_count': 0,
+                    'seq': 0
                 }
+                lifecycle.transition(room, ACTIVE)
                 
                 emit('single_player_started', {
                     'playerId': request.sid,
                     'players': games[room]['players'],
-                    'board': games[room]['board'],
+                    'board': games[room]['board'].to_names(),
+                    'seq': games[room]['seq'],
                     'currentPlayer': games[room]['current_player'],
                     'gameMode': 'endless',
                     'highscoreData': {
@@ -1311,46 +1298,48 @@ def handle_restart_single_player():
                 })
                 
             elif game_mode == 'level':
-                # Режим уровня - создаем новый уровень
-                board = create_game_board()
-                initial_red = count_tile_type(board, 'red')
-                
-                games[room] = {
-                    'players': {
-                        request.sid: {
-                            'name': game['players'][request.sid]['name'],
-                            'score': 0,
-                            'position': 1
-                        }
-                    },
-                    'board': board,
-                    'current_player': request.sid,
-                    'game_active': True,
-                    'game_mode': 'level',
-                    'level_type': 'collect_red',
-                    'level_goal': 20,
-                    'moves_left': 25,
-                    'collected_red': 0,
-                    'initial_red': initial_red,
-                    'move_count': 0
-                }
-                
-                emit('single_player_started', {
-                    'playerId': request.sid,
-                    'players': games[room]['players'],
-                    'board': games[room]['board'],
-                    'currentPlayer': games[room]['current_player'],
-                    'gameMode': 'level',
-                    'levelData': {
-                        'targetCrystals': 20,
-                        'collectedCrystals': 0,
-                        'movesLeft': 25
-                    }
-                })
+                # Пройденный уровень сменяется следующим, непройденный начинается заново
+                progress = game['level_progress']
+                level = levels.next(progress.level) if progress.completed else progress.level
+                start_level(room, game['players'][request.sid]['name'], level)
+
+cluster.start(handle_forwarded_event, handle_membership)
+
+stopped = False
+
+def shutdown():
+    """Остановка: рекорды на диск, архив партий и журнал дописываются; повторный вызов ничего не делает"""
+    global stopped
+    if stopped:
+        return
+    stopped = True
+    try:
+        highscores.close()
+    except Exception:
+        log.exception('highscore_flush_failed')
+    if audit is not None:
+        audit.close()
+    compute.shutdown()
+    log.info('server_stopped')
+    log_listener.stop()
+
+def handle_stop_signal(signum, frame):
+    """SIGTERM и SIGINT: при смерти от сигнала atexit не срабатывает, поэтому все сохраняется здесь"""
+    shutdown()
+    sys.stdout.flush()
+    os._exit(0)
 
 if __name__ == '__main__':
+    socketio.start_background_task(cluster.queue.listen)
+    socketio.start_background_task(flush_highscores)
+    socketio.start_background_task(run_timers)
+    socketio.start_background_task(run_matchmaking)
+    socketio.start_background_task(monitor_loop_lag)
+    atexit.register(shutdown)
+    signal.signal(signal.SIGTERM, handle_stop_signal)
+    signal.signal(signal.SIGINT, handle_stop_signal)
     port = int(os.environ.get('PORT', 10000))
-    print(f"🎮 Сервер 'Три в ряд - Соревнование' запущен на порту {port}")
-    print(f"👥 Максимальное количество игроков в комнате: {MAX_PLAYERS}")
-    print(f"🎯 Доступные режимы: Мультиплеер, Бесконечный, Уровни")
+    log.info('server_started', port=port, max_players=MAX_PLAYERS, worker=cluster.worker_id,
+             workers=len(cluster.router.workers), modes=['multiplayer', 'endless', 'level'],
+             audit_dir=AUDIT_DIR or None)
     socketio.run(app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True)
@@ -0,0 +1,10 @@
+"""Общие настройки тестов: пакеты из корня репозитория, сервер без диска"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# server.py читает настройки при импорте: рекорды в памяти, без архива партий
+os.environ.setdefault('HIGHSCORE_DB', ':memory:')
+os.environ.setdefault('AUDIT_DIR', '')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
@@ -0,0 +1,95 @@
+"""Общие помощники тестов: эталонные алгоритмы и случайные партии.
+
+Эталоны повторяют исходные реализации из benchmarks (там они замеряются),
+но тесты от каталога benchmarks не зависят.
+"""
+import random
+
+from match3.board import EMPTY, TILE_CODES
+from match3.engine import create_game_board, resolve_move
+from match3.moves import MoveIndex, move_cells, playable_board, reshuffle
+from match3.replay import POINTS_PER_TILE, GameLog
+from match3.vectorized import random_streams
+
+
+def legacy_matches(rows):
+    """Исходный поиск совпадений по полю из списков строк (имена фишек, None - пусто)"""
+    matches = set()
+    height = len(rows)
+    width = len(rows[0])
+    for row in range(height):
+        for col in range(width - 2):
+            if rows[row][col] is not None and rows[row][col] == rows[row][col + 1] == rows[row][col + 2]:
+                matches.update(((row, col), (row, col + 1), (row, col + 2)))
+    for row in range(height - 2):
+        for col in range(width):
+            if rows[row][col] is not None and rows[row][col] == rows[row + 1][col] == rows[row + 2][col]:
+                matches.update(((row, col), (row + 1, col), (row + 2, col)))
+    return matches
+
+
+def queue_refill(board, matches, rng):
+    """Исходный алгоритм падения и заполнения на Board: очередь пустых клеток в столбце"""
+    cells = board.cells
+    width, height = board.width, board.height
+    board.clear(matches)
+    for col in range(width):
+        empty_cells = []
+        for row in range(height - 1, -1, -1):
+            index = row * width + col
+            if cells[index] == EMPTY:
+                empty_cells.append(row)
+            elif empty_cells:
+                lowest_empty = empty_cells.pop(0)
+                cells[lowest_empty * width + col] = cells[index]
+                cells[index] = EMPTY
+                empty_cells.append(row)
+    for index in range(len(cells)):
+        if cells[index] == EMPTY:
+            cells[index] = rng.choice(TILE_CODES)
+    return board
+
+
+def random_swap(rng, width, height):
+    """Случайный обмен соседних клеток"""
+    if rng.random() < 0.5:
+        row, col = rng.randrange(height), rng.randrange(width - 1)
+        return row, col, row, col + 1
+    row, col = rng.randrange(height - 1), rng.randrange(width)
+    return row, col, row + 1, col
+
+
+def batch_inputs(count, moves, seed, width=8, height=8, stream_length=4096):
+    """Поля, обмены по ходам и потоки новых фишек для пакетной симуляции"""
+    rng = random.Random(seed)
+    boards = [create_game_board(rng, width, height) for _ in range(count)]
+    swaps = [[random_swap(rng, width, height) for _ in range(count)] for _ in range(moves)]
+    return boards, swaps, random_streams(count, stream_length, seed)
+
+
+def play(seed, moves, players, finish):
+    """Играет партию как сервер, выбирая ходы случайно; возвращает журнал, итоговое поле и очки"""
+    log = GameLog(seed, 'multiplayer' if players > 1 else 'endless')
+    rng = log.rng()
+    picker = random.Random(seed ^ 0x5EED)
+    index = MoveIndex(playable_board(rng))
+    board = index.board
+    scores = [0] * players
+    for number in range(moves):
+        slot = log.slot(number % players, f'player-{number % players}')
+        code = picker.choice(sorted(index.moves))
+        row1, col1, row2, col2 = move_cells(code, board.width)
+        steps = resolve_move(board, row1, col1, row2, col2, rng)
+        log.record(slot, code)
+        changed = [(row1, col1), (row2, col2)]
+        for step in steps:
+            changed.extend(step.changed)
+            scores[slot] += len(step.matches) * POINTS_PER_TILE
+        index.update(changed)
+        if finish and number == moves - 1:
+            # Партия кончилась этим ходом - поле больше не перемешивается
+            log.no_reshuffle = not index
+        elif not index:
+            reshuffle(board, rng)
+            index.rebuild()
+    return log, board, scores
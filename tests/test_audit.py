@@ -0,0 +1,60 @@
+"""Архив партий: общий каталог нескольких воркеров и повтор партии по одной записи архива"""
+import os
+
+from helpers import play
+from match3.audit import AuditWriter, read_archive, segment_paths
+from match3.levels import load_levels
+from match3.levelsim import play as play_level
+
+
+def test_writers_sharing_directory_keep_all_records(tmp_path):
+    directory = str(tmp_path / 'audit')
+    writers = [AuditWriter(directory, segment_bytes=512) for _ in range(3)]
+    assert not os.path.exists(directory)
+
+    logs = [play(seed, 40, 2, finish=True)[0] for seed in range(60)]
+    for n, log in enumerate(logs):
+        assert writers[n % len(writers)].append(f'room-{n}', log, ended_at=n)
+    for writer in writers:
+        writer.close()
+
+    entries = sorted(read_archive(directory), key=lambda entry: entry.ended_at)
+    assert [entry.room for entry in entries] == [f'room-{n}' for n in range(len(logs))]
+    assert [bytes(entry.log.moves) for entry in entries] == [bytes(log.moves) for log in logs]
+    assert len(segment_paths(directory)) == sum(writer.segments for writer in writers)
+
+
+def test_level_game_replays_from_archive_alone(tmp_path):
+    level = load_levels().get('tiny-mix')
+    log, progress = play_level(level, 5, 1.0)
+    writer = AuditWriter(str(tmp_path))
+    writer.append('level-room', log, ended_at=1, width=level.width, height=level.height)
+    writer.close()
+
+    entry, = read_archive(str(tmp_path))
+    assert (entry.width, entry.height) == (6, 6)
+    result = entry.replay()
+    assert result.board.width == 6 and result.scores == [progress.score]
+
+
+def test_records_read_back_and_truncated_tail_is_skipped(tmp_path):
+    directory = str(tmp_path)
+    logs = [play(seed, 40, seed % 4 + 1, finish=True)[0] for seed in range(300)]
+    writer = AuditWriter(directory, segment_bytes=4096)
+    for n, log in enumerate(logs):
+        writer.append(f'комната-{n}', log, ended_at=1700000000 + n)
+    writer.close()
+    assert len(segment_paths(directory)) > 1
+
+    entries = list(read_archive(directory))
+    assert len(entries) == len(logs)
+    fields = lambda log: (log.seed, log.mode, log.players, bytes(log.moves), len(log), log.no_reshuffle)
+    for n, (entry, log) in enumerate(zip(entries, logs)):
+        assert entry.room == f'комната-{n}' and entry.ended_at == 1700000000 + n
+        assert fields(entry.log) == fields(log) and list(entry.log) == list(log)
+
+    # Обрезанная запись в конце сегмента (остановка посреди записи) пропускается
+    last = segment_paths(directory)[-1]
+    with open(last, 'r+b') as f:
+        f.truncate(os.path.getsize(last) - 3)
+    assert len(list(read_archive(directory))) == len(logs) - 1
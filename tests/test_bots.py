@@ -0,0 +1,91 @@
+"""Оценка ходов ботов против прямой модели на копии поля; выбор только из доступных ходов"""
+import random
+
+import pytest
+
+from match3.board import EMPTY
+from match3.bots import MoveEvaluator
+from match3.engine import check_matches, resolve_move
+from match3.moves import MoveIndex, move_cells, playable_board
+
+
+def reference_score(board, code):
+    """Та же оценка напрямую: копия поля, полный поиск совпадений, падение без новых фишек"""
+    board = board.copy()
+    board.swap(*move_cells(code, board.width))
+    cleared = depth = 0
+    matches = check_matches(board)
+    while matches:
+        cleared += len(matches)
+        depth += 1
+        board.clear(matches)
+        for col in range(board.width):
+            tiles = [tile for tile in board.col(col) if tile != EMPTY]
+            column = [EMPTY] * (board.height - len(tiles)) + tiles
+            for row, tile in enumerate(column):
+                board.set(row, col, tile)
+        matches = check_matches(board)
+    return cleared, depth
+
+
+def mid_game(rng):
+    """Поле в середине партии: после нескольких ходов с каскадами"""
+    board = playable_board(rng)
+    index = MoveIndex(board)
+    for _ in range(rng.randrange(5)):
+        if not index:
+            break
+        row1, col1, row2, col2 = move_cells(rng.choice(sorted(index.moves)), board.width)
+        steps = resolve_move(board, row1, col1, row2, col2, rng)
+        index.update([(row1, col1), (row2, col2)] + [cell for step in steps for cell in step.changed])
+    return board, index
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_scores_match_reference_and_leave_board_untouched(seed):
+    rng = random.Random(seed)
+    evaluator = MoveEvaluator()
+    for _ in range(50):
+        board, index = mid_game(rng)
+        before = bytes(board.cells)
+        scored = evaluator.evaluate(board, index.moves)
+        assert [code for code, _ in scored] == sorted(index.moves)
+        for code, score in scored:
+            assert score == reference_score(board, code), (board.to_names(), code, score)
+        assert bytes(board.cells) == before
+
+
+@pytest.mark.parametrize('width, height', [(5, 9), (9, 4), (16, 16)])
+def test_scores_match_reference_on_other_sizes(width, height):
+    rng = random.Random(width * 100 + height)
+    evaluator = MoveEvaluator(width, height)
+    for _ in range(30):
+        board = playable_board(rng, width, height)
+        for code, score in evaluator.evaluate(board):
+            assert score == reference_score(board, code), (board.to_names(), code, score)
+
+
+def test_chosen_move_is_legal():
+    rng = random.Random(7)
+    evaluator = MoveEvaluator()
+    for skill in (0.0, 0.5, 1.0):
+        for _ in range(50):
+            board, index = mid_game(rng)
+            code = evaluator.choose(board, index.moves, rng, skill)
+            assert code in index.moves
+            copy = board.copy()
+            copy.swap(*move_cells(code, board.width))
+            assert check_matches(copy)
+
+
+def test_best_move_wins_at_full_skill():
+    rng = random.Random(3)
+    evaluator = MoveEvaluator()
+    board, index = mid_game(rng)
+    best = max(score for _, score in evaluator.evaluate(board, index.moves))
+    assert all(reference_score(board, evaluator.choose(board, index.moves, rng)) == best for _ in range(20))
+
+
+def test_no_moves_gives_none():
+    board, _ = mid_game(random.Random(1))
+    assert MoveEvaluator().choose(board, set()) is None
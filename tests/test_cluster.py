@@ -0,0 +1,43 @@
+"""Пересылка событий между воркерами: JSON вместо pickle, bytes переживают очередь"""
+import pickle
+
+import pytest
+
+from match3.cluster import Cluster, LocalQueue, RoomRouter, decode_message, encode_message
+
+
+def test_message_round_trip_keeps_bytes():
+    message = {'kind': 'event', 'room': 'комната', 'args': (b'\x00\x81\xff', {'from': {'row': 1}}), 'wire': None}
+    decoded = decode_message(encode_message(message))
+    assert decoded == {**message, 'args': [b'\x00\x81\xff', {'from': {'row': 1}}]}
+
+
+def test_pickle_payload_is_rejected():
+    with pytest.raises(ValueError):
+        decode_message(pickle.dumps({'kind': 'event'}))
+
+
+def test_event_for_other_worker_is_forwarded_to_owner():
+    queue = LocalQueue()
+    workers = ['worker-a', 'worker-b']
+    edge, owner = Cluster('worker-a', workers, queue), Cluster('worker-b', workers, queue)
+    received = []
+    owner.start(received.append, None)
+    room = next(f'room-{n}' for n in range(100) if owner.owns(f'room-{n}'))
+
+    edge.forward(room, 'make_move_bin', 'sid-1', (b'\x12\x34',), 'binary')
+    assert received == [{'kind': 'event', 'room': room, 'event': 'make_move_bin', 'sid': 'sid-1',
+                         'args': [b'\x12\x34'], 'wire': 'binary', 'edge': 'worker-a'}]
+
+
+def test_each_room_has_one_owner_and_scale_out_moves_rooms_to_new_worker():
+    workers = ['worker-0', 'worker-1', 'worker-2']
+    nodes = [Cluster(worker, workers) for worker in workers]
+    rooms = [f'room-{n}' for n in range(1000)]
+    for room in rooms:
+        assert sum(node.owns(room) for node in nodes) == 1
+
+    before, after = RoomRouter(workers), RoomRouter(workers + ['worker-3'])
+    moved = [room for room in rooms if before.owner(room) != after.owner(room)]
+    assert moved and all(after.owner(room) == 'worker-3' for room in moved)
+    assert len(moved) < len(rooms) / 2
@@ -0,0 +1,26 @@
+"""Шаги каскада для клиента: поле до хода плюс шаги дают поле после хода"""
+import json
+import random
+
+from match3.delta import apply_steps, encode_steps
+from match3.engine import resolve_move
+from match3.moves import MoveIndex, move_cells, playable_board, reshuffle
+
+
+def test_applied_steps_rebuild_board():
+    rng = random.Random(7)
+    index = MoveIndex(playable_board(rng))
+    board = index.board
+    for _ in range(500):
+        if not index:
+            reshuffle(board, rng)
+            index.rebuild()
+        row1, col1, row2, col2 = move_cells(rng.choice(sorted(index.moves)), board.width)
+        client = board.copy()
+        steps = resolve_move(board, row1, col1, row2, col2, rng)
+        assert steps
+        client.swap(row1, col1, row2, col2)
+        # Шаги уходят клиенту в JSON: кортежи и коды не должны понадобиться при применении
+        apply_steps(client, json.loads(json.dumps(encode_steps(steps))))
+        assert client == board, board.to_names()
+        index.update([(row1, col1), (row2, col2)] + [cell for step in steps for cell in step.changed])
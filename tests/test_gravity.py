@@ -0,0 +1,25 @@
+"""Падение фишек: Board.collapse против исходного алгоритма с очередью"""
+import random
+
+import pytest
+
+from helpers import queue_refill
+from match3.engine import create_game_board, remove_matches_and_refill
+
+SIZES = [(8, 8), (8, 64), (8, 256)]
+
+
+@pytest.mark.parametrize('width, height', SIZES)
+def test_compaction_moves_tiles_like_queue(width, height):
+    rng = random.Random(width * 1000 + height)
+    positions = [(row, col) for row in range(height) for col in range(width)]
+    for _ in range(100):
+        board = create_game_board(rng, width, height)
+        matches = rng.sample(positions, rng.randrange(len(positions)))
+        expected = board.copy()
+        queue_refill(expected, matches, rng)
+        remove_matches_and_refill(board, matches, rng)
+        # Новые фишки берутся из генератора по-разному, сравниваются только упавшие
+        for col in range(width):
+            kept = height - sum(1 for _, match_col in matches if match_col == col)
+            assert board.col(col)[height - kept:] == expected.col(col)[height - kept:]
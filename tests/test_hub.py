@@ -0,0 +1,65 @@
+"""Брокер match3.hub: доставка подписчикам канала, bytes в сообщениях, менеджер Socket.IO"""
+import queue
+import threading
+
+import pytest
+
+from match3.cluster import Cluster, make_queue
+from match3.hub import HubConnection, HubManager, serve
+
+
+@pytest.fixture(scope='module')
+def hub_url():
+    ready = queue.Queue()
+    threading.Thread(target=serve, kwargs={'port': 0, 'ready': ready.put}, daemon=True).start()
+    return f'tcp://127.0.0.1:{ready.get(timeout=5)}'
+
+
+def test_event_is_forwarded_to_owner_in_other_process_queue(hub_url):
+    workers = ['worker-a', 'worker-b']
+    edge = Cluster('worker-a', workers, make_queue(hub_url))
+    owner = Cluster('worker-b', workers, make_queue(hub_url))
+    received = queue.Queue()
+    owner.start(received.put, None)
+    threading.Thread(target=owner.queue.listen, daemon=True).start()
+    room = next(f'room-{n}' for n in range(100) if owner.owns(f'room-{n}'))
+
+    # Подписка владельца и публикация edge идут разными соединениями: публикация, обогнавшая
+    # подписку, никому не доставляется, поэтому событие повторяется до первой доставки
+    for _ in range(50):
+        edge.forward(room, 'make_move_bin', 'sid-1', (b'\x12\x34',), 'binary')
+        try:
+            message = received.get(timeout=0.1)
+            break
+        except queue.Empty:
+            pass
+    assert message == {'kind': 'event', 'room': room, 'event': 'make_move_bin', 'sid': 'sid-1',
+                                       'args': [b'\x12\x34'], 'wire': 'binary', 'edge': 'worker-a'}
+    edge.queue.close()
+    owner.queue.close()
+
+
+def test_publisher_receives_own_channel_and_other_channels_stay_silent(hub_url):
+    first, second = HubConnection(hub_url), HubConnection(hub_url)
+    first.subscribe('a')
+    second.subscribe('b')
+    # Кадры одного соединения брокер читает по порядку: своя публикация приходит после подписки
+    first.publish('a', b'one')
+    messages = first.messages()
+    assert next(messages) == ('a', b'one')
+    second.publish('b', b'own')
+    second.publish('a', b'two')
+    assert next(messages) == ('a', b'two')
+    assert next(second.messages()) == ('b', b'own')
+    first.close()
+    second.close()
+
+
+def test_socketio_manager_round_trip(hub_url):
+    manager = HubManager(hub_url, channel='test-socketio')
+    update = {'method': 'emit', 'event': 'board_update', 'data': {'cells': b'\x01\x02', 'seq': 3},
+              'namespace': '/', 'room': 'board:binary:room-1', 'skip_sid': None, 'callback': None,
+              'host_id': manager.host_id}
+    manager._publish(update)
+    assert next(manager._listen()) == update
+    manager._connection.close()
@@ -0,0 +1,44 @@
+"""Таблица лидеров: места и страницы совпадают с полной сортировкой после каждого обновления"""
+import random
+
+from match3.leaderboard import Leaderboard
+
+MODE = 'endless'
+
+
+def expected_ranking(scores):
+    ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    ranks = {}
+    for position, (name, score) in enumerate(ordered):
+        if position and score == ordered[position - 1][1]:
+            ranks[name] = ranks[ordered[position - 1][0]]
+        else:
+            ranks[name] = position + 1
+    return ordered, ranks
+
+
+def test_rank_and_pages_match_full_sort():
+    rng = random.Random(1)
+    board = Leaderboard()
+    scores = {}
+    for _ in range(2000):
+        name = f'player-{rng.randrange(300)}'
+        score = rng.randrange(0, 2000, 10)
+        if board.update(name, MODE, score):
+            scores[name] = score
+        else:
+            assert name in scores and score <= scores[name]
+        ordered, ranks = expected_ranking(scores)
+        probe = rng.choice(list(scores))
+        assert board.rank(probe, MODE) == ranks[probe]
+        offset = rng.randrange(len(scores))
+        page = board.top(MODE, 20, offset)
+        assert [(entry['name'], entry['score']) for entry in page] == ordered[offset:offset + 20]
+        assert all(entry['rank'] == ranks[entry['name']] for entry in page)
+
+
+def test_unknown_player_has_no_rank():
+    board = Leaderboard()
+    board.update('alice', MODE, 100)
+    assert board.rank('bob', MODE) is None
+    assert board.rank('alice', 'timed') is None
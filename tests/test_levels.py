@@ -0,0 +1,58 @@
+"""Уровни из match3/levels.json: ожидаемая проходимость и повтор партий уровня по журналу"""
+import random
+
+import pytest
+
+from match3.levels import DEFAULT_PATH, load_levels
+from match3.levelsim import play, simulate
+from match3.replay import GameLog, replay
+
+GAMES = 100
+BOT_SKILL = 0.85
+
+# Доля прохождений игроком bot (python -m match3.levelsim --players bot): уровни идут от
+# легкого к трудному. После правки levels.json полосы обновляются по свежему прогону
+PASS_RATE_BANDS = {
+    'red-20': (0.95, 1.0),
+    'blue-green': (0.9, 1.0),
+    'wide-pair': (0.75, 0.95),
+    'small-score': (0.65, 0.85),
+    'tiny-mix': (0.5, 0.75),
+}
+
+
+def test_level_lookup_by_id_or_number():
+    levels = load_levels(DEFAULT_PATH)
+    assert levels.get('tiny-mix').id == 'tiny-mix'
+    assert levels.get(1) is levels.first
+    for key in (0, len(levels) + 1, True, 'no-such-level', ['red-20'], {'id': 'red-20'}, None):
+        assert levels.get(key) is None, key
+
+
+def test_every_level_has_a_band():
+    assert [level.id for level in load_levels()] == list(PASS_RATE_BANDS)
+
+
+@pytest.mark.parametrize('level_id', list(PASS_RATE_BANDS))
+def test_bot_pass_rate_stays_in_band(level_id):
+    level = load_levels().get(level_id)
+    passed, _ = simulate(DEFAULT_PATH, level, BOT_SKILL, GAMES, seed=1)
+    low, high = PASS_RATE_BANDS[level_id]
+    assert low <= len(passed) / GAMES <= high
+
+
+@pytest.mark.parametrize('level_id', list(PASS_RATE_BANDS))
+def test_level_game_replays_from_log(level_id):
+    levels = load_levels()
+    level = levels.get(level_id)
+    rng = random.Random(level.number)
+    for _ in range(10):
+        log, progress = play(level, rng.getrandbits(63), rng.choice((-1.0, 0.5, 1.0)))
+        copy = GameLog(log.seed, log.mode, log.players, bytes(log.moves), no_reshuffle=log.no_reshuffle)
+        # Уровень и размер поля берутся из режима журнала
+        played = levels.from_log_mode(copy.mode)
+        assert played is level
+        result = replay(copy, played.width, played.height)
+        assert result.scores == [progress.score]
+        assert [result.collected[code] for code, _ in level.goals] == progress.collected
+        assert len(copy) == level.moves - progress.moves_left
@@ -0,0 +1,45 @@
+"""Поиск совпадений по строкам и столбцам против исходного обхода поля"""
+import random
+
+import pytest
+
+from helpers import legacy_matches, random_swap
+from match3.board import EMPTY, TILE_CODES, Board
+from match3.engine import (
+    changed_lines, check_matches, check_matches_around, create_game_board,
+    remove_matches_and_refill, swap_lines, swap_tiles,
+)
+
+SIZES = [(8, 8), (3, 9), (9, 3), (16, 16)]
+
+
+def reference(board):
+    return legacy_matches(board.to_names())
+
+
+@pytest.mark.parametrize('width, height', SIZES)
+def test_full_scan_on_random_boards(width, height):
+    rng = random.Random(width * 100 + height)
+    codes = TILE_CODES + (EMPTY,)
+    for _ in range(300):
+        board = Board(width, height, bytes(rng.choice(codes) for _ in range(width * height)))
+        assert set(check_matches(board)) == reference(board), board.to_names()
+
+
+@pytest.mark.parametrize('width, height', SIZES)
+def test_local_scan_after_swaps_and_cascades(width, height):
+    rng = random.Random(width * 100 + height)
+    for _ in range(40):
+        board = create_game_board(rng, width, height)
+        for _ in range(50):
+            swap = random_swap(rng, width, height)
+            swap_tiles(board, *swap)
+            local = check_matches_around(board, *swap_lines(*swap))
+            assert set(local) == reference(board), (board.to_names(), swap)
+            if not local:
+                swap_tiles(board, *swap)
+                continue
+            while local:
+                changed = remove_matches_and_refill(board, local, rng)
+                local = check_matches_around(board, *changed_lines(changed))
+                assert set(local) == reference(board), board.to_names()
@@ -0,0 +1,87 @@
+"""Подбор соперников: один игрок - одна комната, неполные комнаты только после max_wait"""
+import random
+
+from match3.matchmaking import Matchmaker, MatchPolicy
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_random_arrivals_respect_policy():
+    policy = MatchPolicy(2, 4, max_wait=5.0, widen_after=8.0)
+    rng = random.Random(1)
+    clock = Clock()
+    matchmaker = Matchmaker(policy, clock)
+    groups = []
+    queued = set()
+    cancelled = set()
+    player = 0
+    for _ in range(2400):
+        clock.now += 0.25
+        formed = []
+        for _ in range(rng.choice((0, 0, 1, 1, 2))):
+            formed.extend(matchmaker.enqueue(player, min(5, int(rng.betavariate(2, 2) * 6))))
+            queued.add(player)
+            player += 1
+        for p in rng.sample(sorted(queued), int(len(queued) * 0.05)):
+            # Игрок мог попасть в комнату раньше, чем успел отменить поиск
+            if matchmaker.cancel(p):
+                cancelled.add(p)
+        formed.extend(matchmaker.poll())
+        for group in formed:
+            queued.difference_update(ticket.player for ticket in group)
+        queued -= cancelled
+        groups.extend((clock.now, group) for group in formed)
+
+    seen = set()
+    for formed_at, group in groups:
+        assert policy.min_players <= len(group) <= policy.max_players
+        members = {ticket.player for ticket in group}
+        assert len(members) == len(group) and not members & seen and not members & cancelled
+        seen |= members
+        waited = formed_at - min(ticket.queued_at for ticket in group)
+        if len(group) < policy.max_players:
+            # Неполная комната собирается только для дождавшегося max_wait
+            assert waited >= policy.max_wait
+        spread = {ticket.bucket for ticket in group}
+        # Соседние корзины смешиваются только после widen_after
+        assert len(spread) == 1 or (max(spread) - min(spread) <= 2 and waited >= policy.widen_after)
+    assert len(groups) > 100 and all((p in seen) + (p in cancelled) + (p in matchmaker) == 1 for p in range(player))
+
+
+def test_full_bucket_forms_room_at_once():
+    matchmaker = Matchmaker(MatchPolicy(2, 3), Clock())
+    assert matchmaker.enqueue('a') == [] and matchmaker.enqueue('b') == []
+    group = matchmaker.enqueue('c')
+    assert [[ticket.player for ticket in room] for room in group] == [['a', 'b', 'c']]
+    assert len(matchmaker) == 0
+
+
+def test_lonely_player_waits_until_someone_comes():
+    clock = Clock()
+    matchmaker = Matchmaker(MatchPolicy(2, 4, max_wait=5.0, widen_after=8.0, recheck=1.0), clock)
+    matchmaker.enqueue('a', bucket=0)
+    clock.now += 4.9
+    assert matchmaker.poll() == []
+    clock.now += 1.0
+    # Срок вышел, но соперников нет - игрок остается в очереди
+    assert matchmaker.poll() == [] and 'a' in matchmaker
+    # Дождавшийся игрок забирает первого пришедшего, не дожидаясь полной комнаты
+    group = matchmaker.enqueue('b', bucket=0)
+    assert [[ticket.player for ticket in room] for room in group] == [['a', 'b']]
+
+
+def test_neighbour_bucket_joins_after_widen_after():
+    clock = Clock()
+    matchmaker = Matchmaker(MatchPolicy(2, 4, max_wait=5.0, widen_after=8.0, recheck=1.0), clock)
+    matchmaker.enqueue('a', bucket=3)
+    matchmaker.enqueue('b', bucket=4)
+    clock.now += 6.0
+    assert matchmaker.poll() == []
+    clock.now += 3.0
+    assert [sorted(ticket.player for ticket in room) for room in matchmaker.poll()] == [['a', 'b']]
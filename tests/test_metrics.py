@@ -0,0 +1,50 @@
+"""Метрики: корзины гистограмм против прямого подсчета и формат вывода Prometheus"""
+import json
+import random
+from bisect import bisect_left
+
+from match3.metrics import LATENCY_BUCKETS, Histogram, Registry, json_size
+
+
+def test_histogram_buckets_match_direct_count():
+    rng = random.Random(1)
+    histogram = Histogram('latency', 'проверка')
+    # Значения на самих границах попадают в корзину этой границы (le включает ее)
+    observed = [rng.choice((rng.uniform(0, 3), *LATENCY_BUCKETS)) for _ in range(10000)]
+    for value in observed:
+        histogram.observe(value)
+    expected = [0] * (len(LATENCY_BUCKETS) + 1)
+    for value in observed:
+        expected[bisect_left(LATENCY_BUCKETS, value)] += 1
+    assert histogram.counts == expected
+    assert histogram.count == len(observed) and abs(histogram.sum - sum(observed)) < 1e-6
+
+    registry = Registry()
+    registry.add(histogram)
+    lines = registry.render().splitlines()
+    buckets = [line for line in lines if line.startswith('match3_latency_bucket')]
+    # Корзины накопительные, последняя +Inf равна числу наблюдений
+    cumulative = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert cumulative == sorted(cumulative) and cumulative[-1] == len(observed)
+    assert buckets[-1].startswith('match3_latency_bucket{le="+Inf"}')
+    assert f'match3_latency_count {len(observed)}' in lines
+
+
+def test_render_describes_labelled_metrics_once():
+    registry = Registry()
+    phases = registry.histograms('move_seconds', 'фазы хода', 'phase', ('resolve', 'emit'), buckets=(0.1, 1.0))
+    registry.counter('moves_total', 'ходы').inc(3)
+    registry.gauge('rooms', 'комнаты по режимам', fn=lambda: {'timed': 1, 'endless': 2}, label='mode')
+    phases['emit'].observe(0.5)
+    lines = registry.render().splitlines()
+    assert lines.count('# TYPE match3_move_seconds histogram') == 1
+    assert 'match3_move_seconds_bucket{phase="emit",le="1.0"} 1' in lines
+    assert 'match3_move_seconds_bucket{phase="resolve",le="+Inf"} 0' in lines
+    assert 'match3_moves_total 3' in lines
+    assert lines[-2:] == ['match3_rooms{mode="endless"} 2', 'match3_rooms{mode="timed"} 1']
+
+
+def test_json_size_counts_binary_attachments():
+    data = {'board': b'\x00' * 40, 'score': 120, 'name': 'Игрок'}
+    text = json.dumps({**data, 'board': None}, separators=(',', ':'), ensure_ascii=False)
+    assert json_size(data) == len(text.encode('utf-8')) + 40
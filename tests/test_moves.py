@@ -0,0 +1,45 @@
+"""Индекс ходов: обновление по измененным клеткам против полного пересчета и прямой проверки обменом"""
+import random
+
+import pytest
+
+from match3.engine import check_matches, resolve_move
+from match3.moves import MoveIndex, move_code, move_cells, playable_board, reshuffle
+
+SIZES = [(8, 8), (16, 16), (5, 9)]
+
+
+def reference(board):
+    """Ходы, найденные обменом каждой пары соседних клеток на копии поля"""
+    moves = set()
+    for row in range(board.height):
+        for col in range(board.width):
+            for row2, col2 in ((row, col + 1), (row + 1, col)):
+                if row2 >= board.height or col2 >= board.width:
+                    continue
+                copy = board.copy()
+                copy.swap(row, col, row2, col2)
+                if check_matches(copy):
+                    moves.add(move_code(row, col, row2, col2, board.width))
+    return moves
+
+
+@pytest.mark.parametrize('width, height', SIZES)
+def test_incremental_update_matches_rebuild(width, height):
+    rng = random.Random(width * 100 + height)
+    index = MoveIndex(playable_board(rng, width, height))
+    board = index.board
+    assert index.moves == reference(board)
+    for _ in range(150):
+        if not index:
+            reshuffle(board, rng)
+            index.rebuild()
+            assert index.moves == reference(board)
+            continue
+        row1, col1, row2, col2 = move_cells(rng.choice(sorted(index.moves)), width)
+        changed = [(row1, col1), (row2, col2)]
+        for step in resolve_move(board, row1, col1, row2, col2, rng):
+            changed.extend(step.changed)
+        index.update(changed)
+        assert index.moves == MoveIndex(board.copy()).moves
+        assert index.moves == reference(board)
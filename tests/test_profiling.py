@@ -0,0 +1,66 @@
+"""Профилирование: выборки попадают под метку события, замер каждого N-го вызова"""
+import threading
+import time
+
+import pytest
+
+from match3.metrics import Registry
+from match3.profiling import HandlerTimer, ProfilerBusy, SamplingProfiler
+
+
+def timer(rate=0.0, profiler=None):
+    histograms = Registry().histograms('handler_seconds', 'обработчики', 'event', ('make_move',))
+    return HandlerTimer(histograms, rate, profiler=profiler)
+
+
+def spin():
+    return sum(n * n for n in range(2000))
+
+
+def test_samples_are_labelled_with_event():
+    profiler = SamplingProfiler(0.001)
+    profiler.start(threads={threading.get_ident()})
+    handler_timer = timer(1.0, profiler)
+    calls = 0
+    deadline = time.monotonic() + 0.3
+    while time.monotonic() < deadline:
+        handler_timer.call('make_move', spin, ())
+        calls += 1
+    profile = profiler.stop()
+    assert profile.samples > 0 and not profiler.labels
+
+    total = labelled = in_spin = 0
+    for line in profile.collapsed().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        frames = stack.split(';')
+        total += int(count)
+        if frames[1:2] == ['event:make_move']:
+            labelled += int(count)
+            if any(frame.startswith('spin (test_profiling.py:') for frame in frames):
+                in_spin += int(count)
+    assert total == profile.samples and in_spin
+    # Почти все время поток ходит внутри call, поэтому почти все выборки помечены
+    assert labelled >= total * 0.8, (labelled, total)
+    assert handler_timer.stats()['events']['make_move']['sampled'] == calls
+
+
+def test_second_start_is_rejected():
+    profiler = SamplingProfiler(0.01)
+    profiler.start()
+    try:
+        with pytest.raises(ProfilerBusy):
+            profiler.start()
+    finally:
+        profiler.stop()
+    assert not profiler.running
+
+
+def test_rate_measures_every_nth_call():
+    handler_timer = timer(0.25)
+    for _ in range(100):
+        handler_timer.call('make_move', spin, ())
+        handler_timer.call('chat', spin, ())
+    stats = handler_timer.stats()
+    assert stats['events']['make_move']['calls'] == 100
+    assert stats['events']['make_move']['sampled'] == 25
+    assert 'chat' not in stats['events'] and len(stats['slowest']) == 20
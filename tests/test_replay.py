@@ -0,0 +1,20 @@
+"""Повтор партии по журналу дает то же поле и те же очки, что и сыгранная партия"""
+import random
+
+import pytest
+
+from helpers import play
+from match3.replay import GameLog, replay
+
+
+@pytest.mark.parametrize('players', [1, 2, 4])
+@pytest.mark.parametrize('finish', [False, True])
+def test_replay_reproduces_game(players, finish):
+    rng = random.Random(players * 10 + finish)
+    for n in range(40):
+        log, board, scores = play(rng.getrandbits(63), rng.randint(0, 120), players, finish)
+        # Журнал проходит через байты, как при записи в архив
+        copy = GameLog(log.seed, log.mode, log.players, bytes(log.moves), no_reshuffle=log.no_reshuffle)
+        result = replay(copy)
+        assert result.board == board, f'партия {n}: поле не совпало'
+        assert result.scores[:len(log.players)] == scores[:len(log.players)], f'партия {n}: очки не совпали'
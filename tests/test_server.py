@@ -0,0 +1,139 @@
+"""Обработчики событий сервера через тестовый клиент Flask-SocketIO"""
+import server
+from match3.moves import move_cells
+from match3.replay import GameLog, replay
+
+
+def settle():
+    """Дает акторам комнат выполнить события из очереди"""
+    server.socketio.sleep(0.05)
+
+
+def connect():
+    return server.socketio.test_client(server.app)
+
+
+def received(client, name):
+    return [message['args'][0] for message in client.get_received() if message['name'] == name]
+
+
+def some_move(game, room):
+    row1, col1, row2, col2 = move_cells(min(game['move_index'].moves), game['board'].width)
+    return {'room': room, 'from': {'row': row1, 'col': col1}, 'to': {'row': row2, 'col': col2}}
+
+
+def test_make_move_goes_to_players_own_room():
+    client = connect()
+    client.emit('join_single_player', {'playerName': 'solo', 'gameMode': 'endless'})
+    settle()
+    sid = received(client, 'single_player_started')[0]['playerId']
+    game = server.games[f'singleplayer-{sid}']
+
+    # Браузер присылает свое имя комнаты одиночной игры - ход все равно идет в комнату игрока
+    client.emit('make_move', some_move(game, 'singleplayer-endless-1700000000000'))
+    settle()
+    assert received(client, 'board_update')
+    assert game['seq'] == 1
+
+
+def test_make_move_ignores_room_of_another_game():
+    first, second, outsider = connect(), connect(), connect()
+    for client, name in ((first, 'first'), (second, 'second')):
+        client.emit('join_room', {'room': 'move-room-check', 'playerName': name})
+    settle()
+    game = server.games['move-room-check']
+    board = bytes(game['board'].cells)
+
+    outsider.emit('make_move', some_move(game, 'move-room-check'))
+    settle()
+    assert [result['valid'] for result in received(outsider, 'move_result')] == [False]
+    assert bytes(game['board'].cells) == board and game['seq'] == 0
+
+
+def test_server_game_replays_from_its_log():
+    client = connect()
+    client.emit('join_single_player', {'playerName': 'replayed', 'gameMode': 'endless'})
+    settle()
+    sid = received(client, 'single_player_started')[0]['playerId']
+    game = server.games[f'singleplayer-{sid}']
+    for _ in range(25):
+        client.emit('make_move', some_move(game, None))
+        settle()
+    assert game['seq'] >= 25 and len(game['log']) == 25
+
+    # Журнал проходит через байты, как при записи в архив
+    log = game['log']
+    copy = GameLog(log.seed, log.mode, log.players, bytes(log.moves))
+    result = replay(copy, game['board'].width, game['board'].height)
+    assert result.board == game['board']
+    assert result.scores == [game['players'][sid]['score']]
+
+
+def test_level_must_be_id_or_number():
+    client = connect()
+    client.emit('join_single_player', {'playerName': 'lister', 'gameMode': 'level', 'level': ['red-20']})
+    settle()
+    assert [error['message'] for error in received(client, 'error')] == ['Неизвестный уровень']
+    assert not received(client, 'single_player_started')
+
+    client.emit('join_single_player', {'playerName': 'lister', 'gameMode': 'level', 'level': 'tiny-mix'})
+    settle()
+    started, = received(client, 'single_player_started')
+    assert started['levelData']['levelId'] == 'tiny-mix' and started['levelData']['movesLeft'] > 0
+
+
+def test_assets_send_last_modified_and_answer_304():
+    http = server.app.test_client()
+    page = http.get('/')
+    assert page.status_code == 200
+    last_modified = page.headers['Last-Modified']
+    assert page.headers['ETag']
+
+    assert http.get('/', headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert http.get('/', headers={'If-None-Match': page.headers['ETag']}).status_code == 304
+    # ETag важнее даты: другой ETag - полный ответ, даже если дата совпала
+    stale = {'If-None-Match': '"old"', 'If-Modified-Since': last_modified}
+    assert http.get('/', headers=stale).status_code == 200
+
+    gzipped = http.get('/', headers={'Accept-Encoding': 'gzip, br;q=0'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip' and gzipped.headers['Vary'] == 'Accept-Encoding'
+    assert gzipped.headers['ETag'] != page.headers['ETag']
+    revalidated = http.get('/', headers={'Accept-Encoding': 'gzip, br;q=0', 'If-None-Match': gzipped.headers['ETag']})
+    assert revalidated.status_code == 304 and 'Content-Encoding' not in revalidated.headers
+
+
+def test_late_leave_of_previous_room_keeps_player_in_new_room():
+    client = connect()
+    client.emit('join_single_player', {'playerName': 'mover', 'gameMode': 'endless'})
+    settle()
+    sid = received(client, 'single_player_started')[0]['playerId']
+    previous = f'singleplayer-{sid}'
+
+    # Актор прежней комнаты занят: выход из нее выполнится после входа в новую
+    server.actors.submit(previous, server.socketio.sleep, 0.2)
+    client.emit('join_room', {'room': 'leave-race', 'playerName': 'mover'})
+    server.socketio.sleep(0.4)
+
+    assert server.players[sid]['room'] == 'leave-race'
+    assert sid in server.games['leave-race']['players']
+    assert previous not in server.games
+
+
+def test_admin_handlers_rate_is_validated(monkeypatch):
+    http = server.app.test_client()
+    assert http.post('/admin/handlers?rate=0.5').status_code == 404
+    monkeypatch.setattr(server, 'ADMIN_TOKEN', 'secret')
+    assert http.post('/admin/handlers?rate=0.5', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+
+    admin = {'Authorization': 'Bearer secret'}
+    rate = server.handler_timer.rate
+    try:
+        response = http.post('/admin/handlers?rate=0.5', headers=admin)
+        assert response.status_code == 200 and response.get_json()['rate'] == 0.5
+        for bad in ('nan', 'inf', '-inf', 'half'):
+            assert http.post(f'/admin/handlers?rate={bad}', headers=admin).status_code == 400, bad
+        assert server.handler_timer.rate == 0.5
+        # Значения вне диапазона обрезаются до него
+        assert http.post('/admin/handlers?rate=7', headers=admin).get_json()['rate'] == 1.0
+    finally:
+        server.handler_timer.set_rate(rate)
@@ -0,0 +1,98 @@
+"""Остановка сервера по SIGTERM: отложенные рекорды и очередь архива партий не теряются"""
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from match3.audit import read_archive
+from match3.board import Board
+from match3.moves import MoveIndex, move_cells
+
+socketio = pytest.importorskip('socketio')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(tmp_path, **settings):
+    port = free_port()
+    env = {**os.environ, 'PORT': str(port), 'DATA_DIR': str(tmp_path), 'HIGHSCORE_DB': '',
+           'AUDIT_DIR': '', 'HIGHSCORE_FLUSH_INTERVAL': '60', 'LOG_LEVEL': 'WARNING', **settings}
+    process = subprocess.Popen([sys.executable, 'server.py'], cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + '/health', timeout=1).read()
+            return process, url
+        except OSError:
+            assert process.poll() is None, f'server.py завершился с кодом {process.returncode}'
+            time.sleep(0.2)
+    process.kill()
+    pytest.fail('server.py не ответил на /health')
+
+
+def play_endless_move(url, name):
+    """Один результативный ход в бесконечном режиме; возвращает очки после него"""
+    client = socketio.Client(reconnection=False)
+    started = threading.Event()
+    updated = threading.Event()
+    state = {}
+    client.on('single_player_started', lambda data: (state.update(data), started.set()))
+    client.on('board_update', lambda data: (state.update(data), updated.set()))
+    client.connect(url, transports=['polling'])
+    try:
+        client.emit('join_single_player', {'playerName': name, 'gameMode': 'endless'})
+        assert started.wait(10)
+        board = Board.from_names(state['board'])
+        row1, col1, row2, col2 = move_cells(min(MoveIndex(board).moves), board.width)
+        client.emit('make_move', {'from': {'row': row1, 'col': col1}, 'to': {'row': row2, 'col': col2}})
+        assert updated.wait(10)
+        return state['highscoreData']['currentScore']
+    finally:
+        client.disconnect()
+
+
+def test_sigterm_flushes_pending_highscores(tmp_path):
+    process, url = start_server(tmp_path)
+    try:
+        score = play_endless_move(url, 'sigterm')
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(15)
+    assert score > 0
+    with sqlite3.connect(str(tmp_path / 'highscores.db')) as conn:
+        rows = conn.execute('SELECT name, mode, score FROM highscores').fetchall()
+    assert rows == [('sigterm', 'endless', score)]
+    assert process.returncode == 0
+
+
+def test_sigterm_drains_audit_queue(tmp_path):
+    audit_dir = tmp_path / 'audit'
+    process, url = start_server(tmp_path, AUDIT_DIR=str(audit_dir))
+    try:
+        score = play_endless_move(url, 'archived')
+        # Последний игрок ушел - комната закрывается и партия уходит в очередь архива
+        deadline = time.monotonic() + 10
+        while json.load(urllib.request.urlopen(url + '/health'))['active_games']:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(15)
+    entry, = read_archive(str(audit_dir))
+    assert entry.log.players == ['archived']
+    assert entry.replay().scores == [score]
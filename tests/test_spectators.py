@@ -0,0 +1,66 @@
+"""Зрители: выбор уровня, частота снимков и последнее состояние после последнего хода"""
+import random
+
+import pytest
+
+from match3.spectators import LIVE, RATES, SNAPSHOT, Spectators, tier_for
+from match3.timers import TimerWheel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_tier_is_highest_allowed_rate():
+    assert tier_for('binary') == (LIVE, 'binary')
+    assert tier_for('json', 0) == (LIVE, 'json')
+    assert tier_for('binary', 0.5) == (RATES[0], SNAPSHOT)
+    assert tier_for('binary', 7) == (5, SNAPSHOT)
+    assert tier_for('binary', 100) == (RATES[-1], SNAPSHOT)
+
+
+@pytest.mark.parametrize('rate', RATES)
+def test_throttled_tier_keeps_rate_and_sends_last_state(rate):
+    rng = random.Random(rate)
+    tick = 0.05
+    clock = Clock()
+    wheel = TimerWheel(tick=tick, clock=clock)
+    state = {'seq': 0}
+    sent = []
+    spectators = Spectators(wheel, lambda room, tier: sent.append((clock.now, state['seq'])))
+    spectators.watch('viewer', 'room', 'delta', rate)
+    end = clock.now + 60
+    while clock.now < end:
+        clock.now += rng.expovariate(rng.uniform(0.5, 40))
+        wheel.advance()
+        state['seq'] += 1
+        spectators.changed('room')
+    # Ходов больше нет: дожидаемся последнего снимка
+    clock.now += 1.0 / rate + tick
+    wheel.advance()
+
+    times = [at for at, _ in sent]
+    # Между снимками не меньше 1/rate секунд (с точностью до тика колеса)
+    assert all(b - a >= 1.0 / rate - 1e-9 for a, b in zip(times, times[1:]))
+    assert len(sent) <= 60 * rate + 1
+    assert sent and sent[-1][1] == state['seq'], 'последний снимок не содержит последний ход'
+    assert spectators.snapshots + spectators.coalesced >= state['seq'] - 1
+
+
+def test_last_viewer_leaving_cancels_pending_snapshot():
+    clock = Clock()
+    wheel = TimerWheel(tick=0.05, clock=clock)
+    sent = []
+    spectators = Spectators(wheel, lambda room, tier: sent.append(tier))
+    spectators.watch('viewer', 'room', 'delta', 1)
+    spectators.changed('room')
+    spectators.changed('room')
+    assert sent == [(1, SNAPSHOT)] and len(wheel) == 1
+    assert spectators.close('room') == [('viewer', (1, SNAPSHOT))]
+    clock.now += 2
+    wheel.advance()
+    assert sent == [(1, SNAPSHOT)] and len(wheel) == 0 and len(spectators) == 0
@@ -0,0 +1,57 @@
+"""Колесо таймеров: срабатывание в первый тик после дедлайна, отмененные молчат"""
+import random
+
+from match3.timers import TimerWheel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_timers_fire_once_within_a_tick_of_deadline():
+    rng = random.Random(1)
+    clock = Clock()
+    wheel = TimerWheel(tick=0.1, slots=64, clock=clock)
+    fired = {}
+    deadlines = {}
+    cancelled = set()
+    for n in range(5000):
+        timer = wheel.schedule(rng.uniform(0, 30), lambda n=n: fired.__setitem__(n, clock.now))
+        deadlines[n] = timer.deadline
+        if rng.random() < 0.2:
+            wheel.cancel(timer)
+            cancelled.add(n)
+    assert len(wheel) == 5000 - len(cancelled)
+    while clock.now < 1040:
+        clock.now += rng.uniform(0.01, 0.3)
+        wheel.advance()
+    assert set(fired) == set(range(5000)) - cancelled and len(wheel) == 0
+    # Таймер срабатывает в первый тик не раньше дедлайна; advance мог прийти позже на шаг часов
+    assert all(deadlines[n] <= at <= deadlines[n] + 0.1 + 0.3 for n, at in fired.items())
+
+
+def test_timers_fire_in_deadline_order_across_wheel_turns():
+    clock = Clock()
+    wheel = TimerWheel(tick=0.1, slots=8, clock=clock)
+    order = []
+    # 0.85 и 1.65 секунды попадают в одну ячейку колеса из 8 тиков, но в разные обороты
+    for delay in (1.65, 0.25, 0.85, 0.05):
+        wheel.schedule(delay, order.append, delay)
+    for _ in range(20):
+        clock.now += 0.1
+        wheel.advance()
+    assert order == [0.05, 0.25, 0.85, 1.65]
+
+
+def test_failing_callback_does_not_stop_other_timers():
+    clock = Clock()
+    wheel = TimerWheel(tick=0.1, slots=8, clock=clock)
+    fired = []
+    wheel.schedule(0.05, lambda: 1 / 0)
+    wheel.schedule(0.05, fired.append, 'ok')
+    clock.now += 0.2
+    assert wheel.advance() == 2 and fired == ['ok'] and len(wheel) == 0
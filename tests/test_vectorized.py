@@ -0,0 +1,24 @@
+"""NumPy-движок пакетной симуляции дает те же поля и результаты ходов, что и скалярный"""
+import pytest
+
+from helpers import batch_inputs
+from match3.board import TILE_CODES
+from match3.vectorized import NumpyBatch, ScalarBatch
+
+pytest.importorskip('numpy')
+
+
+@pytest.mark.parametrize('width, height', [(8, 8), (16, 16), (7, 5)])
+def test_numpy_batch_is_bit_identical_to_scalar(width, height):
+    boards, swaps, streams = batch_inputs(300, 30, width * 100 + height, width, height)
+    scalar = ScalarBatch(boards, streams)
+    batch = NumpyBatch(boards, streams)
+    for move in swaps:
+        valid, cleared, depth = scalar.play(move)
+        numpy_valid, numpy_cleared, numpy_depth = batch.play(move)
+        assert list(numpy_valid) == valid
+        assert numpy_cleared.tolist() == cleared
+        assert list(numpy_depth) == depth
+        assert batch.to_boards() == scalar.boards
+    for code in TILE_CODES:
+        assert list(batch.count(code)) == list(scalar.count(code))
@@ -0,0 +1,20 @@
+"""Бинарный формат: поле и ход переживают кодирование без потерь"""
+import random
+
+import pytest
+
+from match3.board import EMPTY, TILE_CODES, Board
+from match3.moves import MoveIndex, move_cells
+from match3.wire import decode_board, decode_move, encode_board, encode_move
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_board_and_moves_round_trip(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        width, height = rng.randint(3, 12), rng.randint(3, 12)
+        board = Board(width, height, bytes(rng.choice((EMPTY,) + TILE_CODES) for _ in range(width * height)))
+        assert decode_board(encode_board(board)) == board
+        for code in MoveIndex(board).moves:
+            cells = move_cells(code, width)
+            assert decode_move(encode_move(*cells, width), width) == cells